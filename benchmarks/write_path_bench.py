@@ -0,0 +1,101 @@
+# write_path_bench.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 写入路径基准测试：在本地HTTP服务器上对比旧的 iter_content(8192) 逐块写入与新的缓冲区+写线程路径
+#
+# 用法: python benchmarks/write_path_bench.py [--size-mb 512] [--rounds 3]
+# 服务器运行在单独的进程中，CPU% 只统计下载端进程 (100% 相当于占满一个核)
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import requests
+from src.stream_writer import copy_response, preallocate
+
+
+def serve(port: int, size: int, ready):
+    block = os.urandom(1024 * 1024)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(size))
+            self.end_headers()
+            remaining = size
+            while remaining > 0:
+                n = min(remaining, len(block))
+                self.wfile.write(block[:n])
+                remaining -= n
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    ready.set()
+    server.serve_forever()
+
+
+def legacy_write(response, path):
+    with open(path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            f.write(chunk)
+
+
+def buffered_write(response, path):
+    total = int(response.headers['Content-Length'])
+    with open(path, 'wb') as f:
+        preallocate(f, total)
+        written = copy_response(response, f)
+        f.truncate(written)
+
+
+def measure(session, url, path, write) -> tuple:
+    wall, cpu = time.perf_counter(), time.process_time()
+    with session.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        write(response, path)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size / wall / 1024 / 1024, cpu / wall * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比新旧写入路径的吞吐量与CPU占用")
+    parser.add_argument("--size-mb", type=int, default=512, help="测试文件大小 (MB)")
+    parser.add_argument("--rounds", type=int, default=3, help="每种写入方式的运行次数，取最好成绩")
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.port, args.size_mb * 1024 * 1024, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+
+    url = f"http://127.0.0.1:{args.port}/file"
+    session = requests.Session()
+    path = os.path.join(tempfile.gettempdir(), f"write_path_bench_{os.getpid()}.bin")
+    print(f"文件大小: {args.size_mb} MB，每种方式运行 {args.rounds} 次")
+    try:
+        for name, write in (("iter_content(8192)", legacy_write), ("缓冲区+写线程", buffered_write)):
+            results = [measure(session, url, path, write) for _ in range(args.rounds)]
+            speed, cpu = max(results)
+            print(f"{name}: {speed:.1f} MB/s，CPU {cpu:.1f}%")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# xbogus_bench.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 签名基准测试：先用xbogus_golden.json中的样本核对X-Bogus签名结果，再测量各签名方式每秒可签名的次数
+#
+# 用法: python benchmarks/xbogus_bench.py [--seconds 2] [--rounds 3] [--batch 50] [--verify-only]
+# 样本由最初按整数列表实现的版本生成，任何一条不一致时以退出码1结束，不进行测速
+
+import sys
+import json
+import time
+import argparse
+from urllib.parse import urlencode
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.xbogus import XBogus, RequestSigner, DEFAULT_USER_AGENT
+
+GOLDEN_PATH = Path(__file__).parent / "xbogus_golden.json"
+
+# 与作品详情、作品列表接口相近的参数
+SAMPLE_PARAMS = {
+    "device_platform": "webapp", "aid": "6383", "channel": "channel_pc_web", "sec_user_id":
+    "MS4wLjABAAAAv7iSuuXDJGDvJkmH_vz1qkDZYo1apxgzaxdBSeIuPiM", "max_cursor": "0", "count": "18",
+    "pc_client_type": "1", "version_code": "190500", "version_name": "19.5.0", "cookie_enabled": "true",
+    "screen_width": "1920", "screen_height": "1080", "browser_language": "zh-CN", "browser_platform": "Win32",
+    "browser_name": "Edge", "browser_version": "122.0.0.0", "browser_online": "true",
+}
+
+
+def verify(path: Path) -> bool:
+    """逐条核对样本，返回是否全部一致"""
+    with open(path, 'r', encoding='utf-8') as f:
+        cases = json.load(f)['cases']
+    signers = {}
+    failed = 0
+    for case in cases:
+        xbogus = signers.setdefault(case['user_agent'], XBogus(case['user_agent']))
+        value = xbogus.get_xbogus(case['params'], case['timestamp'])[1]
+        if value != case['x_bogus']:
+            failed += 1
+            print(f"  [不一致] UA={case['user_agent'][:40]!r} 参数={case['params'][:60]!r}: "
+                  f"期望 {case['x_bogus']}，得到 {value}")
+    print(f"签名样本: {len(cases)} 条，不一致 {failed} 条")
+    return failed == 0
+
+
+def measure(sign, seconds: float) -> float:
+    """在seconds秒内重复调用sign()，返回每秒签名次数；sign返回本次签名的个数"""
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        count += sign()
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="核对X-Bogus签名样本并测量签名速度")
+    parser.add_argument("--seconds", type=float, default=2, help="每种签名方式每轮运行的秒数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种签名方式的运行次数，取最好成绩")
+    parser.add_argument("--batch", type=int, default=50, help="批量签名时每批的参数个数")
+    parser.add_argument("--verify-only", action="store_true", help="只核对签名样本，不测速")
+    args = parser.parse_args()
+
+    if not verify(GOLDEN_PATH):
+        sys.exit(1)
+    if args.verify_only:
+        return
+
+    param_str = urlencode(SAMPLE_PARAMS)
+    xbogus = XBogus(DEFAULT_USER_AGENT)
+    signer = RequestSigner()
+    batch = [dict(SAMPLE_PARAMS, max_cursor=str(n)) for n in range(args.batch)]
+
+    def new_instance():
+        XBogus(DEFAULT_USER_AGENT).get_xbogus(param_str)
+        return 1
+
+    def cached_instance():
+        xbogus.get_xbogus(param_str)
+        return 1
+
+    def signer_sign():
+        signer.sign(SAMPLE_PARAMS, DEFAULT_USER_AGENT)
+        return 1
+
+    def signer_sign_many():
+        return len(signer.sign_many(batch, DEFAULT_USER_AGENT))
+
+    print(f"每种方式运行 {args.rounds} 轮，每轮 {args.seconds:g} 秒，参数串 {len(param_str)} 个字符")
+    for name, sign in (("每次新建XBogus", new_instance), ("复用XBogus", cached_instance),
+                       ("RequestSigner.sign", signer_sign), (f"RequestSigner.sign_many (每批{args.batch})", signer_sign_many)):
+        rate = max(measure(sign, args.seconds) for _ in range(args.rounds))
+        print(f"{name}: {rate:,.0f} 次/秒，{1e6 / rate:.1f} µs/次")
+
+
+if __name__ == "__main__":
+    main()
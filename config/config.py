@@ -8,4 +8,124 @@ HEADERS = {
 }
 
 # 默认视频下载路径
-DEFAULT_DOWNLOAD_PATH = "./downloads"
\ No newline at end of file
+DEFAULT_DOWNLOAD_PATH = "./downloads"
+
+# 单个文件下载中断后的最大续传次数
+DOWNLOAD_RESUME_ATTEMPTS = 3
+
+# 超过该大小的视频使用多连接分段下载
+SEGMENT_THRESHOLD = 32 * 1024 * 1024
+# 分段下载的最大连接数及每段最小大小
+SEGMENT_CONNECTIONS = 4
+SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+
+# 下载记录数据库文件名 (保存在下载目录中)
+DOWNLOAD_INDEX_FILE = ".download_index.db"
+
+# 默认并发下载视频数
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+# 分页预取队列长度 (下载当前页时最多提前获取的页数)
+DEFAULT_PREFETCH_PAGES = 2
+
+# 异步下载引擎的连接池大小 (所有任务共享)
+ASYNC_MAX_CONNECTIONS = 200
+ASYNC_MAX_CONNECTIONS_PER_HOST = 32
+
+# 共享HTTP连接池: 缓存连接的源站数量及每个源站保留的最大连接数
+HTTP_POOL_HOSTS = 16
+HTTP_POOL_MAXSIZE = 32
+# 同一源站两次预热连接的最短间隔 (秒)，与服务器的keep-alive时长相当
+HTTP_WARMUP_TTL = 30
+
+# CDN镜像统计文件名 (保存在下载目录中) 及指数加权平均系数
+MIRROR_STATS_FILE = ".mirror_stats.json"
+MIRROR_EWMA_ALPHA = 0.3
+# 镜像连续出错后降级的时长 (秒)
+MIRROR_COOLDOWN = 300
+# 镜像无数据超过该秒数即视为卡住，切换到下一个镜像续传
+MIRROR_STALL_TIMEOUT = 10
+# 传输开始MIRROR_PROBE_SECONDS秒后平均速度仍低于MIRROR_MIN_SPEED (字节/秒) 时切换镜像
+MIRROR_PROBE_SECONDS = 5
+MIRROR_MIN_SPEED = 64 * 1024
+
+# API自适应限速 (按账号和接口): 初始/最低/最高每秒请求数
+RATE_LIMIT_INITIAL_RPS = 1.0
+RATE_LIMIT_MIN_RPS = 0.1
+RATE_LIMIT_MAX_RPS = 5.0
+# 每次成功增加的速率，触发风控时速率与并发数乘以的系数
+RATE_LIMIT_INCREASE = 0.05
+RATE_LIMIT_DECREASE = 0.5
+# 令牌桶容量 (允许的突发请求数) 及同一账号同一接口的最大并发请求数
+RATE_LIMIT_BURST = 2
+RATE_LIMIT_MAX_CONCURRENCY = 4
+# 触发风控后暂停请求的秒数
+RATE_LIMIT_COOLDOWN = 30
+
+# API请求失败时的最大尝试次数及退避时间 (秒)，每次重试前随机等待 0 ~ min(最大值, 基数 * 2^(n-1)) 秒
+API_RETRY_ATTEMPTS = 5
+API_RETRY_BASE_DELAY = 1.0
+API_RETRY_MAX_DELAY = 30.0
+# CDN下载重试同一镜像前的退避时间 (秒)
+CDN_RETRY_BASE_DELAY = 0.5
+CDN_RETRY_MAX_DELAY = 8.0
+# 自适应超时: 取主机近期延迟的该分位数乘以倍数，并限制在最小/最大值之间 (秒)
+RETRY_TIMEOUT_PERCENTILE = 0.95
+RETRY_TIMEOUT_MULTIPLIER = 3
+RETRY_TIMEOUT_MIN = 5
+RETRY_TIMEOUT_MAX = 30
+# 同一主机连续失败该次数后熔断，熔断持续的秒数
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30
+
+# 只抓取作品信息时，元数据文件保存在下载目录下的该子目录中；单个文件写满该大小 (未压缩) 后换新文件
+METADATA_DIR_NAME = "metadata"
+METADATA_ROTATE_BYTES = 64 * 1024 * 1024
+
+# 批量下载时同时处理的链接数 (各链接的视频仍共用同一个下载线程池)
+BULK_PARALLEL_TARGETS = 4
+# 解析短链接 (v.douyin.com) 的超时秒数
+BULK_RESOLVE_TIMEOUT = 10
+
+# 多账号分担请求时，账号连续被风控该次数后停用的秒数
+ACCOUNT_POOL_MAX_STRIKES = 3
+ACCOUNT_POOL_BENCH_SECONDS = 600
+
+# CDN下载全局限速 (进程内所有下载任务合计，字节/秒，0为不限速)，可写作 "2M"、"512K"
+BANDWIDTH_GLOBAL_LIMIT = 0
+# 全局限速的时段设置，如 "09:00-18:00=2M,18:00-09:00=0"；不在任何时段内时使用BANDWIDTH_GLOBAL_LIMIT
+BANDWIDTH_GLOBAL_SCHEDULE = ""
+# 限速器允许的突发量 (按当前速率计的秒数)
+BANDWIDTH_BURST_SECONDS = 1.0
+
+# 写入路径: 每次读取的块大小在最小值与最大值之间，按约WRITE_CHUNK_TARGET_SECONDS秒的数据量调整
+WRITE_CHUNK_MIN = 64 * 1024
+WRITE_CHUNK_MAX = 1024 * 1024
+WRITE_CHUNK_TARGET_SECONDS = 0.1
+# 每个文件在读取与写线程之间循环使用的缓冲区个数
+WRITE_QUEUE_DEPTH = 4
+# 不小于该大小的文件按Content-Length预分配磁盘空间，每写入WRITE_PROGRESS_INTERVAL字节记录一次进度
+WRITE_PREALLOCATE_MIN = 8 * 1024 * 1024
+WRITE_PROGRESS_INTERVAL = 16 * 1024 * 1024
+
+# 去重: 链接方式 "auto" (优先reflink，不支持时用硬链接) / "reflink" / "hardlink"
+DEDUPE_LINK_MODE = "auto"
+# 去重时并行计算校验和的线程数
+DEDUPE_WORKERS = 4
+# 下载时遇到已下载过的作品或内容相同的文件，直接建立链接而不是跳过或保留两份
+DEDUPE_ON_DOWNLOAD = True
+# 参与去重扫描的文件类型
+DEDUPE_EXTENSIONS = ('.mp4', '.mov', '.webm', '.avi', '.mp3', '.m4a', '.jpg', '.jpeg', '.png', '.webp')
+
+# 视频清晰度选择 (从作品的多个码率版本中选择)，如 "highest"、"lowest"、"720p"、"540p,budget=10G"；为空时下载默认的play_addr
+DEFAULT_VIDEO_QUALITY = ""
+
+# 请求签名器缓存的User-Agent数 (每个UA的预计算数据按最近使用保留)
+SIGNER_CACHE_SIZE = 32
+
+# 批量上传时每个账号的浏览器会话连续上传该数量的视频后重启，限制浏览器长时间运行占用的内存
+UPLOAD_SESSION_MAX_UPLOADS = 20
+# 批量上传时同时上传的账号数 (每个账号一个浏览器，进程内所有批量任务合计)；同一账号的视频始终依次上传
+UPLOAD_MAX_PARALLEL_ACCOUNTS = 3
+# 同一账号两次上传之间的间隔 (秒)，避免操作过于频繁
+UPLOAD_INTERVAL = 3
@@ -0,0 +1,129 @@
+# account_pool.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 多账号分担下载请求：公开接口 (主页、合集、音乐、作品详情) 的请求轮流使用多个账号的Cookie
+
+import re
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import ACCOUNT_POOL_MAX_STRIKES, ACCOUNT_POOL_BENCH_SECONDS
+from .api_endpoints import SINGLE_VIDEO_API, USER_POST_API, USER_MIX_API, MUSIC_API
+from .rate_limiter import get_rate_limiter, OK, THROTTLED
+
+# 返回内容与登录账号无关的接口，可以交给任意账号请求；点赞、收藏、收藏夹只能由本人账号请求
+PUBLIC_APIS = (SINGLE_VIDEO_API, USER_POST_API, USER_MIX_API, MUSIC_API)
+
+
+def account_key(cookie: str) -> str:
+    """由Cookie中的sessionid生成账号标识，用于区分不同账号的点赞、收藏等断点记录"""
+    match = re.search(r'sessionid=([^;]+)', cookie or "")
+    return hashlib.sha1((match.group(1) if match else cookie or "").encode()).hexdigest()[:16]
+
+
+class PooledAccount:
+    """账号池中的一个账号: 请求头中的Cookie与健康状态。限速器按账号标识从get_rate_limiter取得"""
+
+    def __init__(self, name: str, cookie: str):
+        self.name = name or "当前账号"
+        self.headers = {'Cookie': cookie}
+        self.key = account_key(cookie)
+        self.strikes = 0  # 连续被风控的次数
+        self.benched_until = 0.0  # 在此之前不再使用该账号
+
+
+class AccountPool:
+    """一个下载任务可使用的账号集合。
+
+    每次请求按轮询顺序选出第一个能从自己的限速器取得许可的账号，因此某个账号被风控暂停后，
+    请求自动落到其余账号上。账号连续被风控ACCOUNT_POOL_MAX_STRIKES次 (通常是Cookie失效或账号被限制)
+    后停用ACCOUNT_POOL_BENCH_SECONDS秒；没有其他可用账号时不停用，只依靠限速器暂停。
+    """
+
+    def __init__(self, accounts: List[Tuple[str, str]]):
+        self.accounts: List[PooledAccount] = []
+        seen = set()
+        for name, cookie in accounts:
+            account = PooledAccount(name, cookie)
+            if account.key not in seen:
+                seen.add(account.key)
+                self.accounts.append(account)
+        if not self.accounts:
+            raise ValueError("账号池中没有账号")
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def try_acquire(self, url: str) -> Tuple[Optional[PooledAccount], float]:
+        """返回 (取得许可的账号, 0)；所有账号都需要等待时返回 (None, 最短等待秒数)"""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.accounts)
+        now = time.monotonic()
+        shortest = float("inf")
+        for offset in range(len(self.accounts)):
+            account = self.accounts[(start + offset) % len(self.accounts)]
+            if account.benched_until > now:
+                shortest = min(shortest, account.benched_until - now)
+                continue
+            wait = get_rate_limiter(account.key, url).try_acquire()
+            if wait <= 0:
+                return account, 0
+            shortest = min(shortest, wait)
+        return None, shortest
+
+    def acquire(self, url: str, should_stop: Callable[[], bool] = None) -> Optional[PooledAccount]:
+        """阻塞直到某个账号取得许可；should_stop返回True时放弃并返回None"""
+        while True:
+            account, wait = self.try_acquire(url)
+            if account:
+                return account
+            if should_stop and should_stop():
+                return None
+            time.sleep(min(wait, 0.5))
+
+    async def acquire_async(self, url: str, should_stop: Callable[[], bool] = None) -> Optional[PooledAccount]:
+        """acquire的协程版本，等待期间不阻塞事件循环"""
+        while True:
+            account, wait = self.try_acquire(url)
+            if account:
+                return account
+            if should_stop and should_stop():
+                return None
+            await asyncio.sleep(min(wait, 0.5))
+
+    def release(self, account: PooledAccount, url: str, outcome: str = OK):
+        """请求结束后归还许可并更新该账号的健康状态"""
+        get_rate_limiter(account.key, url).release(outcome)
+        with self._lock:
+            if outcome == OK:
+                account.strikes = 0
+            elif outcome == THROTTLED:
+                account.strikes += 1
+                now = time.monotonic()
+                healthy = [other for other in self.accounts if other is not account and other.benched_until <= now]
+                if account.strikes >= ACCOUNT_POOL_MAX_STRIKES and healthy:
+                    account.strikes = 0
+                    account.benched_until = now + ACCOUNT_POOL_BENCH_SECONDS
+                    print(f"  [账号池] 账号 '{account.name}' 连续被风控，停用 {ACCOUNT_POOL_BENCH_SECONDS} 秒，"
+                          f"请求改由其余 {len(healthy)} 个账号处理")
+
+
+def build_account_pool(accounts: List[Dict], primary: str, names: List[str] = None) -> AccountPool:
+    """从accounts.json的账号列表构建账号池: 当前账号排在最前，其后是names指定的 (默认为全部) 已配置Cookie的账号"""
+    by_name = {acc.get('username'): acc for acc in accounts}
+    order = [primary] + [name for name in (names or by_name) if name != primary]
+    return AccountPool([(name, by_name[name]['cookie']) for name in order
+                        if name in by_name and by_name[name].get('cookie')])
@@ -0,0 +1,66 @@
+# assets.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 作品的可下载资源: 视频、配乐 (music.play_url) 与封面，只需要音频或封面时不必下载整个视频
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+VIDEO, AUDIO, COVER = "video", "audio", "cover"
+ASSET_TYPES = (VIDEO, AUDIO, COVER)
+ASSET_NAMES = {VIDEO: "视频", AUDIO: "音频", COVER: "封面"}
+
+EXTENSION_PATTERN = re.compile(r"\.(mp3|m4a|aac|jpe?g|png|webp)(?:[?~#]|$)", re.IGNORECASE)
+DEFAULT_EXTENSIONS = {VIDEO: ".mp4", AUDIO: ".mp3", COVER: ".jpg"}
+
+
+def parse_assets(spec) -> Tuple[str, ...]:
+    """解析 "audio"、"audio,cover" 等写法，为空时只下载视频"""
+    if isinstance(spec, (list, tuple)):
+        items = spec
+    else:
+        items = (spec or "").split(',')
+    assets = []
+    for item in (str(item).strip().lower() for item in items):
+        if not item:
+            continue
+        if item not in ASSET_TYPES:
+            raise ValueError(f"无法识别的资源类型: {item} (可用: {', '.join(ASSET_TYPES)})")
+        if item not in assets:
+            assets.append(item)
+    return tuple(assets) or (VIDEO,)
+
+
+def _url_list(addr: Optional[Dict]) -> List[str]:
+    return list((addr or {}).get('url_list') or [])
+
+
+def asset_urls(aweme: Dict, asset: str) -> List[str]:
+    """返回作品某种资源的镜像地址列表，作品没有该资源时返回空列表"""
+    video = aweme.get('video') or {}
+    if asset == AUDIO:
+        return _url_list((aweme.get('music') or {}).get('play_url'))
+    if asset == COVER:
+        # 原始封面优先，没有时使用裁剪过的封面
+        return _url_list(video.get('origin_cover')) or _url_list(video.get('cover'))
+    return _url_list(video.get('play_addr'))
+
+
+def asset_content_id(aweme: Dict, asset: str) -> Optional[str]:
+    """多个作品共用同一份资源时的标识: 同一首配乐的所有作品共用music id，已下载过的配乐直接建立链接"""
+    if asset == AUDIO:
+        music = aweme.get('music') or {}
+        music_id = music.get('id_str') or music.get('id')
+        return str(music_id) if music_id else None
+    return None
+
+
+def asset_extension(urls: List[str], asset: str) -> str:
+    """从地址中识别文件扩展名，识别不出时使用该类资源的默认扩展名"""
+    if asset != VIDEO:
+        for url in urls:
+            match = EXTENSION_PATTERN.search(url.split('//', 1)[-1])
+            if match:
+                ext = match.group(1).lower()
+                return ".jpg" if ext == "jpeg" else f".{ext}"
+    return DEFAULT_EXTENSIONS[asset]
@@ -0,0 +1,694 @@
+# async_downloader.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 基于asyncio的下载引擎，所有任务共享一个事件循环和一个连接池
+
+import os
+import re
+import time
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import Future
+from functools import partial
+from typing import Dict, Optional
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp为可选依赖，只有使用异步引擎时才需要
+    aiohttp = None
+
+AIOHTTP_MISSING = "异步下载引擎需要安装aiohttp: pip install aiohttp (或 pip install \"douyou-assistant[async]\")"
+
+from config import (
+    HEADERS, DEFAULT_DOWNLOAD_PATH, DEFAULT_DOWNLOAD_WORKERS, DEFAULT_PREFETCH_PAGES, DOWNLOAD_RESUME_ATTEMPTS,
+    ASYNC_MAX_CONNECTIONS, ASYNC_MAX_CONNECTIONS_PER_HOST, MIRROR_STALL_TIMEOUT, METADATA_DIR_NAME,
+    DEDUPE_ON_DOWNLOAD
+)
+from .api_endpoints import (
+    SINGLE_VIDEO_API, USER_POST_API, USER_LIKE_API, USER_FAVORITE_API,
+    USER_COLLECTS_API, USER_MIX_API, MUSIC_API
+)
+from .downloader import (
+    BASE_API_PARAMS, PART_SUFFIX, AwemeIdFetcher, IncompleteDownloadError, MirrorSwitchError,
+    sanitize_filename, resolve_folder_name, build_detail_params, sign_params, parse_total_size,
+    note_newest, page_is_known, account_key, is_complete_page, prepare_partial, finish_partial, combine_statuses,
+    CrawlResults
+)
+from .download_index import get_download_index, CrawlCheckpoint
+from .dedupe import place_known, link_duplicate
+from .quality_selector import QualitySelector, describe
+from .assets import VIDEO, ASSET_NAMES, parse_assets, asset_urls, asset_content_id, asset_extension
+from .mirror_selector import get_mirror_stats
+from .metadata_sink import MetadataSink
+from . import rate_limiter
+from .rate_limiter import looks_throttled, THROTTLE_STATUS_CODES
+from .account_pool import AccountPool, PUBLIC_APIS
+from .bandwidth import BandwidthLimiter, get_global_bandwidth
+from .retry import API_RETRY, CDN_RETRY, get_host_health
+from .xbogus import get_signer
+
+# 写盘前在内存中攒够的字节数，减少切换到线程池写文件的次数
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class AsyncDownloadEngine:
+    """在后台线程中运行一个事件循环，多个下载任务共享同一个aiohttp连接池"""
+
+    def __init__(self, max_connections: int = ASYNC_MAX_CONNECTIONS,
+                 max_connections_per_host: int = ASYNC_MAX_CONNECTIONS_PER_HOST):
+        if aiohttp is None:
+            raise ImportError(AIOHTTP_MISSING)
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def start(self) -> "AsyncDownloadEngine":
+        """启动事件循环线程并创建共享会话，可重复调用"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="async-download-engine", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.session = self.loop.run_until_complete(self._create_session())
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.session.close())
+            self.loop.close()
+
+    async def _create_session(self) -> "aiohttp.ClientSession":
+        connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                         limit_per_host=self.max_connections_per_host,
+                                         ttl_dns_cache=300)
+        # 不同账号共用连接池，Cookie通过请求头单独传递，响应中的Set-Cookie不能串到其他账号
+        return aiohttp.ClientSession(connector=connector, headers=HEADERS,
+                                     cookie_jar=aiohttp.DummyCookieJar())
+
+    def submit(self, coro) -> Future:
+        """从任意线程提交协程到引擎，返回concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        """停止事件循环并关闭连接池"""
+        if self.loop and self._thread and self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+
+_shared_engine: Optional[AsyncDownloadEngine] = None
+_shared_engine_lock = threading.Lock()
+
+def get_shared_engine() -> AsyncDownloadEngine:
+    """获取进程内共享的异步下载引擎"""
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = AsyncDownloadEngine()
+        return _shared_engine.start()
+
+
+class AsyncDownloader:
+    """与Downloader提供相同入口的异步下载器，协程在共享引擎上执行"""
+
+    def __init__(self, cookie: str, download_path: str = None, max_workers: int = None,
+                 engine: AsyncDownloadEngine = None, metadata_only: bool = False, account_pool: AccountPool = None,
+                 bandwidth: BandwidthLimiter = None, quality: QualitySelector = None, assets=None):
+        if aiohttp is None:
+            raise ImportError(AIOHTTP_MISSING)
+        self.engine = engine or get_shared_engine()
+        self.own_account = AccountPool([(None, cookie)])
+        self.account_pool = account_pool if account_pool and len(account_pool) > 1 else None  # 与Downloader相同
+        self.user_agent = HEADERS.get("User-Agent", "")
+        self.download_path = download_path if download_path else DEFAULT_DOWNLOAD_PATH
+        os.makedirs(self.download_path, exist_ok=True)
+        self.index = get_download_index(self.download_path)  # 与Downloader共用的下载记录
+        self.mirrors = get_mirror_stats(self.download_path)  # CDN镜像的速度与出错统计
+        self.max_workers = max(1, max_workers or DEFAULT_DOWNLOAD_WORKERS)  # 并发下载视频数
+        self.prefetch_pages = DEFAULT_PREFETCH_PAGES  # 分页预取队列长度
+        self.account_key = account_key(cookie)  # 点赞、收藏等与账号相关的列表以此区分断点
+        self.metadata_only = metadata_only  # 只把作品信息写入JSONL，不下载视频
+        # 在创建时建好 (文件在第一次写入时才打开)，批量下载并行处理多个目标时不会各自创建一个
+        self._metadata_sink = MetadataSink(os.path.join(self.download_path, METADATA_DIR_NAME)) if metadata_only else None
+        self.bandwidth = bandwidth  # 本任务的CDN下载限速，另外还受进程内全局限速约束
+        self._global_bandwidth = get_global_bandwidth()
+        self.quality = quality or QualitySelector()  # 从作品的多个码率版本中选择要下载的版本
+        self.assets = parse_assets(assets)  # 要下载的资源: video / audio / cover
+        self._stop_requested = False  # 停止标志
+        print(f"异步下载器初始化完成，并发数: {self.max_workers}。" + (" (只抓取作品信息)" if metadata_only else "")
+              + (f" (下载: {'、'.join(ASSET_NAMES[asset] for asset in self.assets)})" if self.assets != (VIDEO,) else "")
+              + (f" (公开接口由 {len(self.account_pool)} 个账号分担)" if self.account_pool else ""))
+
+    def run(self, coro):
+        """在共享引擎上执行协程并阻塞等待结果，供线程中的同步代码调用"""
+        return self.engine.submit(coro).result()
+
+    def close(self):
+        """释放元数据文件 (事件循环由进程内所有异步下载器共用，不在这里关闭)"""
+        if self._metadata_sink:
+            self._metadata_sink.close()
+
+    async def _sleep(self, seconds: float) -> bool:
+        """可被停止请求打断的等待，被打断时返回False"""
+        deadline = time.monotonic() + seconds
+        while not self._stop_requested:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            await asyncio.sleep(min(remaining, 0.2))
+        return False
+
+    async def _throttle(self, nbytes: int) -> float:
+        """与Downloader._throttle相同，等待期间不阻塞事件循环"""
+        wait = self._global_bandwidth.consume(nbytes)
+        if self.bandwidth:
+            wait = max(wait, self.bandwidth.consume(nbytes))
+        if wait <= 0:
+            return 0.0
+        started = time.monotonic()
+        await self._sleep(wait)
+        return time.monotonic() - started
+
+    async def _fetch_data(self, url: str, params: Dict, validate=None) -> Optional[Dict]:
+        """与Downloader._fetch_data相同: 发出前签名，经过所用账号的限速器，失败时退避重试，超时取延迟分位数，主机连续失败时熔断。
+        签名只需几十微秒，直接在事件循环中计算"""
+        accounts = self.account_pool if self.account_pool and url in PUBLIC_APIS else self.own_account
+        health = get_host_health(url)
+        for attempt in range(1, API_RETRY.attempts + 1):
+            while (wait := health.allow()) > 0:
+                if not await self._sleep(min(wait, 1.0)):
+                    return None
+            account = await accounts.acquire_async(url, lambda: self._stop_requested)
+            if account is None:
+                return None
+            outcome = rate_limiter.ERROR
+            data = None
+            # 每次尝试重新签名，签名中的时间戳不会因退避等待而过期
+            query = {k: str(v) for k, v in sign_params(params, self.user_agent).items()}
+            started = time.monotonic()
+            try:
+                timeout = aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=health.timeout(10))
+                async with self.engine.session.get(url, params=query, headers=account.headers, timeout=timeout) as response:
+                    if response.status in THROTTLE_STATUS_CODES:
+                        outcome = rate_limiter.THROTTLED
+                        error = f"HTTP {response.status}，可能已被风控"
+                    elif 400 <= response.status < 500 and response.status != 408:
+                        health.record_success(time.monotonic() - started)
+                        print(f"请求API失败: HTTP {response.status}")
+                        return None  # 请求本身有误，重试也不会成功
+                    else:
+                        response.raise_for_status()
+                        data = await response.json(content_type=None)
+                        if looks_throttled(data):
+                            outcome = rate_limiter.THROTTLED
+                            error = "作品列表为空但仍有更多数据，可能已被风控"
+                        elif validate and not validate(data):
+                            error = "返回的数据不完整"
+                        else:
+                            outcome = rate_limiter.OK
+            except ValueError:
+                outcome = rate_limiter.THROTTLED
+                error = "服务器未返回有效的JSON数据，可能已被风控"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            finally:
+                accounts.release(account, url, outcome)
+
+            if outcome == rate_limiter.ERROR:
+                health.record_failure()
+            else:
+                # 被风控也说明主机可以正常响应，不计入熔断
+                health.record_success(time.monotonic() - started)
+            if outcome == rate_limiter.OK:
+                return data
+            if attempt == API_RETRY.attempts:
+                print(f"请求API失败: {error}，已重试 {attempt - 1} 次，放弃。")
+                break
+            delay = API_RETRY.delay(attempt)
+            print(f"请求API失败: {error}，{delay:.1f} 秒后第 {attempt} 次重试...")
+            if not await self._sleep(delay):
+                break
+        return None
+
+    def _save_metadata(self, aweme_list: list, mode: str, target: str = None) -> int:
+        """把一页作品的精简信息写入元数据文件，返回写入条数 (同步文件IO，由调用方放到线程池执行)"""
+        return self._metadata_sink.write_awemes(aweme_list, mode, target)
+
+    async def _fetch_aweme_detail(self, aweme_id: str) -> Optional[Dict]:
+        """通过作品详情接口获取单个作品信息"""
+        # 签名是纯CPU计算，放到线程池避免阻塞事件循环
+        full_params = await asyncio.to_thread(build_detail_params, aweme_id, self.user_agent)
+        data = await self._fetch_data(SINGLE_VIDEO_API, full_params)
+        if not data:
+            print("错误：API请求失败，返回None")
+            return None
+
+        if not data.get('aweme_detail'):
+            print("错误：无法获取视频详情信息。")
+            print(f"API响应: {data}")
+            return None
+        return data['aweme_detail']
+
+    async def _download_by_id(self, aweme_id: str, sub_folder: str = "", mode: str = "") -> str:
+        """按aweme_id重新获取作品信息并下载，用于断点恢复时重试上次失败的作品"""
+        aweme = await self._fetch_aweme_detail(aweme_id)
+        if not aweme:
+            return "failed"
+        return await self._download_single_video(aweme, sub_folder, mode)
+
+    async def _download_single_video(self, aweme: Dict, sub_folder: str = "", mode: str = "") -> str:
+        """下载一个作品的资源 (默认只有视频，见self.assets)，返回 'downloaded' / 'linked' / 'skipped' / 'failed' / 'stopped'"""
+        return combine_statuses([await self._download_asset(aweme, asset, sub_folder, mode) for asset in self.assets])
+
+    async def _download_asset(self, aweme: Dict, asset: str, sub_folder: str = "", mode: str = "") -> str:
+        """与Downloader._download_asset相同: 下载作品的一种资源 (视频、音频或封面)"""
+        desc = aweme.get('desc', '') or aweme.get('aweme_id', '')
+        name = ASSET_NAMES[asset]
+        content_id = asset_content_id(aweme, asset)
+        claimed = False
+        try:
+            if self._stop_requested:
+                return "stopped"
+            aweme_id = aweme['aweme_id']
+            # 下载记录的读写涉及SQLite和计算校验和，都放到线程池执行
+            record = await asyncio.to_thread(self.index.lookup, aweme_id, asset)
+            if record and not DEDUPE_ON_DOWNLOAD:
+                print(f"  [跳过] '{os.path.basename(record['path'])}' 已下载过 ({record['source'] or '未知来源'})."); return "skipped"
+            urls = asset_urls(aweme, asset)
+            while not record and content_id and DEDUPE_ON_DOWNLOAD:
+                record = await asyncio.to_thread(self.index.find_by_content, asset, content_id)
+                if record:
+                    break
+                pending = self.index.claim_content(asset, content_id)
+                if pending is None:
+                    claimed = True
+                    break
+                while not await asyncio.to_thread(pending.wait, 0.2):
+                    if self._stop_requested:
+                        return "stopped"
+            if not urls and not record:
+                if asset != VIDEO:
+                    print(f"  [跳过] 作品 '{desc[:20]}' 没有{name}."); return "skipped"
+                raise IndexError("作品没有可用的视频地址")
+            desc = aweme.get('desc', aweme_id)
+            valid_desc = sanitize_filename(desc, 50)
+            save_dir = os.path.join(self.download_path, sub_folder)
+            os.makedirs(save_dir, exist_ok=True)
+            ext = os.path.splitext(record['path'])[1] if record else asset_extension(urls, asset)
+            filepath = await asyncio.to_thread(self.index.claim_path, aweme_id, os.path.join(save_dir, f"{valid_desc}{ext}"))
+            try:
+                if record:
+                    return await asyncio.to_thread(place_known, self.index, record, aweme_id, filepath)
+                if os.path.exists(filepath):
+                    await asyncio.to_thread(partial(self.index.record, aweme_id, filepath, mode, asset=asset, content_id=content_id))
+                    print(f"  [跳过] '{os.path.basename(filepath)}' 已存在."); return "skipped"
+                rendition = self.quality.select(aweme) if asset == VIDEO else {"url_list": urls, "data_size": None}
+                if rendition is None:
+                    print(f"  [跳过] '{os.path.basename(filepath)}' 超出本任务的下载量预算."); return "skipped"
+                await asyncio.to_thread(prepare_partial, filepath, rendition)
+                quality = f" ({describe(rendition)})" if asset == VIDEO and self.quality.enabled else ""
+                if os.path.exists(filepath + PART_SUFFIX):
+                    print(f"  [续传] 继续下载: '{os.path.basename(filepath)}'{quality}")
+                else:
+                    print(f"  [下载] 正在下载: '{os.path.basename(filepath)}'{quality}")
+                finished = False
+                try:
+                    finished = await self._fetch_to_file(rendition['url_list'], filepath)
+                finally:
+                    if not finished:
+                        self.quality.refund(rendition)
+                if not finished:
+                    return "stopped"
+                finish_partial(filepath)
+                if asset == VIDEO:
+                    self.quality.charge(rendition, os.path.getsize(filepath))
+                await asyncio.to_thread(partial(self.index.record, aweme_id, filepath, mode, asset=asset, content_id=content_id))
+                if DEDUPE_ON_DOWNLOAD:
+                    await asyncio.to_thread(partial(link_duplicate, self.index, aweme_id, filepath, asset=asset))
+                return "downloaded"
+            finally:
+                self.index.release_path(filepath)
+        except (KeyError, IndexError, OSError, sqlite3.Error, IncompleteDownloadError, MirrorSwitchError,
+                aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"  [失败] 下载{name} '{desc[:20]}...' 时发生错误: {e}")
+            return "failed"
+        finally:
+            if claimed:
+                self.index.release_content(asset, content_id)
+
+    async def _cdn_url(self, urls: list, attempt: int) -> Optional[str]:
+        """与Downloader._cdn_url相同: 跳过熔断中的主机，全部熔断时等待，收到停止请求时返回None"""
+        start = (attempt - 1) % len(urls)
+        ordered = urls[start:] + urls[:start]
+        while True:
+            waits = []
+            for url in ordered:
+                wait = get_host_health(url).allow()
+                if wait <= 0:
+                    return url
+                waits.append(wait)
+            if not await self._sleep(min(min(waits), 1.0)):
+                return None
+
+    async def _fetch_to_file(self, urls: list, filepath: str) -> bool:
+        """与Downloader._fetch_to_file相同: 写入 .part 临时文件，中断后Range续传，校验后原子重命名；
+        镜像按历史速度排序，出错或卡住时换下一个镜像续传"""
+        urls = self.mirrors.rank(urls)
+        part_path = filepath + PART_SUFFIX
+        expected_total = None
+        attempts = max(DOWNLOAD_RESUME_ATTEMPTS, len(urls))
+        for attempt in range(1, attempts + 1):
+            url = await self._cdn_url(urls, attempt)
+            if url is None:
+                return False
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            total = None
+            received = 0
+            started = time.monotonic()
+            headers = {'Range': f"bytes={offset}-"} if offset else {}
+            health = get_host_health(url)
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=health.timeout(MIRROR_STALL_TIMEOUT))
+            try:
+                async with self.engine.session.get(url, headers=headers, timeout=timeout) as response:
+                    health.record_success(time.monotonic() - started)
+                    if response.status == 416 and offset:
+                        if parse_total_size(response.headers, 206) == offset:
+                            await asyncio.to_thread(os.replace, part_path, filepath)
+                            return True
+                        raise IncompleteDownloadError(f"续传位置 {offset} 无效")
+                    response.raise_for_status()
+                    if offset and response.status != 206:
+                        offset = 0  # 服务器不支持Range，从头下载
+                    total = parse_total_size(response.headers, response.status, offset)
+                    if offset and expected_total and total and total != expected_total:
+                        # 换镜像后文件大小不一致，已下载的部分不能拼接
+                        os.remove(part_path)
+                        raise MirrorSwitchError(f"镜像文件大小不一致 ({total} != {expected_total})")
+                    expected_total = total or expected_total
+                    # 文件读写放到线程池，事件循环只负责网络IO
+                    f = await asyncio.to_thread(open, part_path, 'ab' if offset else 'wb')
+                    try:
+                        buffer = bytearray()
+                        async for chunk in response.content.iter_chunked(65536):
+                            if self._stop_requested:
+                                break
+                            buffer += chunk
+                            received += len(chunk)
+                            started += await self._throttle(len(chunk))
+                            if len(buffer) >= WRITE_BUFFER_SIZE:
+                                await asyncio.to_thread(f.write, bytes(buffer)); buffer.clear()
+                            if len(urls) > 1 and self.mirrors.too_slow(received, started):
+                                raise MirrorSwitchError(f"镜像速度过慢 ({self.mirrors.host_of(url)})")
+                    finally:
+                        # 连接中断时也把已收到的数据写入临时文件，续传时少下载一段
+                        if buffer:
+                            await asyncio.to_thread(f.write, bytes(buffer))
+                        await asyncio.to_thread(f.close)
+                    if self._stop_requested:
+                        return False
+                size = os.path.getsize(part_path)
+                if total is not None and size != total:
+                    raise IncompleteDownloadError(f"文件不完整: 已下载 {size} 字节，应为 {total} 字节")
+                self.mirrors.record_success(url, received, time.monotonic() - started)
+                await asyncio.to_thread(os.replace, part_path, filepath)
+                return True
+            except (IncompleteDownloadError, MirrorSwitchError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.mirrors.record_failure(url)
+                if isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+                    health.record_failure()
+                size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                if isinstance(e, IncompleteDownloadError) and (total is None or size >= total):
+                    os.remove(part_path); size = 0
+                if attempt == attempts:
+                    raise
+                next_host = self.mirrors.host_of(urls[attempt % len(urls)])
+                print(f"  [重试] 下载中断 ({e})，已保存 {size} 字节，第 {attempt} 次续传 ({next_host})...")
+                # 换到其他镜像时立即重试，所有镜像都试过一轮后再退避
+                if attempt >= len(urls) and not await self._sleep(CDN_RETRY.delay(attempt - len(urls) + 1)):
+                    return False
+        return False
+
+    async def _fetch_pages(self, crawl: Dict, pages: asyncio.Queue):
+        """生产者：按游标依次获取分页数据放入预取队列，结束时放入None作为结束标记。
+        列表正常走完 (或增量模式遇到已同步过的页) 时把 crawl['completed'] 置为True"""
+        cursor = 0; page = 1
+        entity_name = crawl['entity_name']; folder_name = crawl['sub_folder']
+        saved = crawl['checkpoint'].saved if crawl['checkpoint'] else None
+        if saved:
+            # 从上次提交的游标继续，而不是从第1页重新开始
+            cursor, page, folder_name = saved['cursor'], saved['page'] + 1, saved['folder_name']
+        try:
+            while not self._stop_requested:
+                print(f"\n  正在获取第 {page} 页{entity_name}...")
+                request_params = crawl['base_params'].copy()
+                request_params.update({"cursor": cursor, "count": 20})
+
+                data = await self._fetch_data(crawl['api_url'], request_params, validate=is_complete_page)
+                if data is None:
+                    # 获取失败的页不能当作最后一页，保留断点，下次从这一页继续
+                    print(f"  第 {page} 页{entity_name}多次重试后仍获取失败，停止获取后续页面。")
+                    break
+                if not data.get('aweme_list'):
+                    print(f"  已到达{entity_name}列表的最后一页。")
+                    crawl['completed'] = True
+                    break
+
+                if page == 1 and crawl['name_key']:
+                    folder_name, dynamic_name = resolve_folder_name(data, crawl['sub_folder'], crawl['name_key'])
+                    print(f"  {entity_name}名称: {dynamic_name}")
+
+                aweme_list = data['aweme_list']
+                note_newest(crawl, aweme_list)
+                await pages.put((page, folder_name, aweme_list, data.get('cursor', 0)))
+
+                # 检查是否有更多数据
+                if not data.get('has_more'):
+                    print(f"\n所有{entity_name}列表已获取完毕。")
+                    crawl['completed'] = True
+                    break
+
+                # 增量模式: 整页都是已同步过的作品，更早的作品无需再获取
+                if crawl['incremental'] and await asyncio.to_thread(page_is_known, crawl['known_index'], aweme_list,
+                                                                    crawl['sync_state'], crawl['assets']):
+                    print(f"\n  [增量] 第 {page} 页{entity_name}均已同步过，停止获取更早的作品。")
+                    crawl['completed'] = True
+                    break
+
+                # 更新游标
+                cursor = data.get('cursor', 0)
+                page += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"  获取{entity_name}列表时发生错误: {e}")
+        await pages.put(None)
+
+    def _state_mode(self, mode: str) -> str:
+        """与Downloader._state_mode相同"""
+        if self.metadata_only:
+            return f"{mode}:metadata"
+        if self.assets != (VIDEO,):
+            return f"{mode}:{'+'.join(self.assets)}"
+        return mode
+
+    async def _paginated_download(self, api_url: str, specific_params: dict, sub_folder: str, entity_name: str,
+                                  name_key: str = None, mode: str = "", target: str = None, sync_key: str = None,
+                                  incremental: bool = False) -> Dict[str, int]:
+        """通用的分页下载逻辑：预取分页与视频下载在同一事件循环上并发进行"""
+        base_params = BASE_API_PARAMS.copy()
+        base_params.update(specific_params)
+        state_mode = self._state_mode(mode)
+        crawl = {
+            "api_url": api_url, "base_params": base_params, "sub_folder": sub_folder,
+            "entity_name": entity_name, "name_key": name_key, "incremental": incremental,
+            "sync_state": await asyncio.to_thread(self.index.get_sync_state, state_mode, sync_key) if sync_key else None,
+            "checkpoint": await asyncio.to_thread(CrawlCheckpoint, self.index, state_mode, target) if target else None,
+            "known_index": None if self.metadata_only else self.index, "assets": self.assets,
+            "completed": False, "newest": (0, ""),
+        }
+        checkpoint = crawl['checkpoint']
+        if incremental and crawl['sync_state']:
+            last_sync = time.strftime('%Y-%m-%d %H:%M', time.localtime(crawl['sync_state']['updated_at']))
+            print(f"  [增量] 上次同步时间: {last_sync}，只获取之后发布的{entity_name}。")
+
+        results = CrawlResults(checkpoint)
+        stats = results.stats
+        slots = asyncio.Semaphore(self.max_workers)
+        pages = asyncio.Queue(maxsize=self.prefetch_pages)
+        tasks = set()
+
+        async def download(job, page, aweme_id):
+            """执行并记账，与Downloader中的run_job一致: 抛出异常的作品计为失败"""
+            try:
+                try:
+                    status = await job
+                except Exception as e:
+                    status = results.failure(aweme_id, e)
+            finally:
+                slots.release()
+            await asyncio.to_thread(results.record, page, aweme_id, status)
+
+        async def schedule(job, page, aweme_id) -> bool:
+            await slots.acquire()
+            if self._stop_requested:
+                slots.release()
+                job.close()
+                return False
+            task = asyncio.create_task(download(job, page, aweme_id))
+            results.scheduled()
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            return True
+
+        producer = asyncio.create_task(self._fetch_pages(crawl, pages))
+        try:
+            if checkpoint and checkpoint.saved:
+                saved = checkpoint.saved
+                failed_ids = await asyncio.to_thread(checkpoint.failed_items)
+                print(f"  [断点] 从第 {saved['page'] + 1} 页继续获取{entity_name}。")
+                if failed_ids:
+                    print(f"  [断点] 重试上次失败的 {len(failed_ids)} 个作品。")
+                for aweme_id in failed_ids:
+                    if not await schedule(self._download_by_id(aweme_id, saved['folder_name'], mode), saved['page'], aweme_id):
+                        break
+
+            while not self._stop_requested:
+                item = await pages.get()
+                if item is None:
+                    break
+                page, folder_name, aweme_list, next_cursor = item
+                if self.metadata_only:
+                    # 只保存作品信息，不下载视频，写完即可提交本页进度
+                    results.add_saved(await asyncio.to_thread(self._save_metadata, aweme_list, mode, target))
+                    if checkpoint:
+                        await asyncio.to_thread(checkpoint.commit_page, page, folder_name, next_cursor)
+                    continue
+                if checkpoint:
+                    await asyncio.to_thread(checkpoint.add_page, page, folder_name, next_cursor,
+                                            [aweme['aweme_id'] for aweme in aweme_list])
+                for aweme in aweme_list:
+                    if not await schedule(self._download_single_video(aweme, folder_name, mode), page, aweme['aweme_id']):
+                        break
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if self._stop_requested:
+                print(f"\n  [停止] 用户请求停止{entity_name}下载")
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            await asyncio.to_thread(self.mirrors.save)
+
+        finished = crawl['completed'] and not self._stop_requested
+        stats['completed'] = finished
+        if checkpoint:
+            if finished:
+                await asyncio.to_thread(checkpoint.finish)
+            elif await asyncio.to_thread(self.index.get_checkpoint, state_mode, target):
+                print(f"  [断点] {entity_name}进度已保存，下次运行将从中断处继续。")
+
+        if sync_key and results.may_advance_sync(finished) and crawl['newest'][0]:
+            await asyncio.to_thread(self.index.update_sync_state, state_mode, sync_key, crawl['newest'][1], crawl['newest'][0])
+
+        if self.metadata_only:
+            print(f"\n{entity_name}处理完毕: 保存 {stats['saved']} 条作品信息。")
+        else:
+            print(f"\n{entity_name}处理完毕: 下载 {stats['downloaded']} 个，链接 {stats['linked']} 个，"
+                  f"跳过 {stats['skipped']} 个，失败 {stats['failed']} 个。")
+        print(f"  [签名] {get_signer().summary()} (本进程累计)")
+        return stats
+
+    async def download_from_post(self, user_url: str, incremental: bool = False):
+        """下载用户主页作品，incremental为True时只同步上次之后发布的作品"""
+        print(f"\n开始下载主页作品: {user_url}")
+        match = re.search(r'user/(MS4wLjABAAAA[a-zA-Z0-9_-]+)', user_url)
+        if not match: print("错误：无法从URL中解析出sec_user_id。"); return
+        params = {"sec_user_id": match.group(1)}
+        return await self._paginated_download(USER_POST_API, params, sub_folder=match.group(1), entity_name="主页作品", mode="post",
+                                              target=match.group(1), sync_key=match.group(1), incremental=incremental)
+
+    async def download_from_favorite(self):
+        print("\n开始下载我的收藏作品...")
+        return await self._paginated_download(USER_FAVORITE_API, {}, sub_folder="MyFavorites", entity_name="收藏作品", mode="favorite",
+                                              target=self.account_key)
+
+    async def download_from_collection(self, collection_url: str):
+        print(f"\n开始下载合集作品: {collection_url}")
+        match = re.search(r'collection/(\d+)', collection_url)
+        if not match: print("错误：无法从URL中解析出合集ID。"); return
+        params = {"mix_id": match.group(1)}
+        return await self._paginated_download(USER_MIX_API, params, sub_folder="Mix", entity_name="合集作品", name_key='mix_info', mode="collection",
+                                              target=match.group(1))
+
+    async def download_from_like(self):
+        """下载用户点赞的作品"""
+        print("\n开始下载我的点赞作品...")
+        return await self._paginated_download(USER_LIKE_API, {}, sub_folder="MyLikes", entity_name="点赞作品", mode="like",
+                                              target=self.account_key)
+
+    async def download_from_collects(self, collects_url: str):
+        """下载收藏夹作品"""
+        print(f"\n开始下载收藏夹作品: {collects_url}")
+        match = re.search(r'collects/(\d+)', collects_url)
+        if not match: print("错误：无法从URL中解析出收藏夹ID。"); return
+        params = {"collects_id": match.group(1)}
+        return await self._paginated_download(USER_COLLECTS_API, params, sub_folder="MyCollects", entity_name="收藏夹作品", mode="collects",
+                                              target=match.group(1))
+
+    async def download_from_music(self, music_url: str):
+        """下载指定音乐的所有作品"""
+        print(f"\n开始下载音乐作品: {music_url}")
+        match = re.search(r'music/(\d+)', music_url)
+        if not match: print("错误：无法从URL中解析出音乐ID。"); return
+        params = {"music_id": match.group(1)}
+        return await self._paginated_download(MUSIC_API, params, sub_folder="Music", entity_name="音乐作品", mode="music",
+                                              target=match.group(1))
+
+    async def download_from_url(self, video_url: str):
+        """下载单个视频作品"""
+        print(f"\n开始下载单个视频: {video_url}")
+        try:
+            aweme_id = AwemeIdFetcher.get_aweme_id(video_url)
+            print(f"提取到的aweme_id: {aweme_id}")
+        except ValueError as e:
+            print(f"错误：{e}")
+            return
+
+        aweme = await self._fetch_aweme_detail(aweme_id)
+        if not aweme:
+            return
+        print(f"成功获取视频信息: {aweme.get('desc', '无描述')[:50]}...")
+        if self.metadata_only:
+            await asyncio.to_thread(self._save_metadata, [aweme], "one")
+            return 'saved'
+        try:
+            return await self._download_single_video(aweme, sub_folder="SingleVideos", mode="one")
+        finally:
+            await asyncio.to_thread(self.mirrors.save)
+
+    async def download_live(self, live_url: str):
+        """直播下载功能 (占位方法，与Downloader保持一致)"""
+        print(f"\n直播下载功能: {live_url}")
+        print("⚠️  直播下载功能尚未完全实现，这是一个占位方法。")
+
+    # 别名方法，确保与worker的调用兼容
+    async def download_from_mix(self, mix_url: str):
+        """别名方法，与download_from_collection功能相同"""
+        return await self.download_from_collection(mix_url)
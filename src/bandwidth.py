@@ -0,0 +1,137 @@
+# bandwidth.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# CDN下载限速：进程内全局限速与单个任务限速，支持按时段设置不同的速率
+
+import re
+import time
+import threading
+from typing import List, Optional, Tuple
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import BANDWIDTH_GLOBAL_LIMIT, BANDWIDTH_GLOBAL_SCHEDULE, BANDWIDTH_BURST_SECONDS
+
+UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+RATE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?\s*$", re.IGNORECASE)
+PERIOD_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(.+)$")
+# 计算当前时段速率的间隔 (秒)，避免每写一块数据都读一次本地时间
+RATE_REFRESH_INTERVAL = 1.0
+
+Schedule = List[Tuple[int, int, int]]  # (开始分钟, 结束分钟, 字节/秒)
+
+
+def parse_rate(text) -> int:
+    """把 "2M"、"512K"、"1.5MB/s"、"0" 等写法解析为字节/秒，0表示不限速"""
+    if isinstance(text, (int, float)):
+        return max(0, int(text))
+    match = RATE_PATTERN.match(str(text))
+    if not match:
+        raise ValueError(f"无法识别的速率: {text}")
+    return int(float(match.group(1)) * UNITS[match.group(2).upper()])
+
+
+def parse_schedule(text: str) -> Schedule:
+    """解析时段设置，如 "09:00-18:00=2M,18:00-09:00=0"。结束时间早于开始时间表示跨过午夜"""
+    schedule = []
+    for part in filter(None, (item.strip() for item in (text or "").split(','))):
+        match = PERIOD_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"无法识别的时段设置: {part} (格式: 09:00-18:00=2M)")
+        start_h, start_m, end_h, end_m, rate = match.groups()
+        start, end = int(start_h) * 60 + int(start_m), int(end_h) * 60 + int(end_m)
+        if start >= 24 * 60 or end > 24 * 60:
+            raise ValueError(f"无效的时间: {part}")
+        schedule.append((start, end, parse_rate(rate)))
+    return schedule
+
+
+def format_rate(rate: int) -> str:
+    if not rate:
+        return "不限速"
+    for unit in ("G", "M", "K"):
+        if rate >= UNITS[unit]:
+            return f"{rate / UNITS[unit]:.1f}{unit}B/s"
+    return f"{rate}B/s"
+
+
+class BandwidthLimiter:
+    """按字节计数的令牌桶。
+
+    consume()先扣除令牌 (允许欠账)，再返回调用方需要等待的秒数，多个线程同时下载时按先后顺序分摊速率。
+    当前时间落在schedule的某个时段内时使用该时段的速率，否则使用rate；速率为0表示不限速。
+    """
+
+    def __init__(self, name: str, rate=0, schedule: Schedule = None):
+        self.name = name
+        self.rate = parse_rate(rate)
+        self.schedule = schedule or []
+        self._current = self.rate
+        self._checked = float("-inf")
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate=None, schedule: Schedule = None):
+        """运行中修改速率或时段设置，下一块数据起生效"""
+        with self._lock:
+            if rate is not None:
+                self.rate = parse_rate(rate)
+            if schedule is not None:
+                self.schedule = schedule
+            self._checked = float("-inf")
+
+    def rate_at(self, minute_of_day: int) -> int:
+        for start, end, rate in self.schedule:
+            if start <= minute_of_day < end or (end < start and (minute_of_day >= start or minute_of_day < end)):
+                return rate
+        return self.rate
+
+    def _rate_now(self) -> int:
+        now = time.monotonic()
+        if now - self._checked >= RATE_REFRESH_INTERVAL:
+            local = time.localtime()
+            rate = self.rate_at(local.tm_hour * 60 + local.tm_min)
+            if rate != self._current:
+                print(f"  [限速] {self.name} 切换为 {format_rate(rate)}")
+                self._tokens = 0.0
+            self._current = rate
+            self._checked = now
+        return self._current
+
+    def consume(self, nbytes: int) -> float:
+        """记录即将写入的nbytes字节，返回为不超过速率需要等待的秒数"""
+        with self._lock:
+            rate = self._rate_now()
+            now = time.monotonic()
+            if not rate:
+                self._updated = now
+                return 0.0
+            self._tokens = min(rate * BANDWIDTH_BURST_SECONDS, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= nbytes
+            return -self._tokens / rate if self._tokens < 0 else 0.0
+
+
+def bandwidth_limiter_from_spec(name: str, rate=None, schedule: str = None) -> Optional[BandwidthLimiter]:
+    """由命令行或设置中的字符串构建限速器，两者都未设置时返回None"""
+    if not rate and not schedule:
+        return None
+    return BandwidthLimiter(name, rate or 0, parse_schedule(schedule))
+
+
+_global_limiter: Optional[BandwidthLimiter] = None
+_global_lock = threading.Lock()
+
+def get_global_bandwidth() -> BandwidthLimiter:
+    """进程内所有下载器共用的全局限速器 (默认值来自config中的BANDWIDTH_GLOBAL_*)"""
+    global _global_limiter
+    with _global_lock:
+        if _global_limiter is None:
+            _global_limiter = BandwidthLimiter("全局", BANDWIDTH_GLOBAL_LIMIT, parse_schedule(BANDWIDTH_GLOBAL_SCHEDULE))
+        return _global_limiter
@@ -0,0 +1,218 @@
+# bulk_downloader.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 批量下载：识别清单中各链接的类型，去重后交给同一个下载器并发处理，并生成逐条结果报告
+
+import os
+import re
+import json
+import time
+import asyncio
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import BULK_PARALLEL_TARGETS, BULK_RESOLVE_TIMEOUT
+from .http_client import get_http_session
+
+# (类型, 匹配规则, 规范化URL)。modal_id放在最前面: 主页/搜索页上打开的视频弹窗链接指向的是该视频
+URL_PATTERNS = [
+    ("video", re.compile(r"(?:modal_id=|video/|note/)(\d+)"), "https://www.douyin.com/video/{}"),
+    ("user", re.compile(r"user/(MS4wLjABAAAA[\w-]+)"), "https://www.douyin.com/user/{}"),
+    ("collection", re.compile(r"(?:collection|mix)/(\d+)"), "https://www.douyin.com/collection/{}"),
+    ("collects", re.compile(r"collects/(\d+)"), "https://www.douyin.com/collects/{}"),
+    ("music", re.compile(r"music/(\d+)"), "https://www.douyin.com/music/{}"),
+]
+SHORT_LINK_PATTERN = re.compile(r"https?://v\.douyin\.com/[\w-]+/?")
+URL_IN_TEXT_PATTERN = re.compile(r"https?://[^\s\"'<>，。]+")
+
+# 各类型对应的下载器入口
+KIND_METHODS = {
+    "video": "download_from_url",
+    "user": "download_from_post",
+    "collection": "download_from_collection",
+    "collects": "download_from_collects",
+    "music": "download_from_music",
+}
+
+# 报告中每条链接的状态
+OK = "ok"              # 全部完成
+PARTIAL = "partial"    # 部分作品失败或列表未完整获取
+FAILED = "failed"
+INVALID = "invalid"    # 无法识别的链接
+DUPLICATE = "duplicate"
+STOPPED = "stopped"
+
+
+def read_manifest(path: str) -> List[str]:
+    """读取链接清单: 每行一个链接，忽略空行和以#开头的注释行。
+    整段分享文案 ("复制打开抖音... https://v.douyin.com/xxx/") 只取其中的链接"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        lines = [line.strip() for line in f]
+    urls = []
+    for line in lines:
+        if not line or line.startswith('#'):
+            continue
+        match = URL_IN_TEXT_PATTERN.search(line)
+        urls.append(match.group(0) if match else line)
+    return urls
+
+
+def detect_url_type(url: str) -> Optional[Tuple[str, str]]:
+    """返回 (类型, 目标ID)，无法识别时返回None。短链接需先用resolve_short_url展开"""
+    for kind, pattern, _ in URL_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return kind, match.group(1)
+    return None
+
+
+def canonical_url(kind: str, key: str) -> str:
+    """把目标ID还原为下载器各入口都能解析的标准链接"""
+    return next(template for name, _, template in URL_PATTERNS if name == kind).format(key)
+
+
+def resolve_short_url(url: str, timeout: float = BULK_RESOLVE_TIMEOUT) -> str:
+    """跟随v.douyin.com短链接的跳转，返回最终地址 (只读取响应头，不下载正文)"""
+    response = get_http_session().get(url, allow_redirects=True, stream=True, timeout=timeout)
+    response.close()
+    return response.url
+
+
+class BulkDownloader:
+    """用一个下载器 (同一个连接池、限速器和下载记录) 处理整份链接清单。
+
+    同时处理parallel_targets个链接；同步下载器的视频下载线程池由所有链接共用，
+    因此总并发下载数仍是下载器的max_workers。停止信号沿用下载器的_stop_requested。
+    """
+
+    def __init__(self, downloader, parallel_targets: int = None, incremental: bool = False):
+        self.downloader = downloader
+        self.parallel_targets = max(1, parallel_targets or BULK_PARALLEL_TARGETS)
+        self.incremental = incremental  # 用户主页链接只同步上次之后发布的作品
+
+    @property
+    def stopped(self) -> bool:
+        return self.downloader._stop_requested
+
+    def _call(self, method, *args, **kwargs):
+        result = method(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            result = self.downloader.run(result)
+        return result
+
+    def _detect(self, row: Dict) -> Dict:
+        """识别一条链接的类型，短链接先展开"""
+        url = row['url']
+        try:
+            if SHORT_LINK_PATTERN.match(url):
+                url = resolve_short_url(url)
+        except requests.RequestException as e:
+            row.update(status=FAILED, error=f"短链接解析失败: {e}")
+            return row
+        detected = detect_url_type(url)
+        if not detected:
+            row.update(status=INVALID, error="无法识别的链接类型")
+            return row
+        row['kind'], row['target'] = detected
+        return row
+
+    def plan(self, urls: List[str]) -> List[Dict]:
+        """为每条链接生成一行结果；重复的目标标记为duplicate，只有第一条会被下载"""
+        rows = [{"url": url, "kind": None, "target": None, "status": None, "error": None} for url in urls]
+        with ThreadPoolExecutor(max_workers=self.parallel_targets * 2, thread_name_prefix="bulk-resolve") as pool:
+            list(pool.map(self._detect, rows))
+
+        seen = {}
+        for row in rows:
+            if row['status']:
+                continue
+            key = (row['kind'], row['target'])
+            if key in seen:
+                row.update(status=DUPLICATE, duplicate_of=seen[key])
+            else:
+                seen[key] = row['url']
+        return rows
+
+    def _run_row(self, row: Dict) -> Dict:
+        if self.stopped:
+            row['status'] = STOPPED
+            return row
+        method = getattr(self.downloader, KIND_METHODS[row['kind']])
+        url = canonical_url(row['kind'], row['target'])
+        kwargs = {"incremental": self.incremental} if row['kind'] == "user" else {}
+        started = time.monotonic()
+        try:
+            result = self._call(method, url, **kwargs)
+        except Exception as e:
+            result = None
+            row['error'] = f"{type(e).__name__}: {e}"
+        row['elapsed'] = round(time.monotonic() - started, 1)
+        self._classify(row, result)
+        return row
+
+    def _classify(self, row: Dict, result):
+        """根据下载器的返回值填写状态与统计"""
+        if isinstance(result, str):
+            # 单个视频: 返回 downloaded / linked / skipped / saved / failed / stopped
+            row['stats'] = {result: 1}
+            row['status'] = {"failed": FAILED, "stopped": STOPPED}.get(result, OK)
+        elif isinstance(result, dict):
+            row['stats'] = {key: result.get(key, 0) for key in ("downloaded", "linked", "skipped", "failed", "saved")}
+            done = sum(row['stats'][key] for key in ("downloaded", "linked", "skipped", "saved"))
+            if result.get('completed') and not result.get('failed'):
+                row['status'] = OK
+            elif self.stopped:
+                row['status'] = STOPPED
+            else:
+                row['status'] = PARTIAL if done else FAILED
+                if not result.get('completed'):
+                    row['error'] = "作品列表未完整获取"
+                else:
+                    row['error'] = f"{result['failed']} 个作品下载失败"
+        else:
+            row['status'] = STOPPED if self.stopped else FAILED
+        if row['status'] == FAILED and not row['error']:
+            row['error'] = "获取作品信息失败"
+
+    def run(self, urls: List[str]) -> List[Dict]:
+        """处理整份清单，按输入顺序返回每条链接的结果"""
+        rows = self.plan(urls)
+        pending = [row for row in rows if not row['status']]
+        print(f"\n批量下载: 共 {len(rows)} 条链接，待处理 {len(pending)} 个目标，"
+              f"同时处理 {self.parallel_targets} 个。")
+        with ThreadPoolExecutor(max_workers=self.parallel_targets, thread_name_prefix="bulk") as pool:
+            list(pool.map(self._run_row, pending))
+        return rows
+
+
+def summarize(rows: List[Dict]) -> Dict[str, int]:
+    """按状态统计链接数"""
+    summary = {}
+    for row in rows:
+        summary[row['status']] = summary.get(row['status'], 0) + 1
+    return summary
+
+
+def write_report(rows: List[Dict], path: str) -> str:
+    """把逐条结果写成JSON报告，返回报告路径"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    report = {
+        "generated_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "summary": summarize(rows),
+        "results": rows,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def default_report_path(download_path: str) -> str:
+    return os.path.join(download_path, f"bulk_report_{time.strftime('%Y%m%d-%H%M%S')}.json")
@@ -0,0 +1,258 @@
+# dedupe.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 按内容去重：并行计算下载目录中文件的校验和，把重复的文件替换为硬链接或reflink
+
+import os
+import re
+import sys
+import errno
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import DEFAULT_DOWNLOAD_PATH, DEDUPE_LINK_MODE, DEDUPE_WORKERS, DEDUPE_EXTENSIONS
+from .download_index import DownloadIndex, file_checksum, get_download_index
+from .assets import VIDEO
+
+# Linux上请求文件系统共享数据块 (btrfs、XFS等支持) 的ioctl编号
+FICLONE = 0x40049409
+# 替换过程中的临时链接名为 "原文件名.<进程号>-<随机串>.dedupe.tmp"，后台去重与下载同时运行时据此区分
+# 仍在使用的临时文件与进程异常退出留下的残留
+TMP_SUFFIX = ".dedupe.tmp"
+TMP_PATTERN = re.compile(r"\.(\d+)-[0-9a-f]+\.dedupe\.tmp$")
+_live_temps = set()
+_live_temps_lock = threading.Lock()
+
+
+def reflink(src: str, dst: str):
+    """创建与src共享数据块的副本dst (写时复制，修改其中一个不影响另一个)。文件系统不支持时抛出OSError"""
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "当前系统不支持reflink")
+    import fcntl
+    with open(src, 'rb') as source, open(dst, 'xb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(dst)
+            raise
+
+
+def link_file(src: str, dst: str, mode: str = DEDUPE_LINK_MODE) -> str:
+    """在dst (不能已存在) 处建立指向src内容的链接，返回实际使用的方式 "reflink" / "hardlink"；都失败时抛出OSError"""
+    error = None
+    if mode in ("auto", "reflink"):
+        try:
+            reflink(src, dst)
+            return "reflink"
+        except OSError as e:
+            error = e
+    if mode in ("auto", "hardlink"):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError as e:
+            error = e
+    raise error or OSError(errno.EINVAL, f"未知的链接方式: {mode}")
+
+
+def replace_with_link(src: str, dst: str, mode: str = DEDUPE_LINK_MODE) -> str:
+    """把已存在的dst原子地替换为指向src的链接"""
+    tmp_path = f"{dst}.{os.getpid()}-{uuid.uuid4().hex[:8]}{TMP_SUFFIX}"
+    with _live_temps_lock:
+        _live_temps.add(tmp_path)
+    try:
+        method = link_file(src, tmp_path, mode)
+        try:
+            os.replace(tmp_path, dst)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+    finally:
+        with _live_temps_lock:
+            _live_temps.discard(tmp_path)
+    return method
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        import ctypes
+        # PROCESS_QUERY_LIMITED_INFORMATION；无权限打开 (错误码5) 说明进程存在
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if handle:
+            ctypes.windll.kernel32.CloseHandle(handle)
+            return True
+        return ctypes.windll.kernel32.GetLastError() == 5
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # 进程存在但属于其他用户
+    return True
+
+
+def is_stale_temp(path: str) -> bool:
+    """临时链接是否为残留: 创建它的进程已退出，或本进程中已不在使用；旧版本不带进程号的临时文件一律视为残留"""
+    match = TMP_PATTERN.search(path)
+    if not match:
+        return True
+    pid = int(match.group(1))
+    if pid == os.getpid():
+        with _live_temps_lock:
+            return path not in _live_temps
+    return not _pid_alive(pid)
+
+
+def same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _note_copy(index: DownloadIndex, record: Dict, aweme_id: str, filepath: str):
+    """同一作品的副本记为链接；复用其他作品的资源 (如同一首配乐) 时为本作品新建下载记录"""
+    if record['aweme_id'] == str(aweme_id):
+        index.record_link(aweme_id, filepath, record['asset'])
+    else:
+        index.record(aweme_id, filepath, source=record['source'], checksum=record['checksum'],
+                     asset=record['asset'], content_id=record['content_id'])
+
+
+def place_known(index: DownloadIndex, record: Dict, aweme_id: str, filepath: str, mode: str = DEDUPE_LINK_MODE) -> str:
+    """已下载过的作品 (或同一份资源) 出现在另一个位置时，在filepath处建立指向已有文件的链接，不再经过网络。
+    返回 "linked"；该位置已有此文件或无法建立链接 (如跨磁盘) 时返回 "skipped" """
+    if os.path.exists(filepath):
+        if not same_file(record['path'], filepath):
+            _note_copy(index, record, aweme_id, filepath)  # 建立下载记录之前已存在的副本
+        print(f"  [跳过] '{os.path.basename(filepath)}' 已存在."); return "skipped"
+    try:
+        method = link_file(record['path'], filepath, mode)
+    except OSError as e:
+        print(f"  [跳过] '{os.path.basename(record['path'])}' 已下载过 ({record['source'] or '未知来源'})，无法建立链接: {e}")
+        return "skipped"
+    _note_copy(index, record, aweme_id, filepath)
+    print(f"  [链接] '{os.path.basename(filepath)}' 已下载过 ({record['source'] or '未知来源'})，通过{method}复用")
+    return "linked"
+
+
+def link_duplicate(index: DownloadIndex, aweme_id: str, filepath: str, mode: str = DEDUPE_LINK_MODE,
+                   asset: str = VIDEO) -> bool:
+    """刚下载完成的文件与另一作品的文件内容相同时 (如同一视频被重新发布)，替换为指向已有文件的链接"""
+    record = index.get(aweme_id, asset)
+    if not record or not record['checksum']:
+        return False
+    other = index.find_by_checksum(record['checksum'], record['size'], exclude=aweme_id, asset=asset)
+    if not other or same_file(other['path'], filepath):
+        return False
+    try:
+        method = replace_with_link(other['path'], filepath, mode)
+    except OSError:
+        return False
+    print(f"  [去重] '{os.path.basename(filepath)}' 与 '{os.path.basename(other['path'])}' 内容相同，已替换为{method}")
+    return True
+
+
+class Deduplicator:
+    """扫描下载目录，把内容相同的文件替换为链接。
+
+    只有大小相同的文件才需要计算校验和；下载记录中已有校验和的文件直接使用记录，
+    已经是同一个文件 (同一inode) 的多个路径只计算一次。每组重复文件保留最早的一份，其余替换为链接。
+    """
+
+    def __init__(self, root_dir: str = None, workers: int = None, mode: str = DEDUPE_LINK_MODE, dry_run: bool = False):
+        self.root_dir = os.path.abspath(root_dir or DEFAULT_DOWNLOAD_PATH)
+        self.workers = max(1, workers or DEDUPE_WORKERS)
+        self.mode = mode
+        self.dry_run = dry_run
+        self.index = get_download_index(self.root_dir)
+
+    def _scan(self) -> Dict[int, Dict[tuple, List[str]]]:
+        """返回 大小 -> {(设备, inode): [路径...]}，只保留可能重复的大小"""
+        by_size: Dict[int, Dict[tuple, List[str]]] = {}
+        for folder, _, files in os.walk(self.root_dir):
+            for name in files:
+                path = os.path.join(folder, name)
+                if name.endswith(TMP_SUFFIX):
+                    # 去重可能在下载进行中于后台运行，只删除已退出的进程留下的临时链接
+                    if is_stale_temp(path):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+                if not name.lower().endswith(DEDUPE_EXTENSIONS):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                by_size.setdefault(stat.st_size, {}).setdefault((stat.st_dev, stat.st_ino), []).append(path)
+        return {size: inodes for size, inodes in by_size.items() if size > 0 and len(inodes) > 1}
+
+    def _checksum(self, path: str, size: int, known: Dict[str, tuple]) -> Optional[str]:
+        if known.get(path, (None,))[0] == size:
+            return known[path][1]
+        try:
+            return file_checksum(path)
+        except OSError as e:
+            print(f"  [去重] 读取 '{path}' 失败: {e}")
+            return None
+
+    def run(self) -> Dict:
+        """执行去重，返回统计: 扫描的文件数、重复组数、替换的文件数、释放的字节数、失败数"""
+        candidates = self._scan()
+        known = self.index.known_checksums()
+        groups: Dict[tuple, List[tuple]] = {}  # (大小, 校验和) -> [(mtime, paths)]
+        jobs = [(size, paths) for size, inodes in candidates.items() for paths in inodes.values()]
+        summary = {"files": sum(len(paths) for _, paths in jobs), "groups": 0, "linked": 0, "reclaimed": 0, "errors": 0}
+        print(f"\n去重: {summary['files']} 个文件的大小与其他文件相同，开始计算校验和 ({self.workers} 个线程)...")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dedupe") as pool:
+            checksums = pool.map(lambda job: self._checksum(job[1][0], job[0], known), jobs)
+            for (size, paths), checksum in zip(jobs, checksums):
+                if checksum:
+                    groups.setdefault((size, checksum), []).append((os.path.getmtime(paths[0]), paths))
+
+        for (size, _), copies in groups.items():
+            if len(copies) < 2:
+                continue
+            summary['groups'] += 1
+            copies.sort()
+            source = copies[0][1][0]
+            for _, paths in copies[1:]:
+                replaced = 0
+                for path in paths:
+                    if self.dry_run:
+                        replaced += 1
+                        continue
+                    try:
+                        replace_with_link(source, path, self.mode)
+                        replaced += 1
+                    except OSError as e:
+                        summary['errors'] += 1
+                        print(f"  [去重] 无法把 '{path}' 替换为链接: {e}")
+                if replaced == len(paths):
+                    summary['reclaimed'] += size  # 同一inode的所有路径都指向源文件后，这份数据才被释放
+                summary['linked'] += replaced
+
+        action = "可替换" if self.dry_run else "已替换"
+        print(f"去重完成: {summary['groups']} 组重复文件，{action} {summary['linked']} 个文件，"
+              f"释放 {summary['reclaimed'] / 1024 / 1024:.1f} MB，失败 {summary['errors']} 个。")
+        return summary
+
+
+def start_background_dedupe(root_dir: str, **kwargs) -> threading.Thread:
+    """在后台线程中对下载目录执行一次去重"""
+    thread = threading.Thread(target=lambda: Deduplicator(root_dir, **kwargs).run(), name="dedupe", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,396 @@
+# download_index.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 以 (aweme_id, 资源类型) 为键的本地下载记录，替代按文件名判断是否已下载
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import DOWNLOAD_INDEX_FILE
+from .assets import VIDEO
+
+# 数据库结构版本 (PRAGMA user_version)，结构变化时递增并在_migrate中升级旧数据库
+SCHEMA_VERSION = 1
+
+DOWNLOADS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    aweme_id   TEXT NOT NULL,
+    asset      TEXT NOT NULL DEFAULT 'video',
+    path       TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    checksum   TEXT,
+    source     TEXT,
+    content_id TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (aweme_id, asset)
+);
+"""
+
+SCHEMA = DOWNLOADS_TABLE.format(name="downloads") + """
+CREATE INDEX IF NOT EXISTS idx_downloads_path ON downloads(path);
+CREATE INDEX IF NOT EXISTS idx_downloads_checksum ON downloads(checksum);
+CREATE INDEX IF NOT EXISTS idx_downloads_content ON downloads(asset, content_id);
+CREATE TABLE IF NOT EXISTS links (
+    path       TEXT PRIMARY KEY,
+    aweme_id   TEXT NOT NULL,
+    asset      TEXT NOT NULL DEFAULT 'video',
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_links_aweme ON links(aweme_id, asset);
+CREATE TABLE IF NOT EXISTS sync_state (
+    mode               TEXT NOT NULL,
+    target             TEXT NOT NULL,
+    newest_aweme_id    TEXT,
+    newest_create_time INTEGER,
+    updated_at         REAL NOT NULL,
+    PRIMARY KEY (mode, target)
+);
+CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+    mode        TEXT NOT NULL,
+    target      TEXT NOT NULL,
+    cursor      INTEGER,
+    page        INTEGER NOT NULL,
+    folder_name TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (mode, target)
+);
+CREATE TABLE IF NOT EXISTS crawl_items (
+    mode     TEXT NOT NULL,
+    target   TEXT NOT NULL,
+    aweme_id TEXT NOT NULL,
+    page     INTEGER NOT NULL,
+    status   TEXT NOT NULL,
+    PRIMARY KEY (mode, target, aweme_id)
+);
+"""
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadIndex:
+    """保存在下载目录中的SQLite下载记录。
+
+    每个线程使用独立连接，数据库开启WAL模式，CLI与GUI同时下载到同一目录时也可以安全读写。
+    路径以相对下载目录的形式保存，移动整个下载目录后记录依然有效。
+    """
+
+    def __init__(self, root_dir: str, db_name: str = DOWNLOAD_INDEX_FILE):
+        self.root_dir = os.path.abspath(root_dir)
+        os.makedirs(self.root_dir, exist_ok=True)
+        self.db_path = os.path.join(self.root_dir, db_name)
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+        self._claimed: Dict[str, str] = {}  # 正在下载的路径 -> aweme_id
+        self._content_claims: Dict[tuple, threading.Event] = {}  # 正在下载的共用资源 (资源类型, content_id) -> 完成事件
+        self._migrate(self._connect())
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _columns(conn: sqlite3.Connection, table: str) -> list:
+        return [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """升级旧版本的数据库。版本0的下载记录以aweme_id为主键且只有视频，迁移后资源类型记为video"""
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN IMMEDIATE")  # 多个进程同时打开时只有一个执行迁移
+        try:
+            columns = self._columns(conn, "downloads")
+            if columns and "asset" not in columns:
+                conn.execute(DOWNLOADS_TABLE.format(name="downloads_new"))
+                conn.execute("INSERT INTO downloads_new (aweme_id, asset, path, size, checksum, source, created_at) "
+                             "SELECT aweme_id, 'video', path, size, checksum, source, created_at FROM downloads")
+                conn.execute("DROP TABLE downloads")
+                conn.execute("ALTER TABLE downloads_new RENAME TO downloads")
+            columns = self._columns(conn, "links")
+            if columns and "asset" not in columns:
+                conn.execute("DROP INDEX IF EXISTS idx_links_aweme")
+                conn.execute("ALTER TABLE links ADD COLUMN asset TEXT NOT NULL DEFAULT 'video'")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _relpath(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root_dir)
+
+    def _abspath(self, relpath: str) -> str:
+        return os.path.join(self.root_dir, relpath)
+
+    def get(self, aweme_id: str, asset: str = VIDEO) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM downloads WHERE aweme_id = ? AND asset = ?",
+                                      (str(aweme_id), asset)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record['path'] = self._abspath(record['path'])
+        return record
+
+    def lookup(self, aweme_id: str, asset: str = VIDEO) -> Optional[Dict]:
+        """返回仍然有效的下载记录；文件已被删除或大小不符时改用该作品仍然存在的链接副本，都不存在时清除记录并返回None"""
+        record = self.get(aweme_id, asset)
+        if record is None:
+            return None
+        if self._size_matches(record['path'], record['size']):
+            return record
+        conn = self._connect()
+        key = (str(aweme_id), asset)
+        for row in conn.execute("SELECT path FROM links WHERE aweme_id = ? AND asset = ?", key).fetchall():
+            if self._size_matches(self._abspath(row['path']), record['size']):
+                conn.execute("UPDATE downloads SET path = ? WHERE aweme_id = ? AND asset = ?", (row['path'],) + key)
+                conn.execute("DELETE FROM links WHERE path = ?", (row['path'],))
+                return self.get(aweme_id, asset)
+        self.remove(aweme_id, asset)
+        return None
+
+    def find_by_content(self, asset: str, content_id: str) -> Optional[Dict]:
+        """返回同一份资源 (如同一首配乐) 仍然有效的任意一条下载记录"""
+        if not content_id:
+            return None
+        rows = self._connect().execute("SELECT aweme_id FROM downloads WHERE asset = ? AND content_id = ?",
+                                       (asset, str(content_id))).fetchall()
+        for row in rows:
+            record = self.lookup(row['aweme_id'], asset)
+            if record:
+                return record
+        return None
+
+    @staticmethod
+    def _size_matches(path: str, size: int) -> bool:
+        try:
+            return os.path.getsize(path) == size
+        except OSError:
+            return False
+
+    def owner_of(self, path: str) -> Optional[str]:
+        """返回占用该路径的aweme_id (下载的文件或链接副本)"""
+        relpath = self._relpath(path)
+        conn = self._connect()
+        row = (conn.execute("SELECT aweme_id FROM downloads WHERE path = ?", (relpath,)).fetchone()
+               or conn.execute("SELECT aweme_id FROM links WHERE path = ?", (relpath,)).fetchone())
+        return row['aweme_id'] if row else None
+
+    def record_link(self, aweme_id: str, path: str, asset: str = VIDEO):
+        """记录指向已下载作品的链接副本 (硬链接或reflink)"""
+        self._connect().execute("INSERT OR REPLACE INTO links (path, aweme_id, asset, created_at) VALUES (?, ?, ?, ?)",
+                                (self._relpath(path), str(aweme_id), asset, time.time()))
+
+    def find_by_checksum(self, checksum: str, size: int, exclude: str = None, asset: str = VIDEO) -> Optional[Dict]:
+        """返回内容相同 (校验和与大小一致) 且文件仍然存在的其他下载记录，exclude与asset指定要排除的记录"""
+        rows = self._connect().execute(
+            "SELECT aweme_id, asset FROM downloads WHERE checksum = ? AND size = ? AND NOT (aweme_id = ? AND asset = ?)",
+            (checksum, size, str(exclude or ""), asset)).fetchall()
+        for row in rows:
+            record = self.lookup(row['aweme_id'], row['asset'])
+            if record:
+                return record
+        return None
+
+    def known_checksums(self) -> Dict[str, tuple]:
+        """返回 绝对路径 -> (大小, 校验和)，供去重时跳过已计算过的文件"""
+        rows = self._connect().execute("SELECT path, size, checksum FROM downloads WHERE checksum IS NOT NULL").fetchall()
+        return {self._abspath(row['path']): (row['size'], row['checksum']) for row in rows}
+
+    def record(self, aweme_id: str, path: str, source: str = "", checksum: str = None, asset: str = VIDEO,
+               content_id: str = None):
+        """记录一次完成的下载"""
+        size = os.path.getsize(path)
+        checksum = checksum or file_checksum(path)
+        self._connect().execute(
+            "INSERT OR REPLACE INTO downloads (aweme_id, asset, path, size, checksum, source, content_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(aweme_id), asset, self._relpath(path), size, checksum, source,
+             str(content_id) if content_id else None, time.time()))
+
+    def remove(self, aweme_id: str, asset: str = VIDEO):
+        conn = self._connect()
+        conn.execute("DELETE FROM downloads WHERE aweme_id = ? AND asset = ?", (str(aweme_id), asset))
+        conn.execute("DELETE FROM links WHERE aweme_id = ? AND asset = ?", (str(aweme_id), asset))
+
+    def get_sync_state(self, mode: str, target: str) -> Optional[Dict]:
+        """返回某个下载目标 (如sec_user_id) 上次完整同步到的最新作品"""
+        row = self._connect().execute("SELECT * FROM sync_state WHERE mode = ? AND target = ?", (mode, target)).fetchone()
+        return dict(row) if row else None
+
+    def update_sync_state(self, mode: str, target: str, newest_aweme_id: str, newest_create_time: int):
+        """推进同步位置，只会向更新的作品移动"""
+        self._connect().execute(
+            "INSERT INTO sync_state (mode, target, newest_aweme_id, newest_create_time, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(mode, target) DO UPDATE SET "
+            "newest_aweme_id = CASE WHEN excluded.newest_create_time >= IFNULL(newest_create_time, 0) THEN excluded.newest_aweme_id ELSE newest_aweme_id END, "
+            "newest_create_time = MAX(IFNULL(newest_create_time, 0), excluded.newest_create_time), "
+            "updated_at = excluded.updated_at",
+            (mode, target, str(newest_aweme_id), int(newest_create_time), time.time()))
+
+    def get_checkpoint(self, mode: str, target: str) -> Optional[Dict]:
+        """返回上次中断的分页任务已提交的位置"""
+        row = self._connect().execute("SELECT * FROM crawl_checkpoints WHERE mode = ? AND target = ?", (mode, target)).fetchone()
+        return dict(row) if row else None
+
+    def save_checkpoint(self, mode: str, target: str, cursor, page: int, folder_name: str):
+        """提交分页进度：cursor为获取第page+1页所用的游标"""
+        self._connect().execute(
+            "INSERT OR REPLACE INTO crawl_checkpoints (mode, target, cursor, page, folder_name, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (mode, target, cursor, page, folder_name, time.time()))
+
+    def clear_checkpoint(self, mode: str, target: str):
+        """分页任务完整结束后清除进度与作品状态"""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DELETE FROM crawl_checkpoints WHERE mode = ? AND target = ?", (mode, target))
+            conn.execute("DELETE FROM crawl_items WHERE mode = ? AND target = ?", (mode, target))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_crawl_items(self, mode: str, target: str, page: int, aweme_ids: list):
+        """记录一页中待处理的作品"""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO crawl_items (mode, target, aweme_id, page, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(mode, target, str(aweme_id), page) for aweme_id in aweme_ids])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def set_crawl_item_status(self, mode: str, target: str, aweme_id: str, status: str):
+        self._connect().execute("UPDATE crawl_items SET status = ? WHERE mode = ? AND target = ? AND aweme_id = ?",
+                                (status, mode, target, str(aweme_id)))
+
+    def crawl_items_with_status(self, mode: str, target: str, status: str) -> list:
+        rows = self._connect().execute("SELECT aweme_id FROM crawl_items WHERE mode = ? AND target = ? AND status = ?",
+                                       (mode, target, status)).fetchall()
+        return [row['aweme_id'] for row in rows]
+
+    def claim_path(self, aweme_id: str, path: str) -> str:
+        """为作品选择保存路径。路径已属于其他作品 (已下载或正在下载) 时，在文件名后追加aweme_id"""
+        aweme_id = str(aweme_id)
+        with self._claim_lock:
+            owner = self._claimed.get(path) or self.owner_of(path)
+            if owner and owner != aweme_id:
+                base, ext = os.path.splitext(path)
+                path = f"{base}_{aweme_id}{ext}"
+            self._claimed[path] = aweme_id
+            return path
+
+    def release_path(self, path: str):
+        with self._claim_lock:
+            self._claimed.pop(path, None)
+
+    def claim_content(self, asset: str, content_id: str) -> Optional[threading.Event]:
+        """多个作品共用的资源 (如同一首配乐) 同一时间只由一个任务下载。
+        返回None表示由调用方下载，完成后调用release_content；否则返回正在下载的任务结束时会被设置的Event"""
+        key = (asset, str(content_id))
+        with self._claim_lock:
+            if key in self._content_claims:
+                return self._content_claims[key]
+            self._content_claims[key] = threading.Event()
+            return None
+
+    def release_content(self, asset: str, content_id: str):
+        with self._claim_lock:
+            event = self._content_claims.pop((asset, str(content_id)), None)
+        if event:
+            event.set()
+
+
+class CrawlCheckpoint:
+    """分页任务的断点记录。
+
+    一页的作品全部处理完成 (下载、跳过或失败)，且之前的页都已提交后，才提交该页之后的游标，
+    这样中断后从检查点恢复时不会漏掉仍在下载中的作品。finish()之后不再保存任何进度。
+    """
+
+    def __init__(self, index: DownloadIndex, mode: str, target: str):
+        self.index = index
+        self.mode = mode
+        self.target = target
+        self.saved = index.get_checkpoint(mode, target)  # 上次中断时已提交的位置
+        self._lock = threading.Lock()
+        self._pages: Dict[int, list] = {}  # 页码 -> [剩余作品数, 下一页游标, 文件夹名]
+        self._finished = False
+
+    def add_page(self, page: int, folder_name: str, next_cursor, aweme_ids: list):
+        self.index.add_crawl_items(self.mode, self.target, page, aweme_ids)
+        with self._lock:
+            self._pages[page] = [len(aweme_ids), next_cursor, folder_name]
+            self._commit_ready()
+
+    def item_done(self, page: int, aweme_id: str, status: str):
+        self.index.set_crawl_item_status(self.mode, self.target, aweme_id, status)
+        with self._lock:
+            if page in self._pages:
+                self._pages[page][0] -= 1
+                self._commit_ready()
+
+    def commit_page(self, page: int, folder_name: str, next_cursor):
+        """直接提交一页的进度 (只抓取作品信息时，每页处理完才会获取下一页)"""
+        with self._lock:
+            if not self._finished:
+                self.index.save_checkpoint(self.mode, self.target, next_cursor, page, folder_name)
+
+    def _commit_ready(self):
+        if self._finished:
+            return  # 列表已走完，迟到的结果不能重新写入断点
+        committed = None
+        for page in sorted(self._pages):
+            if self._pages[page][0] > 0:
+                break
+            committed = (page, self._pages.pop(page))
+        if committed:
+            page, (_, next_cursor, folder_name) = committed
+            self.index.save_checkpoint(self.mode, self.target, next_cursor, page, folder_name)
+
+    def failed_items(self) -> list:
+        return self.index.crawl_items_with_status(self.mode, self.target, "failed")
+
+    def finish(self):
+        with self._lock:
+            self._finished = True
+            self._pages.clear()
+            self.index.clear_checkpoint(self.mode, self.target)
+
+
+_indexes: Dict[str, DownloadIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_download_index(root_dir: str) -> DownloadIndex:
+    """同一进程内，同一下载目录共用一个DownloadIndex"""
+    key = os.path.abspath(root_dir)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = DownloadIndex(key)
+        return _indexes[key]
@@ -4,8 +4,15 @@
 
 import os
 import re
+import json
+import queue
+import sqlite3
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, Optional
+from urllib.parse import urlencode
 
 import sys
 import os
@@ -15,12 +22,29 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from config import HEADERS, DEFAULT_DOWNLOAD_PATH
+from config import (
+    DEFAULT_DOWNLOAD_PATH, DEFAULT_DOWNLOAD_WORKERS, DEFAULT_PREFETCH_PAGES, DOWNLOAD_RESUME_ATTEMPTS,
+    SEGMENT_THRESHOLD, SEGMENT_CONNECTIONS, SEGMENT_MIN_SIZE, MIRROR_STALL_TIMEOUT, METADATA_DIR_NAME,
+    WRITE_PREALLOCATE_MIN, DEDUPE_ON_DOWNLOAD
+)
 from .api_endpoints import (
     SINGLE_VIDEO_API, USER_POST_API, USER_LIKE_API, USER_FAVORITE_API,
     USER_COLLECTS_API, USER_MIX_API, MUSIC_API, LIVE_API
 )
-from .xbogus import ABogusManager
+from .xbogus import get_signer
+from .download_index import get_download_index, CrawlCheckpoint
+from .http_client import get_http_session, warm_up
+from .mirror_selector import get_mirror_stats
+from . import rate_limiter
+from .rate_limiter import looks_throttled, THROTTLE_STATUS_CODES
+from .account_pool import AccountPool, PUBLIC_APIS, account_key
+from .retry import API_RETRY, CDN_RETRY, get_host_health
+from .metadata_sink import MetadataSink
+from .bandwidth import BandwidthLimiter, get_global_bandwidth
+from .dedupe import place_known, link_duplicate
+from .quality_selector import QualitySelector, describe, rendition_key
+from .assets import VIDEO, ASSET_NAMES, parse_assets, asset_urls, asset_content_id, asset_extension
+from .stream_writer import copy_response, preallocate, recover_preallocated, PREALLOC_SUFFIX
 
 # 通用的请求参数，确保所有分页请求都能成功
 BASE_API_PARAMS = {
@@ -29,6 +53,178 @@ BASE_API_PARAMS = {
     "channel": "channel_pc_web",
 }
 
+# 未完成下载的临时文件后缀
+PART_SUFFIX = ".part"
+# 分段下载进度文件后缀 (与 .part 文件放在一起)
+SEGMENT_STATE_SUFFIX = ".segments.json"
+# 记录 .part 文件属于哪个清晰度版本的文件后缀，默认的play_addr版本不写该文件
+QUALITY_SUFFIX = ".quality"
+
+class MirrorSwitchError(requests.RequestException):
+    """当前镜像卡住、过慢或与其他镜像的文件不一致，需要换镜像续传"""
+
+class IncompleteDownloadError(requests.RequestException):
+    """下载到的数据长度与服务器声明的长度不一致"""
+
+# 一个作品下载多种资源时，按此顺序取最需要关注的状态作为作品的结果
+STATUS_PRIORITY = ("stopped", "failed", "downloaded", "linked", "saved", "skipped")
+
+def combine_statuses(statuses: list) -> str:
+    return min(statuses, key=lambda status: STATUS_PRIORITY.index(status) if status in STATUS_PRIORITY else len(STATUS_PRIORITY))
+
+def prepare_partial(filepath: str, rendition: Dict):
+    """续传前确认临时文件与本次要下载的版本一致，清晰度设置改变后丢弃旧版本已下载的部分"""
+    part_path = filepath + PART_SUFFIX
+    marker_path = part_path + QUALITY_SUFFIX
+    key = rendition_key(rendition)
+    previous = ""
+    if os.path.exists(marker_path):
+        with open(marker_path, 'r', encoding='utf-8') as marker:
+            previous = marker.read().strip()
+    if previous != key:
+        for path in (part_path, part_path + SEGMENT_STATE_SUFFIX, part_path + PREALLOC_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+    if key:
+        with open(marker_path, 'w', encoding='utf-8') as marker:
+            marker.write(key)
+    elif previous:
+        os.remove(marker_path)
+
+def finish_partial(filepath: str):
+    marker_path = filepath + PART_SUFFIX + QUALITY_SUFFIX
+    if os.path.exists(marker_path):
+        os.remove(marker_path)
+
+def parse_total_size(headers, status_code: int, offset: int = 0) -> Optional[int]:
+    """从响应头中解析文件总大小，206响应读取Content-Range，200响应读取Content-Length"""
+    content_range = headers.get('Content-Range', '')
+    if status_code == 206 or content_range:
+        total = content_range.rsplit('/', 1)[-1] if '/' in content_range else ''
+        return int(total) if total.isdigit() else None
+    content_length = headers.get('Content-Length', '')
+    return offset + int(content_length) if content_length.isdigit() else None
+
+def plan_segments(total: int, connections: int = SEGMENT_CONNECTIONS, min_size: int = SEGMENT_MIN_SIZE) -> list:
+    """把 [0, total) 切分为若干字节区间，每段不小于min_size"""
+    count = max(1, min(connections, total // max(1, min_size)))
+    step = -(-total // count)
+    return [{"start": start, "end": min(start + step, total) - 1, "done": 0} for start in range(0, total, step)]
+
+INVALID_FILENAME_CHARS = r'\/:*?"<>|'
+
+def sanitize_filename(name: str, max_length: int = None) -> str:
+    """去掉文件名中的非法字符"""
+    valid_name = "".join(c for c in name if c not in INVALID_FILENAME_CHARS).strip()
+    return valid_name[:max_length] if max_length else valid_name
+
+def resolve_folder_name(data: Dict, sub_folder: str, name_key: str = None) -> tuple:
+    """根据第一页数据中的合集/音乐信息生成保存目录名，返回 (目录名, 显示名称)"""
+    if not name_key:
+        return sub_folder, None
+    info_dict = data.get(name_key, {})
+    dynamic_name = info_dict.get('mix_name') or info_dict.get('name', sub_folder)
+    return f"{sub_folder}_{sanitize_filename(dynamic_name)}", dynamic_name
+
+def is_complete_page(data: Dict) -> bool:
+    """分页接口返回的数据是否完整: 必须带有has_more，且声称还有更多时作品列表不能为空"""
+    return isinstance(data, dict) and 'has_more' in data and (bool(data.get('aweme_list')) or not data.get('has_more'))
+
+def note_newest(crawl: Dict, aweme_list: list):
+    """记录本次获取到的最新作品 (create_time最大)。置顶作品可能很旧也可能很新，不参与记录"""
+    for aweme in aweme_list:
+        if aweme.get('is_top'):
+            continue
+        create_time = aweme.get('create_time') or 0
+        if create_time > crawl['newest'][0]:
+            crawl['newest'] = (create_time, str(aweme.get('aweme_id', '')))
+
+def page_is_known(index, aweme_list: list, sync_state: Optional[Dict], assets: tuple = (VIDEO,)) -> bool:
+    """判断一页作品是否都已同步过: 要下载的资源都已在下载记录中 (index为None时不查)，或不晚于上次同步到的最新作品。
+    置顶作品不参与判断"""
+    newest_time = (sync_state or {}).get('newest_create_time') or 0
+    checked = 0
+    for aweme in aweme_list:
+        if aweme.get('is_top'):
+            continue
+        checked += 1
+        if ((aweme.get('create_time') or 0) > newest_time
+                and not (index and all(index.get(aweme['aweme_id'], asset) for asset in assets))):
+            return False
+    return checked > 0
+
+class CrawlResults:
+    """分页下载的结果统计，线程池与asyncio两种下载引擎共用。
+
+    每个提交的作品任务调用一次scheduled()，结束时 (无论正常返回还是抛出异常) 调用一次record()；
+    record同时更新统计与断点。只有所有任务都已记账、完整走完列表且没有失败时才可推进同步位置。
+    """
+
+    def __init__(self, checkpoint: Optional[CrawlCheckpoint] = None):
+        self.checkpoint = checkpoint
+        self.stats = {"downloaded": 0, "linked": 0, "skipped": 0, "failed": 0, "saved": 0}
+        self.submitted = 0
+        self.accounted = 0
+        self._lock = threading.Lock()
+
+    def scheduled(self):
+        with self._lock:
+            self.submitted += 1
+
+    def failure(self, aweme_id: str, error: Exception) -> str:
+        """任务抛出异常时按失败处理"""
+        print(f"  [错误] 作品 {aweme_id} 处理失败: {error}")
+        return "failed"
+
+    def record(self, page: int, aweme_id: str, status: str):
+        if status in self.stats:
+            with self._lock:
+                self.stats[status] += 1
+            # 被停止的作品不算处理完成，该页的游标不会提交
+            if self.checkpoint:
+                self.checkpoint.item_done(page, aweme_id, status)
+        with self._lock:
+            self.accounted += 1
+
+    def add_saved(self, count: int):
+        with self._lock:
+            self.stats['saved'] += count
+
+    def may_advance_sync(self, finished: bool) -> bool:
+        """只有完整走完列表、所有作品的结果都已计入且没有失败时才推进同步位置，否则下次增量同步可能漏掉作品"""
+        with self._lock:
+            return finished and self.accounted == self.submitted and not self.stats['failed']
+
+def build_detail_params(aweme_id: str, user_agent: str) -> Dict:
+    """构建单个作品详情接口的完整参数（包含基础参数与ABogus参数）"""
+    # 使用F2项目风格的参数传递方式: 只对作品参数签名
+    params = {"aweme_id": aweme_id}
+
+    # 构建完整的参数（包含基础参数）
+    full_params = BASE_API_PARAMS.copy()
+    full_params.update(params)
+
+    # 添加ABogus参数，签名器缓存了与User-Agent有关的数据
+    try:
+        full_params['a_bogus'] = get_signer().signature(user_agent, urlencode(params))
+    except Exception as e:
+        print(f"ABogus参数处理失败，使用基础参数: {e}")
+        # 即使ABogus失败，也要确保有a_bogus参数
+        full_params['a_bogus'] = '0'  # 使用默认值
+
+    return full_params
+
+def sign_params(params: Dict, user_agent: str) -> Dict:
+    """签名阶段: 所有API请求发出前经过进程内共用的签名器加上a_bogus。
+    已带有a_bogus的参数 (作品详情只对作品参数签名，见build_detail_params) 原样返回；签名失败时与作品详情一样使用'0'"""
+    if 'a_bogus' in params:
+        return params
+    try:
+        return get_signer().sign(params, user_agent)
+    except Exception as e:
+        print(f"ABogus参数处理失败，使用基础参数: {e}")
+        return dict(params, a_bogus='0')
+
 class AwemeIdFetcher:
     """从抖音URL中提取aweme_id的简单实现"""
 
@@ -51,109 +247,707 @@ class AwemeIdFetcher:
 class Downloader:
     """负责所有视频下载任务"""
 
-    def __init__(self, cookie: str, download_path: str = None):
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
-        self.session.headers['Cookie'] = cookie
+    def __init__(self, cookie: str, download_path: str = None, max_workers: int = None, metadata_only: bool = False,
+                 account_pool: AccountPool = None, bandwidth: BandwidthLimiter = None, quality: QualitySelector = None,
+                 assets=None):
+        self.session = get_http_session()  # 所有下载器共享的连接池
+        # 共享Session不保存Cookie，账号Cookie随API请求单独发送
+        self.own_account = AccountPool([(None, cookie)])
+        # 公开接口的请求可由账号池中的多个账号分担，点赞、收藏等始终使用本账号
+        self.account_pool = account_pool if account_pool and len(account_pool) > 1 else None
         self.download_path = download_path if download_path else DEFAULT_DOWNLOAD_PATH
         os.makedirs(self.download_path, exist_ok=True)
+        self.index = get_download_index(self.download_path)  # 以aweme_id为键的下载记录
+        self.mirrors = get_mirror_stats(self.download_path)  # CDN镜像的速度与出错统计
+        self.max_workers = max(1, max_workers or DEFAULT_DOWNLOAD_WORKERS)  # 并发下载视频数
+        self.prefetch_pages = DEFAULT_PREFETCH_PAGES  # 分页预取队列长度
+        self.account_key = account_key(cookie)  # 点赞、收藏等与账号相关的列表以此区分断点
+        self.metadata_only = metadata_only  # 只把作品信息写入JSONL，不下载视频
+        # 在创建时建好 (文件在第一次写入时才打开)，批量下载并行处理多个目标时不会各自创建一个
+        self._metadata_sink = MetadataSink(os.path.join(self.download_path, METADATA_DIR_NAME)) if metadata_only else None
+        self.bandwidth = bandwidth  # 本任务的CDN下载限速，另外还受进程内全局限速约束
+        self._global_bandwidth = get_global_bandwidth()
+        self.quality = quality or QualitySelector()  # 从作品的多个码率版本中选择要下载的版本
+        self.assets = parse_assets(assets)  # 要下载的资源: video / audio / cover
+        self._pool = None  # 同一下载器的所有任务共用的视频下载线程池
+        self._pool_lock = threading.Lock()
         self._stop_requested = False  # 停止标志
-        print("下载器初始化完成。")
-
-    def _fetch_data(self, url: str, params: Dict) -> Optional[Dict]:
-        try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.JSONDecodeError:
-            print("请求API失败: 服务器未返回有效的JSON数据，可能已被风控。")
-            return None
-        except requests.RequestException as e:
-            print(f"请求API失败: {e}")
-            return None
-
-    def _download_single_video(self, aweme: Dict, sub_folder: str = ""):
+        print(f"下载器初始化完成，并发数: {self.max_workers}。" + (" (只抓取作品信息)" if metadata_only else "")
+              + (f" (下载: {'、'.join(ASSET_NAMES[asset] for asset in self.assets)})" if self.assets != (VIDEO,) else "")
+              + (f" (公开接口由 {len(self.account_pool)} 个账号分担)" if self.account_pool else ""))
+
+    def _sleep(self, seconds: float) -> bool:
+        """可被停止请求打断的等待，被打断时返回False"""
+        deadline = time.monotonic() + seconds
+        while not self._stop_requested:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.2))
+        return False
+
+    def _throttle(self, nbytes: int) -> float:
+        """写入nbytes字节后按全局限速与本任务限速等待，返回等待的秒数 (计算镜像速度时扣除)"""
+        wait = self._global_bandwidth.consume(nbytes)
+        if self.bandwidth:
+            wait = max(wait, self.bandwidth.consume(nbytes))
+        if wait <= 0:
+            return 0.0
+        started = time.monotonic()
+        self._sleep(wait)
+        return time.monotonic() - started
+
+    def _fetch_data(self, url: str, params: Dict, validate=None) -> Optional[Dict]:
+        """请求API并返回JSON。参数在发出前经过sign_params签名；请求经过所用账号在该接口上的限速器 (公开接口可由账号池中任一账号发出)；失败或疑似风控时按指数退避加随机抖动重试，
+        超时时间取该主机近期延迟的分位数，主机连续失败时熔断。validate用于校验返回内容是否完整。
+        重试用尽或用户停止时返回None"""
+        accounts = self.account_pool if self.account_pool and url in PUBLIC_APIS else self.own_account
+        health = get_host_health(url)
+        user_agent = self.session.headers.get("User-Agent", "")
+        for attempt in range(1, API_RETRY.attempts + 1):
+            while (wait := health.allow()) > 0:
+                if not self._sleep(min(wait, 1.0)):
+                    return None
+            account = accounts.acquire(url, lambda: self._stop_requested)
+            if account is None:
+                return None
+            outcome = rate_limiter.ERROR
+            data = None
+            # 每次尝试重新签名，签名中的时间戳不会因退避等待而过期
+            signed_params = sign_params(params, user_agent)
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, params=signed_params, headers=account.headers, timeout=(5, health.timeout(10)))
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    outcome = rate_limiter.THROTTLED
+                    error = f"HTTP {response.status_code}，可能已被风控"
+                elif 400 <= response.status_code < 500 and response.status_code != 408:
+                    health.record_success(time.monotonic() - started)
+                    print(f"请求API失败: HTTP {response.status_code}")
+                    return None  # 请求本身有误，重试也不会成功
+                else:
+                    response.raise_for_status()
+                    data = response.json()
+                    if looks_throttled(data):
+                        outcome = rate_limiter.THROTTLED
+                        error = "作品列表为空但仍有更多数据，可能已被风控"
+                    elif validate and not validate(data):
+                        error = "返回的数据不完整"
+                    else:
+                        outcome = rate_limiter.OK
+            except requests.exceptions.JSONDecodeError:
+                outcome = rate_limiter.THROTTLED
+                error = "服务器未返回有效的JSON数据，可能已被风控"
+            except requests.RequestException as e:
+                error = str(e)
+            finally:
+                accounts.release(account, url, outcome)
+
+            if outcome == rate_limiter.ERROR:
+                health.record_failure()
+            else:
+                # 被风控也说明主机可以正常响应，不计入熔断
+                health.record_success(time.monotonic() - started)
+            if outcome == rate_limiter.OK:
+                return data
+            if attempt == API_RETRY.attempts:
+                print(f"请求API失败: {error}，已重试 {attempt - 1} 次，放弃。")
+                break
+            delay = API_RETRY.delay(attempt)
+            print(f"请求API失败: {error}，{delay:.1f} 秒后第 {attempt} 次重试...")
+            if not self._sleep(delay):
+                break
+        return None
+
+    def _download_single_video(self, aweme: Dict, sub_folder: str = "", mode: str = "") -> str:
+        """下载一个作品的资源 (默认只有视频，见self.assets)，返回 'downloaded' / 'linked' / 'skipped' / 'failed' / 'stopped'"""
+        return combine_statuses([self._download_asset(aweme, asset, sub_folder, mode) for asset in self.assets])
+
+    def _download_asset(self, aweme: Dict, asset: str, sub_folder: str = "", mode: str = "") -> str:
+        """下载作品的一种资源 (视频、音频或封面)"""
+        desc = aweme.get('desc', '') or aweme.get('aweme_id', '')
+        name = ASSET_NAMES[asset]
+        content_id = asset_content_id(aweme, asset)
+        claimed = False
         try:
-            video_url = aweme['video']['play_addr']['url_list'][0]
-            desc = aweme.get('desc', aweme['aweme_id'])
-            valid_desc = "".join(c for c in desc if c not in r'\/:*?"<>|').strip()[:50]
+            if self._stop_requested:
+                return "stopped"
+            aweme_id = aweme['aweme_id']
+            record = self.index.lookup(aweme_id, asset)
+            if record and not DEDUPE_ON_DOWNLOAD:
+                print(f"  [跳过] '{os.path.basename(record['path'])}' 已下载过 ({record['source'] or '未知来源'})."); return "skipped"
+            urls = asset_urls(aweme, asset)
+            while not record and content_id and DEDUPE_ON_DOWNLOAD:
+                record = self.index.find_by_content(asset, content_id)  # 其他作品已下载过同一份资源
+                if record:
+                    break
+                pending = self.index.claim_content(asset, content_id)
+                if pending is None:
+                    claimed = True
+                    break
+                # 其他任务正在下载同一份资源，等它完成后直接建立链接
+                while not pending.wait(0.2):
+                    if self._stop_requested:
+                        return "stopped"
+            if not urls and not record:
+                if asset != VIDEO:
+                    print(f"  [跳过] 作品 '{desc[:20]}' 没有{name}."); return "skipped"
+                raise IndexError("作品没有可用的视频地址")
+            desc = aweme.get('desc', aweme_id)
+            valid_desc = sanitize_filename(desc, 50)
             save_dir = os.path.join(self.download_path, sub_folder)
             os.makedirs(save_dir, exist_ok=True)
-            filepath = os.path.join(save_dir, f"{valid_desc}.mp4")
-            if os.path.exists(filepath):
-                print(f"  [跳过] '{os.path.basename(filepath)}' 已存在."); return
-            print(f"  [下载] 正在下载: '{os.path.basename(filepath)}'")
-            video_response = requests.get(video_url, headers=HEADERS, stream=True, timeout=30)
-            video_response.raise_for_status()
-            with open(filepath, 'wb') as f:
-                for chunk in video_response.iter_content(chunk_size=8192): f.write(chunk)
-        except (KeyError, IndexError, requests.RequestException) as e:
-            print(f"  [失败] 下载视频 '{desc[:20]}...' 时发生错误: {e}")
-
-    def _paginated_download(self, api_url: str, specific_params: dict, sub_folder: str, entity_name: str, name_key: str = None):
-        """通用的分页下载逻辑"""
-        cursor = 0; page = 1; folder_name = sub_folder
-        base_params = BASE_API_PARAMS.copy()
-        base_params.update(specific_params)
-
+            ext = os.path.splitext(record['path'])[1] if record else asset_extension(urls, asset)
+            filepath = self.index.claim_path(aweme_id, os.path.join(save_dir, f"{valid_desc}{ext}"))
+            try:
+                if record:
+                    # 已在其他文件夹下载过: 建立链接，不再下载
+                    return place_known(self.index, record, aweme_id, filepath)
+                if os.path.exists(filepath):
+                    # 建立下载记录之前已下载的文件，补充记录后跳过
+                    self.index.record(aweme_id, filepath, source=mode, asset=asset, content_id=content_id)
+                    print(f"  [跳过] '{os.path.basename(filepath)}' 已存在."); return "skipped"
+                rendition = self.quality.select(aweme) if asset == VIDEO else {"url_list": urls, "data_size": None}
+                if rendition is None:
+                    print(f"  [跳过] '{os.path.basename(filepath)}' 超出本任务的下载量预算."); return "skipped"
+                prepare_partial(filepath, rendition)
+                quality = f" ({describe(rendition)})" if asset == VIDEO and self.quality.enabled else ""
+                if os.path.exists(filepath + PART_SUFFIX):
+                    print(f"  [续传] 继续下载: '{os.path.basename(filepath)}'{quality}")
+                else:
+                    print(f"  [下载] 正在下载: '{os.path.basename(filepath)}'{quality}")
+                finished = False
+                try:
+                    finished = self._fetch_to_file(rendition['url_list'], filepath, rendition['data_size'])
+                finally:
+                    if not finished:
+                        self.quality.refund(rendition)
+                if not finished:
+                    return "stopped"
+                finish_partial(filepath)
+                if asset == VIDEO:
+                    self.quality.charge(rendition, os.path.getsize(filepath))
+                self.index.record(aweme_id, filepath, source=mode, asset=asset, content_id=content_id)
+                if DEDUPE_ON_DOWNLOAD:
+                    link_duplicate(self.index, aweme_id, filepath, asset=asset)
+                return "downloaded"
+            finally:
+                self.index.release_path(filepath)
+        except (KeyError, IndexError, OSError, sqlite3.Error, requests.RequestException) as e:
+            print(f"  [失败] 下载{name} '{desc[:20]}...' 时发生错误: {e}")
+            return "failed"
+        finally:
+            if claimed:
+                self.index.release_content(asset, content_id)
+
+    def _cdn_url(self, urls: list, attempt: int) -> Optional[str]:
+        """第attempt次尝试使用的镜像。熔断中的主机不发请求: 换到其他可放行的镜像，
+        全部熔断时等待最早恢复的一个。收到停止请求时返回None"""
+        start = (attempt - 1) % len(urls)
+        ordered = urls[start:] + urls[:start]
         while True:
-            # 检查是否需要停止下载
-            if hasattr(self, '_stop_requested') and self._stop_requested:
-                print(f"\n  [停止] 用户请求停止{entity_name}下载")
+            waits = []
+            for url in ordered:
+                wait = get_host_health(url).allow()
+                if wait <= 0:
+                    return url
+                waits.append(wait)
+            if not self._sleep(min(min(waits), 1.0)):
+                return None
+
+    def _fetch_to_file(self, urls: list, filepath: str, size_hint: int = None) -> bool:
+        """把文件下载到 .part 临时文件，中断后用Range续传，校验长度后原子重命名。
+        urls为同一文件的多个镜像，按历史速度排序，某个镜像出错或卡住时换下一个镜像从断点继续。
+        大文件改为多连接分段下载。用户请求停止时保留 .part 文件并返回False"""
+        urls = self.mirrors.rank(urls)
+        part_path = filepath + PART_SUFFIX
+        state_path = part_path + SEGMENT_STATE_SUFFIX
+        progress_path = part_path + PREALLOC_SUFFIX
+        recover_preallocated(part_path)
+        if os.path.exists(state_path) or (size_hint and size_hint >= SEGMENT_THRESHOLD and not os.path.exists(part_path)):
+            result = self._fetch_segmented(urls, filepath)
+            if result is not None:
+                return result
+        expected_total = None
+        attempts = max(DOWNLOAD_RESUME_ATTEMPTS, len(urls))
+        for attempt in range(1, attempts + 1):
+            url = self._cdn_url(urls, attempt)
+            if url is None:
+                return False
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            total = None
+            received = 0
+            started = time.monotonic()
+            headers = {'Range': f"bytes={offset}-"} if offset else {}
+            health = get_host_health(url)
+            try:
+                with self.session.get(url, headers=headers, stream=True,
+                                      timeout=(10, health.timeout(MIRROR_STALL_TIMEOUT))) as response:
+                    health.record_success(time.monotonic() - started)
+                    if response.status_code == 416 and offset:
+                        # 请求的起点超出文件末尾: 临时文件可能已经完整，否则只能从头下载
+                        if parse_total_size(response.headers, 206) == offset:
+                            os.replace(part_path, filepath)
+                            return True
+                        raise IncompleteDownloadError(f"续传位置 {offset} 无效")
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        offset = 0  # 服务器不支持Range，从头下载
+                    total = parse_total_size(response.headers, response.status_code, offset)
+                    if offset and expected_total and total and total != expected_total:
+                        # 换镜像后文件大小不一致，已下载的部分不能拼接
+                        os.remove(part_path)
+                        raise MirrorSwitchError(f"镜像文件大小不一致 ({total} != {expected_total})")
+                    expected_total = total or expected_total
+                    if (not offset and total and total >= SEGMENT_THRESHOLD
+                            and response.headers.get('Accept-Ranges', '').lower() == 'bytes'):
+                        response.close()
+                        return self._fetch_segmented(urls, filepath, total)
+
+                    def on_read(nbytes: int) -> bool:
+                        nonlocal received, started
+                        received += nbytes
+                        started += self._throttle(nbytes)
+                        if len(urls) > 1 and self.mirrors.too_slow(received, started):
+                            raise MirrorSwitchError(f"镜像速度过慢 ({self.mirrors.host_of(url)})")
+                        return not self._stop_requested
+
+                    preallocated = not offset and total and total >= WRITE_PREALLOCATE_MIN
+                    with open(part_path, 'r+b' if offset else 'wb') as f:
+                        f.seek(offset)
+                        if preallocated:
+                            # 预分配后文件长度不再代表已下载的字节数，先写进度记录再分配
+                            with open(progress_path, 'w', encoding='utf-8') as progress:
+                                progress.write("0")
+                            preallocate(f, total)
+                        try:
+                            copy_response(response, f, on_read=on_read, progress_path=progress_path if preallocated else None)
+                        finally:
+                            if preallocated:
+                                f.truncate(f.tell())
+                                os.remove(progress_path)
+                    if self._stop_requested:
+                        return False
+                size = os.path.getsize(part_path)
+                if total is not None and size != total:
+                    raise IncompleteDownloadError(f"文件不完整: 已下载 {size} 字节，应为 {total} 字节")
+                self.mirrors.record_success(url, received, time.monotonic() - started)
+                os.replace(part_path, filepath)
+                return True
+            except requests.RequestException as e:
+                self.mirrors.record_failure(url)
+                if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    health.record_failure()
+                size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                if isinstance(e, IncompleteDownloadError) and (total is None or size >= total):
+                    # 数据比声明的更长或续传位置无效，说明临时文件已不可信
+                    os.remove(part_path); size = 0
+                if attempt == attempts:
+                    raise
+                next_host = self.mirrors.host_of(urls[attempt % len(urls)])
+                print(f"  [重试] 下载中断 ({e})，已保存 {size} 字节，第 {attempt} 次续传 ({next_host})...")
+                # 换到其他镜像时立即重试，所有镜像都试过一轮后再退避
+                if attempt >= len(urls) and not self._sleep(CDN_RETRY.delay(attempt - len(urls) + 1)):
+                    return False
+        return False
+
+    def _fetch_segmented(self, urls: list, filepath: str, total: int = None) -> Optional[bool]:
+        """多连接分段下载: 预分配 .part 文件，各段并行写入各自的偏移位置，进度记录在
+        .segments.json 中以便中断后续传。服务器不支持Range时返回None，由调用方改用单连接下载"""
+        part_path = filepath + PART_SUFFIX
+        state_path = part_path + SEGMENT_STATE_SUFFIX
+        state = None
+        if os.path.exists(state_path) and os.path.exists(part_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+        if state is None or state.get('total') != os.path.getsize(part_path):
+            if total is None:
+                head_url = self._cdn_url(urls, 1)
+                if head_url is None:
+                    return False
+                head = self.session.head(head_url, allow_redirects=True, timeout=10)
+                if head.status_code != 200 or head.headers.get('Accept-Ranges', '').lower() != 'bytes':
+                    return None
+                total = parse_total_size(head.headers, 200)
+                if not total:
+                    return None
+            state = {"total": total, "segments": plan_segments(total)}
+            # 先写进度文件再预分配，保证存在进度文件时 .part 一定是分段布局
+            self._save_segment_state(state_path, state)
+            with open(part_path, 'wb') as f:
+                preallocate(f, total)
+
+        total = state['total']
+        segments = state['segments']
+        print(f"  [分段] {total / 1024 / 1024:.1f} MB，使用 {len(segments)} 个连接并行下载")
+        state_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="segment-dl") as pool:
+            futures = [pool.submit(self._fetch_segment, urls, part_path, segment, state_path, state, state_lock)
+                       for segment in segments if segment['start'] + segment['done'] <= segment['end']]
+            errors = [f.exception() for f in futures if f.exception()]
+        self._save_segment_state(state_path, state)
+        if errors:
+            raise errors[0]
+        if self._stop_requested and any(seg['start'] + seg['done'] <= seg['end'] for seg in segments):
+            return False
+
+        size = os.path.getsize(part_path)
+        downloaded = sum(seg['done'] for seg in segments)
+        if size != total or downloaded != total:
+            raise IncompleteDownloadError(f"分段下载不完整: 已下载 {downloaded} 字节，应为 {total} 字节")
+        os.replace(part_path, filepath)
+        os.remove(state_path)
+        return True
+
+    def _fetch_segment(self, urls: list, part_path: str, segment: Dict, state_path: str, state: Dict, state_lock: threading.Lock):
+        """下载一个字节区间并写入预分配文件的对应位置，失败时换下一个镜像从已写入的位置续传"""
+        attempts = max(DOWNLOAD_RESUME_ATTEMPTS, len(urls))
+        for attempt in range(1, attempts + 1):
+            position = segment['start'] + segment['done']
+            if position > segment['end']:
                 break
-
-            print(f"\n  正在获取第 {page} 页{entity_name}...")
-            request_params = base_params.copy()
-            request_params.update({"cursor": cursor, "count": 20})
-
-            data = self._fetch_data(api_url, request_params)
-            if not data or not data.get('aweme_list'): print(f"  未能获取到{entity_name}列表或已到达最后一页。"); break
-
-            if page == 1 and name_key:
-                info_dict = data.get(name_key, {})
-                dynamic_name = info_dict.get('mix_name') or info_dict.get('name', sub_folder)
-                invalid_chars = r'\/:*?"<>|'
-                folder_name = f"{sub_folder}_{''.join(c for c in dynamic_name if c not in invalid_chars)}"
-                print(f"  {entity_name}名称: {dynamic_name}")
-
-            for aweme in data['aweme_list']:
-                # 检查是否需要停止下载
-                if hasattr(self, '_stop_requested') and self._stop_requested:
-                    print(f"\n  [停止] 用户请求停止{entity_name}下载")
+            url = self._cdn_url(urls, attempt)
+            if url is None:
+                return
+            received = 0
+            started = time.monotonic()
+            headers = {'Range': f"bytes={position}-{segment['end']}"}
+            health = get_host_health(url)
+            try:
+                with self.session.get(url, headers=headers, stream=True,
+                                      timeout=(10, health.timeout(MIRROR_STALL_TIMEOUT))) as response:
+                    health.record_success(time.monotonic() - started)
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise IncompleteDownloadError("服务器未按Range返回分段数据")
+                    if parse_total_size(response.headers, 206) not in (None, state['total']):
+                        raise MirrorSwitchError("镜像文件大小不一致")
+
+                    def on_read(nbytes: int) -> bool:
+                        nonlocal received, started
+                        received += nbytes
+                        started += self._throttle(nbytes)
+                        if len(urls) > 1 and self.mirrors.too_slow(received, started):
+                            raise MirrorSwitchError(f"镜像速度过慢 ({self.mirrors.host_of(url)})")
+                        return not self._stop_requested
+
+                    def on_written(nbytes: int):
+                        segment['done'] += nbytes  # 只统计已写入文件的字节，续传位置才可靠
+
+                    with open(part_path, 'r+b') as f:
+                        f.seek(position)
+                        position += copy_response(response, f, limit=segment['end'] + 1 - position,
+                                                  on_read=on_read, on_written=on_written)
+                    if self._stop_requested:
+                        return
+                if position <= segment['end']:
+                    raise IncompleteDownloadError(f"分段 {segment['start']}-{segment['end']} 不完整")
+                self.mirrors.record_success(url, received, time.monotonic() - started)
+            except requests.RequestException as e:
+                self.mirrors.record_failure(url)
+                if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    health.record_failure()
+                if attempt == attempts:
+                    raise
+                print(f"  [重试] 分段 {segment['start']}-{segment['end']} 中断 ({e})，第 {attempt} 次续传...")
+                if attempt >= len(urls) and not self._sleep(CDN_RETRY.delay(attempt - len(urls) + 1)):
                     return
-                self._download_single_video(aweme, sub_folder=folder_name)
+                continue
+            break
+        with state_lock:
+            self._save_segment_state(state_path, state)
 
-            # 检查是否有更多数据
-            if not data.get('has_more'): 
-                print(f"\n所有{entity_name}已处理完毕。")
-                break
+    @staticmethod
+    def _save_segment_state(state_path: str, state: Dict):
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
 
-            # 更新游标
-            cursor = data.get('cursor', 0)
-            page += 1
+    def _fetch_aweme_detail(self, aweme_id: str) -> Optional[Dict]:
+        """通过作品详情接口获取单个作品信息"""
+        user_agent = self.session.headers.get("User-Agent", "")
+        full_params = build_detail_params(aweme_id, user_agent)
 
-    def download_from_post(self, user_url: str):
+        data = self._fetch_data(SINGLE_VIDEO_API, full_params)
+        if not data:
+            print("错误：API请求失败，返回None")
+            return None
+
+        if not data.get('aweme_detail'):
+            print("错误：无法获取视频详情信息。")
+            print(f"API响应: {data}")
+            return None
+        return data['aweme_detail']
+
+    def _download_by_id(self, aweme_id: str, sub_folder: str = "", mode: str = "") -> str:
+        """按aweme_id重新获取作品信息并下载，用于断点恢复时重试上次失败的作品"""
+        aweme = self._fetch_aweme_detail(aweme_id)
+        if not aweme:
+            return "failed"
+        return self._download_single_video(aweme, sub_folder, mode)
+
+    def _save_metadata(self, aweme_list: list, mode: str, target: str = None) -> int:
+        """把一页作品的精简信息写入元数据文件，返回写入条数"""
+        return self._metadata_sink.write_awemes(aweme_list, mode, target)
+
+    def _video_pool(self) -> ThreadPoolExecutor:
+        """返回共用的视频下载线程池，多个分页任务同时运行时 (如批量下载) 总并发数仍为max_workers"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="video-dl")
+            return self._pool
+
+    def close(self):
+        """释放下载线程池与元数据文件"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if self._metadata_sink:
+            self._metadata_sink.close()
+
+    def _acquire_slot(self, slots: threading.BoundedSemaphore) -> bool:
+        """等待下载池空位，收到停止请求时返回False"""
+        while not slots.acquire(timeout=0.5):
+            if self._stop_requested:
+                return False
+        return True
+
+    def _put_page(self, pages: queue.Queue, item) -> bool:
+        """把一页数据放入预取队列，队列满时阻塞等待，收到停止请求时返回False"""
+        while not self._stop_requested:
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get_page(self, pages: queue.Queue):
+        """从预取队列取出一页数据，收到停止请求或列表结束时返回None"""
+        while not self._stop_requested:
+            try:
+                return pages.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return None
+
+    def _fetch_pages(self, crawl: Dict, pages: queue.Queue):
+        """生产者：按游标依次获取分页数据放入预取队列，结束时放入None作为结束标记。
+        列表正常走完 (或增量模式遇到已同步过的页) 时把 crawl['completed'] 置为True"""
+        cursor = 0; page = 1
+        entity_name = crawl['entity_name']; folder_name = crawl['sub_folder']
+        saved = crawl['checkpoint'].saved if crawl['checkpoint'] else None
+        if saved:
+            # 从上次提交的游标继续，而不是从第1页重新开始
+            cursor, page, folder_name = saved['cursor'], saved['page'] + 1, saved['folder_name']
+        try:
+            while not self._stop_requested:
+                print(f"\n  正在获取第 {page} 页{entity_name}...")
+                request_params = crawl['base_params'].copy()
+                request_params.update({"cursor": cursor, "count": 20})
+
+                data = self._fetch_data(crawl['api_url'], request_params, validate=is_complete_page)
+                if data is None:
+                    # 获取失败的页不能当作最后一页，保留断点，下次从这一页继续
+                    print(f"  第 {page} 页{entity_name}多次重试后仍获取失败，停止获取后续页面。")
+                    break
+                if not data.get('aweme_list'):
+                    print(f"  已到达{entity_name}列表的最后一页。")
+                    crawl['completed'] = True
+                    break
+
+                if page == 1 and crawl['name_key']:
+                    folder_name, dynamic_name = resolve_folder_name(data, crawl['sub_folder'], crawl['name_key'])
+                    print(f"  {entity_name}名称: {dynamic_name}")
+
+                aweme_list = data['aweme_list']
+                note_newest(crawl, aweme_list)
+                if not self._put_page(pages, (page, folder_name, aweme_list, data.get('cursor', 0))):
+                    break
+
+                # 检查是否有更多数据
+                if not data.get('has_more'):
+                    print(f"\n所有{entity_name}列表已获取完毕。")
+                    crawl['completed'] = True
+                    break
+
+                # 增量模式: 整页都是已同步过的作品，更早的作品无需再获取
+                if crawl['incremental'] and page_is_known(crawl['known_index'], aweme_list, crawl['sync_state'], crawl['assets']):
+                    print(f"\n  [增量] 第 {page} 页{entity_name}均已同步过，停止获取更早的作品。")
+                    crawl['completed'] = True
+                    break
+
+                # 更新游标
+                cursor = data.get('cursor', 0)
+                page += 1
+        except Exception as e:
+            print(f"  获取{entity_name}列表时发生错误: {e}")
+        finally:
+            self._put_page(pages, None)
+
+    def _state_mode(self, mode: str) -> str:
+        """断点与同步位置记录所用的模式名。只抓元数据或只下载音频、封面时单独记录，不影响之后下载视频的任务"""
+        if self.metadata_only:
+            return f"{mode}:metadata"
+        if self.assets != (VIDEO,):
+            return f"{mode}:{'+'.join(self.assets)}"
+        return mode
+
+    def _paginated_download(self, api_url: str, specific_params: dict, sub_folder: str, entity_name: str,
+                            name_key: str = None, mode: str = "", target: str = None, sync_key: str = None,
+                            incremental: bool = False) -> Dict[str, int]:
+        """通用的分页下载逻辑：后台线程预取分页，当前页视频交给下载池并发下载。
+        target不为空时按页记录断点，中断后从上次提交的游标继续；
+        sync_key不为空时记录该目标的最新作品；incremental为True时遇到整页已同步的作品即停止翻页"""
+        base_params = BASE_API_PARAMS.copy()
+        base_params.update(specific_params)
+        state_mode = self._state_mode(mode)
+        crawl = {
+            "api_url": api_url, "base_params": base_params, "sub_folder": sub_folder,
+            "entity_name": entity_name, "name_key": name_key, "incremental": incremental,
+            "sync_state": self.index.get_sync_state(state_mode, sync_key) if sync_key else None,
+            "checkpoint": CrawlCheckpoint(self.index, state_mode, target) if target else None,
+            "known_index": None if self.metadata_only else self.index, "assets": self.assets,
+            "completed": False, "newest": (0, ""),
+        }
+        checkpoint = crawl['checkpoint']
+        if incremental and crawl['sync_state']:
+            last_sync = time.strftime('%Y-%m-%d %H:%M', time.localtime(crawl['sync_state']['updated_at']))
+            print(f"  [增量] 上次同步时间: {last_sync}，只获取之后发布的{entity_name}。")
+
+        results = CrawlResults(checkpoint)
+        stats = results.stats
+        # 限制已提交但未完成的任务数，避免一次性把整页甚至多页视频堆进队列
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        # 预取队列有界，磁盘或CDN变慢时分页获取会随之暂停
+        pages = queue.Queue(maxsize=self.prefetch_pages)
+
+        def run_job(fn, args, page, aweme_id):
+            """在下载线程中执行并记账。统计与断点在任务返回之前更新，
+            wait(futures)返回时所有结果都已计入 (add_done_callback可能在wait返回之后才执行)"""
+            try:
+                try:
+                    status = fn(*args)
+                except Exception as e:
+                    status = results.failure(aweme_id, e)
+                results.record(page, aweme_id, status)
+                return status
+            finally:
+                slots.release()
+
+        warm_up([api_url, SINGLE_VIDEO_API])
+        producer = threading.Thread(target=self._fetch_pages, args=(crawl, pages), name="page-fetcher", daemon=True)
+        pool = self._video_pool()
+        futures = []
+
+        def on_cancelled(future):
+            # 停止时被取消的任务不会执行，在这里归还名额
+            if future.cancelled():
+                slots.release()
+
+        def submit(fn, args, page, aweme_id):
+            future = pool.submit(run_job, fn, args, page, aweme_id)
+            results.scheduled()
+            futures.append(future)
+            future.add_done_callback(on_cancelled)
+
+        producer.start()
+        try:
+            if checkpoint and checkpoint.saved:
+                saved = checkpoint.saved
+                failed_ids = checkpoint.failed_items()
+                print(f"  [断点] 从第 {saved['page'] + 1} 页继续获取{entity_name}。")
+                if failed_ids:
+                    print(f"  [断点] 重试上次失败的 {len(failed_ids)} 个作品。")
+                for aweme_id in failed_ids:
+                    if self._stop_requested or not self._acquire_slot(slots):
+                        break
+                    submit(self._download_by_id, (aweme_id, saved['folder_name'], mode), saved['page'], aweme_id)
+
+            while True:
+                item = self._get_page(pages)
+                if item is None:
+                    break
+
+                page, folder_name, aweme_list, next_cursor = item
+                if self.metadata_only:
+                    # 只保存作品信息，不下载视频，写完即可提交本页进度
+                    results.add_saved(self._save_metadata(aweme_list, mode, target))
+                    if checkpoint:
+                        checkpoint.commit_page(page, folder_name, next_cursor)
+                    continue
+                # 提前为本页视频所在的CDN源站建立连接，下载开始时直接复用
+                warm_up([urls[0] for urls in (asset_urls(aweme, self.assets[0]) for aweme in aweme_list) if urls],
+                        connections=self.max_workers)
+                if checkpoint:
+                    checkpoint.add_page(page, folder_name, next_cursor, [aweme['aweme_id'] for aweme in aweme_list])
+                for aweme in aweme_list:
+                    # 检查是否需要停止下载
+                    if self._stop_requested or not self._acquire_slot(slots):
+                        break
+                    submit(self._download_single_video, (aweme, folder_name, mode), page, aweme['aweme_id'])
+        finally:
+            if self._stop_requested:
+                print(f"\n  [停止] 用户请求停止{entity_name}下载")
+            # 停止时丢弃本任务尚未开始的下载，正在下载的视频会自行结束
+            if self._stop_requested:
+                for future in futures:
+                    future.cancel()
+            wait(futures)
+            producer.join()
+            self.mirrors.save()
+
+        finished = crawl['completed'] and not self._stop_requested
+        stats['completed'] = finished
+        if checkpoint:
+            if finished:
+                checkpoint.finish()
+            elif self.index.get_checkpoint(state_mode, target):
+                print(f"  [断点] {entity_name}进度已保存，下次运行将从中断处继续。")
+
+        if sync_key and results.may_advance_sync(finished) and crawl['newest'][0]:
+            self.index.update_sync_state(state_mode, sync_key, crawl['newest'][1], crawl['newest'][0])
+
+        if self.metadata_only:
+            print(f"\n{entity_name}处理完毕: 保存 {stats['saved']} 条作品信息。")
+        else:
+            print(f"\n{entity_name}处理完毕: 下载 {stats['downloaded']} 个，链接 {stats['linked']} 个，"
+                  f"跳过 {stats['skipped']} 个，失败 {stats['failed']} 个。")
+        print(f"  [签名] {get_signer().summary()} (本进程累计)")
+        return stats
+
+    def download_from_post(self, user_url: str, incremental: bool = False):
+        """下载用户主页作品，incremental为True时只同步上次之后发布的作品。返回统计结果，URL无效时返回None"""
         print(f"\n开始下载主页作品: {user_url}")
         match = re.search(r'user/(MS4wLjABAAAA[a-zA-Z0-9_-]+)', user_url)
         if not match: print("错误：无法从URL中解析出sec_user_id。"); return
         params = {"sec_user_id": match.group(1)}
-        self._paginated_download(USER_POST_API, params, sub_folder=match.group(1), entity_name="主页作品")
+        return self._paginated_download(USER_POST_API, params, sub_folder=match.group(1), entity_name="主页作品", mode="post",
+                                 target=match.group(1), sync_key=match.group(1), incremental=incremental)
 
     def download_from_favorite(self):
         print("\n开始下载我的收藏作品...")
-        self._paginated_download(USER_FAVORITE_API, {}, sub_folder="MyFavorites", entity_name="收藏作品")
+        return self._paginated_download(USER_FAVORITE_API, {}, sub_folder="MyFavorites", entity_name="收藏作品", mode="favorite",
+                                 target=self.account_key)
         
     def download_from_collection(self, collection_url: str):
         print(f"\n开始下载合集作品: {collection_url}")
         match = re.search(r'collection/(\d+)', collection_url)
         if not match: print("错误：无法从URL中解析出合集ID。"); return
         params = {"mix_id": match.group(1)}
-        self._paginated_download(USER_MIX_API, params, sub_folder="Mix", entity_name="合集作品", name_key='mix_info')
+        return self._paginated_download(USER_MIX_API, params, sub_folder="Mix", entity_name="合集作品", name_key='mix_info', mode="collection",
+                                 target=match.group(1))
 
     def download_from_like(self):
         """下载用户点赞的作品"""
         print("\n开始下载我的点赞作品...")
-        self._paginated_download(USER_LIKE_API, {}, sub_folder="MyLikes", entity_name="点赞作品")
+        return self._paginated_download(USER_LIKE_API, {}, sub_folder="MyLikes", entity_name="点赞作品", mode="like",
+                                 target=self.account_key)
 
     def download_from_collects(self, collects_url: str):
         """下载收藏夹作品 (对应F2的collects功能)"""
@@ -161,7 +955,8 @@ class Downloader:
         match = re.search(r'collects/(\d+)', collects_url)
         if not match: print("错误：无法从URL中解析出收藏夹ID。"); return
         params = {"collects_id": match.group(1)}
-        self._paginated_download(USER_COLLECTS_API, params, sub_folder="MyCollects", entity_name="收藏夹作品")
+        return self._paginated_download(USER_COLLECTS_API, params, sub_folder="MyCollects", entity_name="收藏夹作品", mode="collects",
+                                 target=match.group(1))
 
     def download_from_music(self, music_url: str):
         """下载指定音乐的所有作品"""
@@ -169,10 +964,11 @@ class Downloader:
         match = re.search(r'music/(\d+)', music_url)
         if not match: print("错误：无法从URL中解析出音乐ID。"); return
         params = {"music_id": match.group(1)}
-        self._paginated_download(MUSIC_API, params, sub_folder="Music", entity_name="音乐作品")
+        return self._paginated_download(MUSIC_API, params, sub_folder="Music", entity_name="音乐作品", mode="music",
+                                 target=match.group(1))
 
     def download_from_url(self, video_url: str):
-        """下载单个视频作品 - 参考F2项目实现"""
+        """下载单个视频作品 - 参考F2项目实现。返回下载状态，失败时返回None"""
         print(f"\n开始下载单个视频: {video_url}")
 
         try:
@@ -183,59 +979,16 @@ class Downloader:
             print(f"错误：{e}")
             return
 
-        # 使用F2项目风格的参数传递方式
-        params = {"aweme_id": aweme_id}
-
-        # 构建完整的参数（包含基础参数）
-        full_params = BASE_API_PARAMS.copy()
-        full_params.update(params)
-
-        # 添加ABogus参数（如果可用）
-        try:
-            user_agent = self.session.headers.get("User-Agent", "")
-            param_str = "&".join([f"{k}={v}" for k, v in params.items()])
-            enhanced_url = ABogusManager.str_2_endpoint(user_agent, param_str)
-
-            print(f"ABogus增强URL: {enhanced_url}")
-
-            # 解析ABogusManager返回的URL参数
-            if '?' in enhanced_url:
-                query_part = enhanced_url.split('?', 1)[1]
-                print(f"ABogus查询参数: {query_part}")
-
-                # 解析所有参数
-                for pair in query_part.split('&'):
-                    if '=' in pair:
-                        key, value = pair.split('=', 1)
-                        if key == 'a_bogus':
-                            full_params['a_bogus'] = value
-                            print(f"已添加ABogus参数: {value}")
-                        elif key not in full_params:  # 避免覆盖已有参数
-                            full_params[key] = value
-
-            # 确保有a_bogus参数
-            if 'a_bogus' not in full_params:
-                print("未找到a_bogus参数，使用默认值")
-                full_params['a_bogus'] = '0'
-
-        except Exception as e:
-            print(f"ABogus参数处理失败，使用基础参数: {e}")
-            # 即使ABogus失败，也要确保有a_bogus参数
-            full_params['a_bogus'] = '0'  # 使用默认值
-
-        data = self._fetch_data(SINGLE_VIDEO_API, full_params)
-        if not data:
-            print("错误：API请求失败，返回None")
-            return
-
-        if not data.get('aweme_detail'):
-            print("错误：无法获取视频详情信息。")
-            print(f"API响应: {data}")
+        aweme = self._fetch_aweme_detail(aweme_id)
+        if not aweme:
             return
-
-        aweme = data['aweme_detail']
         print(f"成功获取视频信息: {aweme.get('desc', '无描述')[:50]}...")
-        self._download_single_video(aweme, sub_folder="SingleVideos")
+        if self.metadata_only:
+            self._save_metadata([aweme], mode="one")
+            return 'saved'
+        status = self._download_single_video(aweme, sub_folder="SingleVideos", mode="one")
+        self.mirrors.save()
+        return status
 
     def download_live(self, live_url: str):
         """直播下载功能 (基础实现，F2有更完整的直播功能)"""
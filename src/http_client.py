@@ -0,0 +1,83 @@
+# http_client.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 进程内共享的HTTP连接池，API请求与CDN下载复用同一组长连接
+
+import time
+import threading
+import requests
+from http.cookiejar import DefaultCookiePolicy
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import HEADERS, HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE, HTTP_WARMUP_TTL
+
+_session = None
+_session_lock = threading.Lock()
+_warmed: Dict[str, float] = {}  # 源站 -> 上次预热时间
+_warmed_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """返回进程内共享的requests.Session。
+
+    多个账号的下载任务共用这一个Session，因此不保存任何服务端下发的Cookie，
+    账号Cookie由调用方通过每个请求的headers传入。
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _warm_origin(origin: str):
+    try:
+        get_http_session().head(origin + "/", timeout=5).close()
+    except requests.RequestException:
+        pass  # 预热失败不影响后续请求，真正请求时会重新建立连接
+
+
+def warm_up(urls: Iterable[str], connections: int = 1):
+    """在后台为每个源站预先建立connections条连接 (TCP+TLS握手)，最近预热过的源站会跳过"""
+    now = time.monotonic()
+    origins = []
+    with _warmed_lock:
+        for url in urls:
+            origin = origin_of(url)
+            if origin not in origins and now - _warmed.get(origin, float("-inf")) > HTTP_WARMUP_TTL:
+                _warmed[origin] = now
+                origins.append(origin)
+    if not origins:
+        return
+
+    connections = max(1, min(connections, HTTP_POOL_MAXSIZE))
+
+    def run():
+        # 同一源站并发发出多个HEAD请求，连接池中才会保留多条可复用的连接
+        with ThreadPoolExecutor(max_workers=min(len(origins) * connections, 16), thread_name_prefix="http-warmup") as pool:
+            for origin in origins:
+                for _ in range(connections):
+                    pool.submit(_warm_origin, origin)
+
+    threading.Thread(target=run, name="http-warmup", daemon=True).start()
@@ -7,10 +7,18 @@ import time
 import argparse
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
 from rich import print as rprint
 
 from .account_manager import AccountManager
 from .downloader import Downloader
+from .async_downloader import AsyncDownloader
+from .account_pool import build_account_pool
+from .bandwidth import bandwidth_limiter_from_spec
+from .bulk_downloader import BulkDownloader, read_manifest, summarize, write_report, default_report_path
+from .dedupe import Deduplicator
+from .quality_selector import QualitySelector
+from .assets import parse_assets
 from .uploader import Uploader
 
 console = Console()
@@ -44,8 +52,40 @@ def main():
                                  choices=['post', 'favorite', 'collection'], 
                                  help="下载模式: post(主页), favorite(收藏), collection(合集)。")
     parser_download.add_argument("-u", "--url", help="当模式为 post 或 collection 时，指定目标URL。")
+    parser_download.add_argument("-w", "--workers", type=int, default=None, help="同时下载的视频数量 (默认: 4)。")
+    parser_download.add_argument("--engine", default="requests", choices=['requests', 'asyncio'], help="下载引擎: requests(默认) 或 asyncio(需安装aiohttp；不支持大文件分段下载与写线程写盘)。")
+    parser_download.add_argument("--incremental", action="store_true", help="增量同步: post模式只下载上次同步之后发布的作品。")
+    parser_download.add_argument("--metadata-only", action="store_true", help="只抓取作品信息写入 下载目录/metadata/*.jsonl.gz，不下载视频。")
+    parser_download.add_argument("--shard", nargs="?", const="", default=None, metavar="账号1,账号2", help="主页/合集/音乐/作品详情请求由多个账号分担，不写账号名时使用所有已配置Cookie的账号。")
+    parser_download.add_argument("--limit-rate", default=None, metavar="2M", help="本任务的CDN下载限速 (字节/秒，可写作 512K、2M)，默认不限速。")
+    parser_download.add_argument("--limit-schedule", default=None, metavar="09:00-18:00=2M", help="按时段限速，多个时段用逗号分隔，不在任何时段内时使用 --limit-rate。")
+    parser_download.add_argument("--quality", default=None, metavar="540p", help="清晰度: highest(最高)、lowest(最小)、720p(不超过该分辨率)、budget=5G(本任务总下载量上限)，可用逗号组合，默认下载接口给出的默认版本。")
+    parser_download.add_argument("--assets", default=None, metavar="audio,cover", help="要下载的资源: video(视频，默认)、audio(配乐)、cover(封面)，多个用逗号分隔。")
     parser_download.set_defaults(func=download_command)
 
+    parser_bulk = subparsers.add_parser("bulk", help="按清单文件批量下载 (视频/主页/合集/收藏夹/音乐链接可混合)。")
+    parser_bulk.add_argument("-a", "--account", required=True, help="用于下载的抖音账号用户名。")
+    parser_bulk.add_argument("-f", "--file", required=True, help="链接清单文件，每行一个链接，#开头的行为注释。")
+    parser_bulk.add_argument("-w", "--workers", type=int, default=None, help="同时下载的视频数量，所有链接共用 (默认: 4)。")
+    parser_bulk.add_argument("-j", "--jobs", type=int, default=None, help="同时处理的链接数量 (默认: 4)。")
+    parser_bulk.add_argument("--engine", default="requests", choices=['requests', 'asyncio'], help="下载引擎: requests(默认) 或 asyncio(需安装aiohttp；不支持大文件分段下载与写线程写盘)。")
+    parser_bulk.add_argument("--incremental", action="store_true", help="增量同步: 主页链接只下载上次同步之后发布的作品。")
+    parser_bulk.add_argument("--metadata-only", action="store_true", help="只抓取作品信息，不下载视频。")
+    parser_bulk.add_argument("--shard", nargs="?", const="", default=None, metavar="账号1,账号2", help="主页/合集/音乐/作品详情请求由多个账号分担，不写账号名时使用所有已配置Cookie的账号。")
+    parser_bulk.add_argument("--report", default=None, help="结果报告的保存路径 (默认: 下载目录/bulk_report_时间.json)。")
+    parser_bulk.add_argument("--limit-rate", default=None, metavar="2M", help="本任务的CDN下载限速 (字节/秒，可写作 512K、2M)，默认不限速。")
+    parser_bulk.add_argument("--limit-schedule", default=None, metavar="09:00-18:00=2M", help="按时段限速，多个时段用逗号分隔，不在任何时段内时使用 --limit-rate。")
+    parser_bulk.add_argument("--quality", default=None, metavar="540p", help="清晰度: highest(最高)、lowest(最小)、720p(不超过该分辨率)、budget=5G(本任务总下载量上限)，可用逗号组合，默认下载接口给出的默认版本。")
+    parser_bulk.add_argument("--assets", default=None, metavar="audio,cover", help="要下载的资源: video(视频，默认)、audio(配乐)、cover(封面)，多个用逗号分隔。")
+    parser_bulk.set_defaults(func=bulk_command)
+
+    parser_dedupe = subparsers.add_parser("dedupe", help="按内容去重: 把下载目录中内容相同的文件替换为硬链接或reflink。")
+    parser_dedupe.add_argument("-d", "--dir", default=None, help="要去重的目录 (默认: 下载目录)。")
+    parser_dedupe.add_argument("-j", "--workers", type=int, default=None, help="同时计算校验和的线程数 (默认: 4)。")
+    parser_dedupe.add_argument("--mode", default="auto", choices=['auto', 'reflink', 'hardlink'], help="链接方式: auto(优先reflink，不支持时用硬链接)、reflink、hardlink。")
+    parser_dedupe.add_argument("--dry-run", action="store_true", help="只统计重复文件，不做替换。")
+    parser_dedupe.set_defaults(func=dedupe_command)
+
     parser_upload = subparsers.add_parser("upload", help="上传单个视频到抖音。")
     parser_upload.add_argument("-a", "--account", required=True, help="用于上传的抖音账号用户名。")
     parser_upload.add_argument("-p", "--video_path", required=True, help="本地视频文件的完整路径。")
@@ -63,19 +103,90 @@ def main():
     args.func(args)
 
 # ----------------- 命令执行函数 -----------------
+def make_account_pool(args):
+    """--shard 指定时构建账号池，当前账号排在最前"""
+    if args.shard is None:
+        return None
+    names = [name.strip() for name in args.shard.split(',') if name.strip()]
+    pool = build_account_pool(account_manager.accounts, args.account, names)
+    console.print(f"[cyan]请求将由 {len(pool)} 个账号分担: {', '.join(account.name for account in pool.accounts)}[/cyan]")
+    return pool
+
+def create_downloader(args, cookie):
+    """按命令行参数创建下载器，限速、清晰度或资源类型参数有误时返回None"""
+    try:
+        bandwidth = bandwidth_limiter_from_spec("本任务", args.limit_rate, args.limit_schedule)
+        quality = QualitySelector(args.quality)
+        assets = parse_assets(args.assets)
+    except ValueError as e:
+        console.print(f"[bold red]错误: {e}[/bold red]"); return None
+    options = dict(max_workers=args.workers, metadata_only=args.metadata_only,
+                   account_pool=make_account_pool(args), bandwidth=bandwidth, quality=quality, assets=assets)
+    if args.engine == 'asyncio':
+        try:
+            return AsyncDownloader(cookie, **options)
+        except ImportError as e:
+            console.print(f"[bold red]错误: {e}[/bold red]"); return None
+    return Downloader(cookie, **options)
+
 def download_command(args):
     account_info = account_manager.get_account(args.account)
     if not account_info or not account_info.get('cookie'):
         console.print(f"[bold red]下载失败: 账号 '{args.account}' 不存在或尚未配置Cookie。[/bold red]"); return
 
-    downloader = Downloader(account_info['cookie'])
-    
     if args.mode in ['post', 'collection'] and not args.url:
         console.print(f"[bold red]错误: '{args.mode}' 模式需要提供 --url 参数。[/bold red]"); return
-    
-    if args.mode == 'post': downloader.download_from_post(args.url)
-    elif args.mode == 'favorite': downloader.download_from_favorite()
-    elif args.mode == 'collection': downloader.download_from_collection(args.url)
+
+    downloader = create_downloader(args, account_info['cookie'])
+    if downloader is None:
+        return
+
+    try:
+        if isinstance(downloader, AsyncDownloader):
+            if args.mode == 'post': downloader.run(downloader.download_from_post(args.url, incremental=args.incremental))
+            elif args.mode == 'favorite': downloader.run(downloader.download_from_favorite())
+            elif args.mode == 'collection': downloader.run(downloader.download_from_collection(args.url))
+            return
+
+        if args.mode == 'post': downloader.download_from_post(args.url, incremental=args.incremental)
+        elif args.mode == 'favorite': downloader.download_from_favorite()
+        elif args.mode == 'collection': downloader.download_from_collection(args.url)
+    finally:
+        downloader.close()
+
+def bulk_command(args):
+    account_info = account_manager.get_account(args.account)
+    if not account_info or not account_info.get('cookie'):
+        console.print(f"[bold red]下载失败: 账号 '{args.account}' 不存在或尚未配置Cookie。[/bold red]"); return
+    if not os.path.isfile(args.file):
+        console.print(f"[bold red]错误: 清单文件 '{args.file}' 不存在。[/bold red]"); return
+    urls = read_manifest(args.file)
+    if not urls:
+        console.print(f"[bold yellow]清单文件 '{args.file}' 中没有链接。[/bold yellow]"); return
+
+    downloader = create_downloader(args, account_info['cookie'])
+    if downloader is None:
+        return
+    try:
+        rows = BulkDownloader(downloader, parallel_targets=args.jobs, incremental=args.incremental).run(urls)
+    finally:
+        downloader.close()
+
+    table = Table(title="批量下载结果")
+    for column in ("链接", "类型", "状态", "下载", "复用", "跳过", "失败", "保存", "耗时(秒)", "说明"):
+        table.add_column(column)
+    styles = {'ok': 'green', 'partial': 'yellow', 'duplicate': 'dim', 'stopped': 'yellow'}
+    for row in rows:
+        stats = row.get('stats', {})
+        style = styles.get(row['status'], 'red')
+        table.add_row(row['url'], row['kind'] or "-", f"[{style}]{row['status']}[/{style}]",
+                      *(str(stats.get(key, 0)) for key in ("downloaded", "linked", "skipped", "failed", "saved")),
+                      str(row.get('elapsed', '-')), row.get('error') or (f"同 {row['duplicate_of']}" if row.get('duplicate_of') else ""))
+    console.print(table)
+
+    report_path = write_report(rows, args.report or default_report_path(downloader.download_path))
+    summary = "，".join(f"{status} {count} 条" for status, count in summarize(rows).items())
+    console.print(f"[bold cyan]{summary}。结果报告已保存到: {report_path}[/bold cyan]")
 
 def common_upload_logic(account_name, func):
     account_info = account_manager.get_account(account_name)
@@ -90,6 +201,13 @@ def common_upload_logic(account_name, func):
     finally:
         uploader.end_session()
 
+def dedupe_command(args):
+    if args.dir and not os.path.isdir(args.dir):
+        console.print(f"[bold red]错误: 路径 '{args.dir}' 不是有效目录。[/bold red]"); return
+    summary = Deduplicator(args.dir, workers=args.workers, mode=args.mode, dry_run=args.dry_run).run()
+    if summary['errors']:
+        console.print(f"[bold yellow]{summary['errors']} 个文件无法替换 (跨磁盘或文件系统不支持链接)。[/bold yellow]")
+
 def upload_command(args):
     def do_upload(uploader, page):
         tags = [t.strip() for t in args.tags.split(',') if t.strip()] if args.tags else []
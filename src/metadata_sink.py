@@ -0,0 +1,125 @@
+# metadata_sink.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 只抓取作品信息时使用: 把精简后的作品记录逐条写入按大小轮转的gzip压缩JSONL文件
+
+import os
+import gzip
+import json
+import time
+import atexit
+import itertools
+import threading
+from typing import Dict, Iterable, Optional
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import METADATA_ROTATE_BYTES
+
+# 进程内所有写入器共用的文件序号，保证同一秒内打开的文件不重名
+_file_sequence = itertools.count(1)
+
+STAT_KEYS = ("digg_count", "comment_count", "share_count", "collect_count", "play_count")
+
+
+def _first_url(addr: Optional[Dict]) -> Optional[str]:
+    url_list = (addr or {}).get('url_list') or []
+    return url_list[0] if url_list else None
+
+
+def trim_aweme(aweme: Dict) -> Dict:
+    """从接口返回的作品数据中提取常用字段，丢弃体积很大的其余部分"""
+    video = aweme.get('video') or {}
+    play_addr = video.get('play_addr') or {}
+    author = aweme.get('author') or {}
+    music = aweme.get('music') or {}
+    statistics = aweme.get('statistics') or {}
+    return {
+        "aweme_id": aweme.get('aweme_id'),
+        "desc": aweme.get('desc'),
+        "create_time": aweme.get('create_time'),
+        "is_top": aweme.get('is_top'),
+        "author": {
+            "uid": author.get('uid'),
+            "sec_uid": author.get('sec_uid'),
+            "nickname": author.get('nickname'),
+        },
+        "statistics": {key: statistics.get(key) for key in STAT_KEYS},
+        "music": {
+            "id": music.get('id_str') or music.get('id'),
+            "title": music.get('title'),
+            "author": music.get('author'),
+            "url": _first_url(music.get('play_url')),
+        },
+        "duration": video.get('duration') or aweme.get('duration'),
+        "video": {
+            "width": video.get('width') or play_addr.get('width'),
+            "height": video.get('height') or play_addr.get('height'),
+            "data_size": play_addr.get('data_size'),
+            "url_list": play_addr.get('url_list') or [],
+            "cover": _first_url(video.get('cover')),
+        },
+    }
+
+
+class MetadataSink:
+    """线程安全的gzip JSONL写入器。
+
+    每写满METADATA_ROTATE_BYTES (未压缩字节数) 换一个新文件；每页写完调用flush()，
+    进程意外退出时已flush的记录仍可解压读取。内存占用与记录总数无关。
+    """
+
+    def __init__(self, directory: str, prefix: str = "aweme", max_bytes: int = METADATA_ROTATE_BYTES):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self._file = None
+        self._written = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_file_sequence):04d}.jsonl.gz"
+        self.path = os.path.join(self.directory, name)
+        self._file = gzip.open(self.path, 'wb')
+        self._written = 0
+        print(f"  [元数据] 写入文件: {self.path}")
+
+    def write_many(self, records: Iterable[Dict]) -> int:
+        """写入多条记录并flush，返回写入的条数"""
+        count = 0
+        with self._lock:
+            for record in records:
+                if self._file is None or self._written >= self.max_bytes:
+                    self._close_file()
+                    self._open()
+                line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b"\n"
+                self._file.write(line)
+                self._written += len(line)
+                count += 1
+            if self._file is not None:
+                self._file.flush()
+        return count
+
+    def write_awemes(self, aweme_list: Iterable[Dict], mode: str, target: str = None) -> int:
+        """精简一页作品后写入，附带抓取来源 (mode/target) 与抓取时间"""
+        crawled_at = int(time.time())
+        return self.write_many(dict(trim_aweme(aweme), mode=mode, target=target, crawled_at=crawled_at)
+                               for aweme in aweme_list)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """关闭当前文件；之后仍可继续写入 (会打开新文件)。关闭后不再由退出钩子持有"""
+        with self._lock:
+            self._close_file()
+        atexit.unregister(self.close)
@@ -0,0 +1,132 @@
+# mirror_selector.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 按CDN主机统计下载速度与出错率，为play_addr.url_list中的镜像排序
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import (
+    MIRROR_STATS_FILE, MIRROR_EWMA_ALPHA, MIRROR_COOLDOWN, MIRROR_MIN_SPEED, MIRROR_PROBE_SECONDS
+)
+from .retry import get_host_health
+
+# 两次写入统计文件的最短间隔 (秒)
+SAVE_INTERVAL = 10
+
+
+class MirrorStats:
+    """每个CDN主机的下载速度与出错率 (指数加权平均)，保存在下载目录中，跨运行保留。
+
+    排序规则: 最近频繁出错或已熔断的主机排在最后；其余按 速度 x (1 - 出错率) 从高到低排列，
+    没有统计数据的主机按当前最好的成绩对待，保证新镜像也有机会被测量。
+    """
+
+    def __init__(self, root_dir: str, file_name: str = MIRROR_STATS_FILE):
+        self.path = os.path.join(os.path.abspath(root_dir), file_name)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict] = self._load()
+        self._last_save = time.monotonic()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _cooling(self, stats: Dict) -> bool:
+        return stats.get('errors', 0) > 0.5 and time.time() - stats.get('last_failure', 0) < MIRROR_COOLDOWN
+
+    def rank(self, urls: List[str]) -> List[str]:
+        """返回去重并按优先级排好序的镜像URL"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        with self._lock:
+            best = max((self._hosts[host]['speed'] for host in map(self.host_of, urls)
+                        if self._hosts.get(host, {}).get('speed')), default=0)
+
+            def key(item):
+                position, url = item
+                stats = self._hosts.get(self.host_of(url), {})
+                speed = stats.get('speed') or best
+                cooling = self._cooling(stats) or get_host_health(url).is_open()
+                return (cooling, -speed * (1 - stats.get('errors', 0)), position)
+
+            return [url for _, url in sorted(enumerate(urls), key=key)]
+
+    def record_success(self, url: str, nbytes: int, seconds: float):
+        """记录一次成功的传输，nbytes为本次收到的字节数"""
+        if nbytes <= 0 or seconds <= 0:
+            return
+        speed = nbytes / seconds
+        with self._lock:
+            stats = self._hosts.setdefault(self.host_of(url), {})
+            old = stats.get('speed')
+            stats['speed'] = speed if old is None else old + MIRROR_EWMA_ALPHA * (speed - old)
+            stats['errors'] = stats.get('errors', 0) * (1 - MIRROR_EWMA_ALPHA)
+            stats['samples'] = stats.get('samples', 0) + 1
+            self._dirty = True
+        self._save_if_due()
+
+    def record_failure(self, url: str):
+        with self._lock:
+            stats = self._hosts.setdefault(self.host_of(url), {})
+            stats['errors'] = stats.get('errors', 0) + MIRROR_EWMA_ALPHA * (1 - stats.get('errors', 0))
+            stats['last_failure'] = time.time()
+            self._dirty = True
+        self._save_if_due()
+
+    @staticmethod
+    def too_slow(nbytes: int, started: float) -> bool:
+        """传输开始MIRROR_PROBE_SECONDS秒后平均速度仍低于MIRROR_MIN_SPEED，视为该镜像卡住"""
+        elapsed = time.monotonic() - started
+        return elapsed >= MIRROR_PROBE_SECONDS and nbytes / elapsed < MIRROR_MIN_SPEED
+
+    def _save_if_due(self):
+        if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        """把统计写入文件 (先写临时文件再替换，避免中途退出留下损坏的文件)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._hosts, ensure_ascii=False, indent=2)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  保存镜像统计失败: {e}")
+
+
+_mirror_stats: Dict[str, MirrorStats] = {}
+_mirror_stats_lock = threading.Lock()
+
+def get_mirror_stats(root_dir: str) -> MirrorStats:
+    """同一进程内，同一下载目录共用一个MirrorStats"""
+    key = os.path.abspath(root_dir)
+    with _mirror_stats_lock:
+        if key not in _mirror_stats:
+            _mirror_stats[key] = MirrorStats(key)
+        return _mirror_stats[key]
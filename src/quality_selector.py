@@ -0,0 +1,153 @@
+# quality_selector.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 清晰度选择：从作品详情的bit_rate列表 (同一视频的多个清晰度) 中按策略选择要下载的版本
+
+import re
+import threading
+from typing import Dict, List, Optional
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import DEFAULT_VIDEO_QUALITY
+from .bandwidth import parse_rate
+
+HIGHEST, LOWEST = "highest", "lowest"
+RESOLUTION_PATTERN = re.compile(r"^(\d{3,4})p?$", re.IGNORECASE)
+GEAR_RESOLUTION_PATTERN = re.compile(r"_(\d{3,4})(?:_|$)")
+
+
+def _short_side(rendition: Dict) -> Optional[int]:
+    """清晰度按短边计 (竖屏1080x1920为1080p)；接口没有给出宽高时从gear_name (如 normal_540_0) 中解析"""
+    width, height = rendition.get('width'), rendition.get('height')
+    if width and height:
+        return min(int(width), int(height))
+    match = GEAR_RESOLUTION_PATTERN.search(rendition.get('gear_name') or "")
+    return int(match.group(1)) if match else None
+
+
+def list_renditions(aweme: Dict) -> List[Dict]:
+    """返回作品所有可下载的版本: url_list、data_size (字节，可能为None)、bit_rate、width、height、gear_name。
+    bit_rate列表为空时只有play_addr一个版本"""
+    video = aweme.get('video') or {}
+    duration = (video.get('duration') or aweme.get('duration') or 0) / 1000
+    renditions = []
+    for item in video.get('bit_rate') or []:
+        addr = item.get('play_addr') or {}
+        if not addr.get('url_list') or (item.get('format') or "mp4") != "mp4":
+            continue
+        size = addr.get('data_size')
+        if not size and item.get('bit_rate') and duration:
+            size = int(item['bit_rate'] * duration / 8)  # 没有给出大小时按码率估算
+        renditions.append({
+            "url_list": addr['url_list'], "data_size": size, "bit_rate": item.get('bit_rate') or 0,
+            "width": addr.get('width'), "height": addr.get('height'), "gear_name": item.get('gear_name'),
+        })
+    return renditions or [play_addr_rendition(aweme)]
+
+
+def play_addr_rendition(aweme: Dict) -> Dict:
+    """接口默认给出的play_addr版本"""
+    video = aweme['video']
+    addr = video['play_addr']
+    return {"url_list": addr['url_list'], "data_size": addr.get('data_size'), "bit_rate": 0,
+            "width": addr.get('width') or video.get('width'), "height": addr.get('height') or video.get('height'),
+            "gear_name": None}
+
+
+def rendition_key(rendition: Dict) -> str:
+    """区分同一作品不同版本的标识，默认的play_addr为空字符串。续传前据此确认临时文件属于同一版本"""
+    if not rendition.get('gear_name') and not rendition.get('bit_rate'):
+        return ""
+    return f"{rendition.get('gear_name') or ''}@{rendition.get('bit_rate') or 0}"
+
+
+def describe(rendition: Dict) -> str:
+    side = _short_side(rendition)
+    size = rendition.get('data_size')
+    return " ".join(filter(None, (f"{side}p" if side else None, f"{size / 1024 / 1024:.1f}MB" if size else None)))
+
+
+class QualitySelector:
+    """按策略从bit_rate列表选择版本。
+
+    spec由逗号分隔，可组合使用:
+      highest      码率最高的版本
+      lowest       体积最小的版本
+      720p         短边不超过720的版本中码率最高的 (都超过时取最小的)
+      budget=5G    本任务下载的视频总字节数上限: 选择不超出剩余预算的最好版本，最小的版本也放不下时跳过该视频；
+                   大小未知 (接口没有给出且无法按码率估算) 的版本排在大小已知的版本之后，
+                   只有所有版本大小都未知时才选其中码率最低的，且要求预算尚未用完；
+                   下载完成后按实际写入的字节数结算 (charge)，大小未知的版本同样计入预算
+    spec为空时保持原来的行为，只下载play_addr。
+    """
+
+    def __init__(self, spec: str = None):
+        self.spec = (spec if spec is not None else DEFAULT_VIDEO_QUALITY) or ""
+        self.policy = None
+        self.max_resolution = None
+        self.budget = None
+        for part in filter(None, (item.strip().lower() for item in self.spec.split(','))):
+            if part in (HIGHEST, LOWEST):
+                self.policy = part
+            elif RESOLUTION_PATTERN.match(part):
+                self.max_resolution = int(RESOLUTION_PATTERN.match(part).group(1))
+            elif part.startswith("budget="):
+                self.budget = parse_rate(part[len("budget="):])
+            else:
+                raise ValueError(f"无法识别的清晰度设置: {part} (可用: highest、lowest、720p、budget=5G)")
+        self.remaining = self.budget
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policy or self.max_resolution or self.budget)
+
+    def _rank(self, renditions: List[Dict]) -> List[Dict]:
+        """按优先顺序排列候选版本"""
+        by_quality = sorted(renditions, key=lambda r: (r['bit_rate'], r['data_size'] is not None, r['data_size'] or 0),
+                            reverse=True)
+        if self.policy == LOWEST:
+            return sorted(renditions, key=lambda r: (r['data_size'] or float("inf"), r['bit_rate']))
+        if self.max_resolution:
+            fitting = [r for r in by_quality if (_short_side(r) or 0) <= self.max_resolution]
+            if fitting:
+                return fitting
+            return sorted(renditions, key=lambda r: (_short_side(r) or 0, r['data_size'] or float("inf")))
+        return by_quality
+
+    def select(self, aweme: Dict) -> Optional[Dict]:
+        """返回要下载的版本；启用预算时同时从预算中扣除其大小，预算不足时返回None"""
+        if not self.enabled:
+            return play_addr_rendition(aweme)
+        renditions = list_renditions(aweme)
+        ranked = self._rank(renditions)
+        if self.budget is None:
+            return ranked[0]
+        known = [r for r in renditions if r['data_size']]
+        with self._lock:
+            if not known:
+                # 无法按大小核对预算，退而选码率最低的版本
+                return min(ranked, key=lambda r: r['bit_rate']) if self.remaining > 0 else None
+            for rendition in [r for r in ranked if r['data_size']] + sorted(known, key=lambda r: r['data_size']):
+                if rendition['data_size'] <= self.remaining:
+                    self.remaining -= rendition['data_size']
+                    return rendition
+        return None
+
+    def refund(self, rendition: Dict):
+        """下载没有完成时把预留的预算还回去"""
+        if self.budget is not None:
+            with self._lock:
+                self.remaining += rendition['data_size'] or 0
+
+    def charge(self, rendition: Dict, actual_bytes: int):
+        """下载完成后按实际写入的字节数结算: 补扣与预留大小 (大小未知时为0) 的差额"""
+        if self.budget is not None:
+            with self._lock:
+                self.remaining -= actual_bytes - (rendition['data_size'] or 0)
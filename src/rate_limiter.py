@@ -0,0 +1,115 @@
+# rate_limiter.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 按账号和接口自适应限速：令牌桶控制请求速率，AIMD调整速率与并发数
+
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import (
+    RATE_LIMIT_INITIAL_RPS, RATE_LIMIT_MIN_RPS, RATE_LIMIT_MAX_RPS, RATE_LIMIT_INCREASE, RATE_LIMIT_DECREASE,
+    RATE_LIMIT_BURST, RATE_LIMIT_MAX_CONCURRENCY, RATE_LIMIT_COOLDOWN
+)
+
+# 表示被限流或风控的HTTP状态码
+THROTTLE_STATUS_CODES = (403, 429)
+
+# release() 的结果类型
+OK = "ok"
+THROTTLED = "throttled"
+ERROR = "error"
+
+
+def looks_throttled(data: Optional[Dict]) -> bool:
+    """接口返回了JSON但内容表明被限流: 作品列表为空却声称还有更多"""
+    return isinstance(data, dict) and not data.get('aweme_list') and bool(data.get('has_more'))
+
+
+class AdaptiveRateLimiter:
+    """单个 (账号, 接口) 的限速器。
+
+    令牌桶按当前速率发放请求许可，同时限制同时进行中的请求数。每次成功后速率与并发数线性增加，
+    触发风控时两者按比例减半并暂停一段时间 (加性增、乘性减)，从而逐步逼近不触发风控的最高速率。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rate = RATE_LIMIT_INITIAL_RPS  # 每秒请求数
+        self.concurrency = 1.0  # 允许同时进行的请求数
+        self.in_flight = 0
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """尝试取得一次请求许可。成功返回0，否则返回建议等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(RATE_LIMIT_BURST, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.in_flight >= int(self.concurrency):
+                return 0.05
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+            self.in_flight += 1
+            return 0
+
+    def acquire(self, should_stop: Callable[[], bool] = None) -> bool:
+        """阻塞直到取得许可；should_stop返回True时放弃并返回False"""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if should_stop and should_stop():
+                return False
+            time.sleep(min(wait, 0.5))
+
+    async def acquire_async(self, should_stop: Callable[[], bool] = None) -> bool:
+        """acquire的协程版本，等待期间不阻塞事件循环"""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if should_stop and should_stop():
+                return False
+            await asyncio.sleep(min(wait, 0.5))
+
+    def release(self, outcome: str = OK):
+        """请求结束后归还许可。outcome为 OK / THROTTLED / ERROR (网络错误不调整速率)"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if outcome == OK:
+                self.rate = min(RATE_LIMIT_MAX_RPS, self.rate + RATE_LIMIT_INCREASE)
+                self.concurrency = min(RATE_LIMIT_MAX_CONCURRENCY, self.concurrency + 1 / self.concurrency)
+            elif outcome == THROTTLED:
+                self.rate = max(RATE_LIMIT_MIN_RPS, self.rate * RATE_LIMIT_DECREASE)
+                self.concurrency = max(1.0, self.concurrency * RATE_LIMIT_DECREASE)
+                self._tokens = 0
+                self._paused_until = time.monotonic() + RATE_LIMIT_COOLDOWN
+                print(f"  [限速] {self.name} 疑似触发风控，速率降至 {self.rate:.2f} 次/秒，暂停 {RATE_LIMIT_COOLDOWN} 秒")
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(account_key: str, url: str) -> AdaptiveRateLimiter:
+    """同一进程内，同一账号访问同一接口的所有任务共用一个限速器"""
+    key = (account_key, urlsplit(url).path)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = AdaptiveRateLimiter(f"{key[1].rstrip('/').rsplit('/', 1)[-1]}@{account_key[:6]}")
+        return _limiters[key]
@@ -0,0 +1,118 @@
+# retry.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 重试策略：指数退避加随机抖动、按主机延迟分位数计算超时、按主机熔断
+
+import time
+import random
+import threading
+from collections import deque
+from typing import Dict
+from urllib.parse import urlsplit
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import (
+    API_RETRY_ATTEMPTS, API_RETRY_BASE_DELAY, API_RETRY_MAX_DELAY, CDN_RETRY_BASE_DELAY, CDN_RETRY_MAX_DELAY,
+    RETRY_TIMEOUT_PERCENTILE, RETRY_TIMEOUT_MULTIPLIER, RETRY_TIMEOUT_MIN, RETRY_TIMEOUT_MAX,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN
+)
+
+# 每个主机保留的最近延迟样本数，样本少于LATENCY_MIN_SAMPLES时使用调用方给出的默认超时
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 10
+
+
+class RetryPolicy:
+    """指数退避加随机抖动 (full jitter)：第n次重试前等待 0 ~ min(max_delay, base_delay * 2^(n-1)) 秒"""
+
+    def __init__(self, attempts: int, base_delay: float, max_delay: float):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+API_RETRY = RetryPolicy(API_RETRY_ATTEMPTS, API_RETRY_BASE_DELAY, API_RETRY_MAX_DELAY)
+CDN_RETRY = RetryPolicy(0, CDN_RETRY_BASE_DELAY, CDN_RETRY_MAX_DELAY)  # 次数由下载逻辑按镜像数量决定
+
+
+class HostHealth:
+    """单个主机的延迟统计与熔断器。
+
+    连续失败达到CIRCUIT_FAILURE_THRESHOLD次后熔断，CIRCUIT_COOLDOWN秒内不再向该主机发请求；
+    冷却结束后只放行一个探测请求，成功则恢复，失败则重新熔断。
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def timeout(self, default: float) -> float:
+        """根据近期延迟的分位数给出读超时，样本不足时返回default"""
+        with self._lock:
+            if len(self._latencies) < LATENCY_MIN_SAMPLES:
+                return default
+            samples = sorted(self._latencies)
+        percentile = samples[int(RETRY_TIMEOUT_PERCENTILE * (len(samples) - 1))]
+        return min(max(percentile * RETRY_TIMEOUT_MULTIPLIER, RETRY_TIMEOUT_MIN), RETRY_TIMEOUT_MAX)
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < CIRCUIT_COOLDOWN
+
+    def allow(self) -> float:
+        """是否可以发出请求: 可以时返回0，否则返回建议等待的秒数"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            now = time.monotonic()
+            remaining = self._opened_at + CIRCUIT_COOLDOWN - now
+            if remaining > 0:
+                return remaining
+            # 半开状态: 同一时间只放行一个探测请求 (探测请求超时未归还时允许再放行一个)
+            if self._probe_started is not None and now - self._probe_started < RETRY_TIMEOUT_MAX:
+                return 1.0
+            self._probe_started = now
+            return 0
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            if self._opened_at is not None:
+                print(f"  [熔断] {self.host} 已恢复")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            half_open = self._probe_started is not None
+            if half_open or (self._opened_at is None and self._failures >= CIRCUIT_FAILURE_THRESHOLD):
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+                print(f"  [熔断] {self.host} 连续失败 {self._failures} 次，暂停请求 {CIRCUIT_COOLDOWN} 秒")
+
+
+_hosts: Dict[str, HostHealth] = {}
+_hosts_lock = threading.Lock()
+
+def get_host_health(url: str) -> HostHealth:
+    """同一进程内，同一主机共用一个HostHealth"""
+    host = urlsplit(url).netloc
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = HostHealth(host)
+        return _hosts[host]
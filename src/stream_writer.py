@@ -0,0 +1,189 @@
+# stream_writer.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 高吞吐写入：把响应体读入复用的缓冲区，块大小随速度调整，由独立的写线程写盘，网络与磁盘IO互相重叠
+
+import os
+import time
+import queue
+import threading
+import requests
+from typing import Callable, Optional
+from urllib3.exceptions import ProtocolError, ReadTimeoutError, DecodeError, SSLError
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import (
+    WRITE_CHUNK_MIN, WRITE_CHUNK_MAX, WRITE_CHUNK_TARGET_SECONDS, WRITE_QUEUE_DEPTH, WRITE_PROGRESS_INTERVAL
+)
+
+# 预分配的临时文件旁记录已写入字节数的文件，进程异常退出后据此截断再续传
+PREALLOC_SUFFIX = ".prealloc"
+
+
+class AdaptiveChunkSize:
+    """按最近的读取速度选择下一次读取的块大小: 约等于WRITE_CHUNK_TARGET_SECONDS秒的数据量，
+    取2的幂并限制在WRITE_CHUNK_MIN ~ WRITE_CHUNK_MAX之间。慢速连接用小块，保证停止、限速和卡顿检测及时生效"""
+
+    def __init__(self):
+        self.size = WRITE_CHUNK_MIN
+        self._speed = None
+
+    def update(self, nbytes: int, seconds: float):
+        speed = nbytes / max(seconds, 1e-4)
+        self._speed = speed if self._speed is None else self._speed * 0.7 + speed * 0.3
+        wanted = self._speed * WRITE_CHUNK_TARGET_SECONDS
+        size = WRITE_CHUNK_MIN
+        while size * 2 <= min(wanted, WRITE_CHUNK_MAX):
+            size *= 2
+        self.size = size
+
+
+class FileWriter:
+    """在后台线程按顺序写入缓冲区。缓冲区最多WRITE_QUEUE_DEPTH个，按需分配并循环使用；
+    全部在写入队列中时acquire()阻塞，读取速度因此不会超过磁盘速度"""
+
+    def __init__(self, f, on_written: Callable[[int], None] = None, progress_path: str = None):
+        self.f = f
+        self.on_written = on_written
+        self.progress_path = progress_path
+        self.written = 0
+        self._free = queue.Queue()
+        self._allocated = 0
+        self._pending = queue.Queue()
+        self._error = None
+        self._last_progress = 0
+        self._thread = threading.Thread(target=self._run, name="file-writer", daemon=True)
+        self._thread.start()
+
+    def acquire(self) -> bytearray:
+        if self._free.empty() and self._allocated < WRITE_QUEUE_DEPTH:
+            self._allocated += 1
+            return bytearray(WRITE_CHUNK_MAX)
+        return self._free.get()
+
+    def release(self, buffer: bytearray):
+        self._free.put(buffer)
+
+    def write(self, buffer: bytearray, length: int):
+        """把buffer的前length字节交给写线程，写完后buffer回到空闲队列"""
+        if self._error:
+            self.release(buffer)
+            raise self._error
+        self._pending.put((buffer, length))
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            buffer, length = item
+            try:
+                if self._error is None:
+                    self.f.write(memoryview(buffer)[:length])
+                    self.written += length
+                    if self.on_written:
+                        self.on_written(length)
+                    if self.progress_path and self.written - self._last_progress >= WRITE_PROGRESS_INTERVAL:
+                        self._save_progress()
+            except OSError as e:
+                self._error = e
+            finally:
+                self.release(buffer)
+
+    def _save_progress(self):
+        self.f.flush()
+        with open(self.progress_path, 'w', encoding='utf-8') as progress:
+            progress.write(str(self.f.tell()))
+        self._last_progress = self.written
+
+    def close(self):
+        """等待队列中的数据全部写完；写入出错时抛出该错误"""
+        self._pending.put(None)
+        self._thread.join()
+        if self._error:
+            raise self._error
+
+
+def _read_into(raw, view: memoryview) -> int:
+    """与requests.iter_content相同，把urllib3的异常转换为requests的异常"""
+    try:
+        return raw.readinto(view)
+    except ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e)
+    except DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e)
+    except ReadTimeoutError as e:
+        raise requests.exceptions.ConnectionError(e)
+    except SSLError as e:
+        raise requests.exceptions.SSLError(e)
+
+
+def copy_response(response: requests.Response, f, limit: int = None,
+                  on_read: Callable[[int], bool] = None, on_written: Callable[[int], None] = None,
+                  progress_path: str = None) -> int:
+    """把流式响应写入已定位好的文件f，返回读取的字节数。
+
+    limit为最多读取的字节数；on_read(n)在每读到一块数据后于当前线程调用，返回False时停止读取，
+    抛出的异常会在已读数据写完后继续向上传递；on_written(n)在写线程中每写完一块后调用。
+    """
+    raw = response.raw
+    raw.decode_content = True
+    chunk = AdaptiveChunkSize()
+    writer = FileWriter(f, on_written, progress_path)
+    received = 0
+    try:
+        while limit is None or received < limit:
+            buffer = writer.acquire()
+            size = chunk.size if limit is None else min(chunk.size, limit - received)
+            started = time.monotonic()
+            try:
+                length = _read_into(raw, memoryview(buffer)[:size])
+            except BaseException:
+                writer.release(buffer)
+                raise
+            if not length:
+                writer.release(buffer)
+                break
+            chunk.update(length, time.monotonic() - started)
+            writer.write(buffer, length)
+            received += length
+            if on_read and on_read(length) is False:
+                break
+    finally:
+        writer.close()
+    return received
+
+
+def preallocate(f, size: int):
+    """为文件预留size字节的磁盘空间，减少大文件写入过程中的碎片与元数据更新"""
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except (AttributeError, OSError):
+        f.truncate(size)  # Windows等不支持fallocate的系统退化为设置文件长度
+
+
+def recover_preallocated(part_path: str) -> Optional[int]:
+    """进程异常退出时预分配的临时文件长度不代表已下载的数据: 按记录截断，没有记录时删除。
+    返回恢复后的长度，不存在预分配记录时返回None"""
+    progress_path = part_path + PREALLOC_SUFFIX
+    if not os.path.exists(progress_path):
+        return None
+    try:
+        with open(progress_path, 'r', encoding='utf-8') as progress:
+            written = int(progress.read().strip() or 0)
+    except (OSError, ValueError):
+        written = 0
+    if os.path.exists(part_path):
+        if written:
+            with open(part_path, 'r+b') as f:
+                f.truncate(written)
+        else:
+            os.remove(part_path)
+    os.remove(progress_path)
+    return written
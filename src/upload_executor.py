@@ -0,0 +1,118 @@
+# upload_executor.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 多账号并行上传：每个账号一个线程，各自使用独立的浏览器与会话池，不同账号之间互不等待
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import UPLOAD_MAX_PARALLEL_ACCOUNTS, UPLOAD_INTERVAL
+from .upload_session_pool import UploadSessionPool
+
+# 进程内所有批量上传任务共用: 同时运行的账号数上限，以及每个账号的锁 (同一用户数据目录不能同时被两个浏览器打开)
+_account_slots = threading.BoundedSemaphore(max(1, UPLOAD_MAX_PARALLEL_ACCOUNTS))
+_account_locks: Dict[str, threading.Lock] = {}
+_account_locks_lock = threading.Lock()
+
+
+def _account_lock(account_name: str) -> threading.Lock:
+    with _account_locks_lock:
+        return _account_locks.setdefault(account_name, threading.Lock())
+
+
+class UploadExecutor:
+    """把同一批视频上传到多个账号。
+
+    每个账号在单独的线程中依次上传全部视频，使用本线程的UploadSessionPool (Playwright同步接口的对象不能跨线程)；
+    同时运行的账号数受进程内的全局上限UPLOAD_MAX_PARALLEL_ACCOUNTS限制，等待中的账号不会启动浏览器；
+    同一账号在进程内同一时间只有一个线程在上传。整批耗时约等于最慢的账号上传完全部视频的时间。
+
+    upload(account_name, video_path, tags, session_pool)执行一次上传并返回是否成功；
+    should_stop()返回True时各账号在当前视频传完后结束。
+    """
+
+    def __init__(self, upload: Callable[[str, str, List[str], UploadSessionPool], bool],
+                 should_stop: Callable[[], bool] = None, interval: float = None,
+                 log: Callable[[str], None] = print):
+        self.upload = upload
+        self.should_stop = should_stop or (lambda: False)
+        self.interval = UPLOAD_INTERVAL if interval is None else interval
+        self.log = log
+        self._lock = threading.Lock()
+        self.results: Dict[str, Dict[str, int]] = {}
+        self.launches = 0
+
+    def _sleep(self, seconds: float) -> bool:
+        """可被停止请求打断的等待，被打断时返回False"""
+        deadline = time.monotonic() + seconds
+        while not self.should_stop():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.2))
+        return False
+
+    def _acquire(self, lock, account_name: str, reason: str) -> bool:
+        """等待锁或名额，收到停止请求时返回False"""
+        if lock.acquire(blocking=False):
+            return True
+        self.log(f"[{account_name}] {reason}")
+        while not lock.acquire(timeout=0.5):
+            if self.should_stop():
+                return False
+        return True
+
+    def _run_account(self, account_name: str, videos: List[Tuple[str, List[str]]]):
+        result = self.results[account_name]
+        account_lock = _account_lock(account_name)
+        if not self._acquire(account_lock, account_name, "该账号正在被其他上传任务使用，等待其完成..."):
+            return
+        try:
+            if not self._acquire(_account_slots, account_name, "同时上传的账号数已达上限，排队等待..."):
+                return
+            session_pool = UploadSessionPool()
+            try:
+                for i, (video_path, tags) in enumerate(videos, 1):
+                    if self.should_stop():
+                        break
+                    self.log(f"[{account_name}] 上传视频 {i}/{len(videos)}: {Path(video_path).name}")
+                    try:
+                        ok = self.upload(account_name, video_path, tags, session_pool)
+                    except Exception as e:
+                        self.log(f"[{account_name}] 上传时发生错误: {e}")
+                        ok = False
+                    with self._lock:
+                        result["success" if ok else "failed"] += 1
+                    self.log(f"[{account_name}] {'✓ 上传成功' if ok else '✗ 上传失败'}: {Path(video_path).name}")
+                    if i < len(videos) and not self._sleep(self.interval):
+                        break
+            finally:
+                with self._lock:
+                    self.launches += session_pool.launches
+                try:
+                    session_pool.close()
+                finally:
+                    _account_slots.release()
+        finally:
+            account_lock.release()
+        self.log(f"[{account_name}] 完成: 成功 {result['success']} 个，失败 {result['failed']} 个")
+
+    def run(self, account_names: List[str], videos: List[Tuple[str, List[str]]]) -> Dict[str, Dict[str, int]]:
+        """把videos ([(视频路径, 标签列表)]) 上传到每个账号，返回 账号 -> {"success": n, "failed": n}"""
+        account_names = list(dict.fromkeys(account_names))
+        self.results = {name: {"success": 0, "failed": 0} for name in account_names}
+        if not account_names or not videos:
+            return self.results
+        with ThreadPoolExecutor(max_workers=len(account_names), thread_name_prefix="upload") as pool:
+            for future in [pool.submit(self._run_account, name, videos) for name in account_names]:
+                future.result()
+        return self.results
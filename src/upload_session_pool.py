@@ -0,0 +1,109 @@
+# upload_session_pool.py
+# -*- coding: utf-8 -*-
+# @Author: Loki Wang
+# 上传会话池：批量上传时每个账号保持一个已登录的浏览器上下文，多个视频复用，不再每个视频都启动一次浏览器
+
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import UPLOAD_SESSION_MAX_UPLOADS
+from .uploader import Uploader, browsers_ready, start_playwright
+
+
+class UploadSession:
+    """一个账号的浏览器会话: 持久化上下文、上传页面与已上传的视频数"""
+
+    def __init__(self, account_name: str, uploader: Uploader, page):
+        self.account_name = account_name
+        self.uploader = uploader
+        self.page = page
+        self.uploads = 0
+
+
+class UploadSessionPool:
+    """按账号缓存浏览器会话。
+
+    每个账号第一次上传时启动浏览器并等待登录，之后的视频直接在同一页面上传；
+    每次取用前做健康检查，页面失效时重新打开页面，浏览器失效时重启；
+    同一会话上传UPLOAD_SESSION_MAX_UPLOADS个视频后重启浏览器，限制内存占用。
+    Playwright同步接口的对象只能在创建它的线程中使用，因此会话池只能在一个线程中使用，
+    池中所有账号共用该线程的一个Playwright实例 (同一线程不能启动多个)。
+    """
+
+    def __init__(self, max_uploads: int = None):
+        self.max_uploads = max(1, max_uploads or UPLOAD_SESSION_MAX_UPLOADS)
+        self._playwright = None
+        self._sessions: Dict[str, UploadSession] = {}
+        self.launches = 0  # 启动浏览器的次数
+
+    def _start(self, account_name: str, user_data_dir: str) -> UploadSession:
+        if self._playwright is None:
+            # 检查浏览器需要单独启动一次Playwright，并设置PLAYWRIGHT_BROWSERS_PATH，必须在共用实例启动之前
+            if not browsers_ready():
+                print("  [会话] 尝试使用系统中已安装的Playwright...")
+            self._playwright = start_playwright()
+        uploader = Uploader(user_data_dir, playwright=self._playwright)
+        try:
+            page = uploader.start_session()
+        except Exception:
+            uploader.end_session()
+            raise
+        self.launches += 1
+        session = UploadSession(account_name, uploader, page)
+        self._sessions[account_name] = session
+        return session
+
+    def acquire(self, account_name: str, user_data_dir: str) -> UploadSession:
+        """返回账号可用的会话，必要时启动、恢复或重启浏览器。启动失败时抛出异常"""
+        session = self._sessions.get(account_name)
+        if session and session.uploads >= self.max_uploads:
+            print(f"  [会话] 账号 '{account_name}' 的浏览器已上传 {session.uploads} 个视频，重启以释放内存")
+            self.close_session(account_name)
+            session = None
+        if session and not session.uploader.is_alive(session.page):
+            print(f"  [会话] 账号 '{account_name}' 的上传页面已失效，重新打开...")
+            try:
+                session.page = session.uploader.open_upload_page()
+            except Exception as e:
+                print(f"  [会话] 无法重新打开上传页面 ({e})，重启浏览器")
+                self.close_session(account_name)
+                session = None
+        if session is None:
+            session = self._start(account_name, user_data_dir)
+        return session
+
+    def upload(self, account_name: str, user_data_dir: str, video_path: str, title: str, tags: List[str] = None) -> bool:
+        """用账号的会话上传一个视频，返回是否发布成功"""
+        session = self.acquire(account_name, user_data_dir)
+        session.uploads += 1
+        try:
+            return session.uploader.upload_single_video(session.page, video_path, title, tags or [])
+        except Exception as e:
+            # 页面崩溃时出错截图也会失败，下次取用时健康检查会恢复会话
+            print(f"上传 '{video_path}' 时浏览器出错: {e}")
+            return False
+
+    def close_session(self, account_name: str):
+        """关闭账号的浏览器会话 (该账号的视频上传完后调用，释放内存)"""
+        session = self._sessions.pop(account_name, None)
+        if session:
+            session.uploader.end_session()
+
+    def close(self):
+        """关闭所有会话与Playwright"""
+        for account_name in list(self._sessions):
+            self.close_session(account_name)
+        playwright, self._playwright = self._playwright, None
+        if playwright:
+            playwright.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -7,6 +7,7 @@ import time
 import subprocess
 import sys
 import platform
+import threading
 from playwright.sync_api import sync_playwright, Browser, Page, Playwright, TimeoutError as PlaywrightTimeoutError
 from rich.console import Console
 
@@ -115,6 +116,19 @@ def ensure_playwright_browsers():
         return False
 
 
+_browsers_ready = False
+_browsers_lock = threading.Lock()
+
+def browsers_ready() -> bool:
+    """ensure_playwright_browsers的缓存版本: 检查需要启动一次Playwright，进程内检查通过后不再重复；
+    检查失败时不缓存，下次启动浏览器时重新检查 (可能已手动安装)"""
+    global _browsers_ready
+    with _browsers_lock:
+        if not _browsers_ready:
+            _browsers_ready = ensure_playwright_browsers()
+        return _browsers_ready
+
+
 def _install_playwright_standard():
     """标准的Playwright安装方法"""
     # 构建安装命令参数
@@ -336,48 +350,50 @@ def _has_system_chrome():
     
     return False
 
+def start_playwright() -> Playwright:
+    """启动Playwright，失败时重新导入后再试一次"""
+    try:
+        return sync_playwright().start()
+    except Exception as e:
+        console.print(f"[red]无法启动Playwright: {e}[/red]")
+        # 尝试获取系统中已安装的Playwright路径
+        try:
+            # 尝试使用系统Python的Playwright
+            console.print("[yellow]尝试使用系统中已安装的Playwright...[/yellow]")
+            # 这是一个备选方案，直接尝试重新导入
+            from playwright.sync_api import sync_playwright as retry_sync_playwright
+            return retry_sync_playwright().start()
+        except Exception as e2:
+            raise RuntimeError(f"无法初始化Playwright: {e2}")
+
 class Uploader:
     """负责通过模拟浏览器操作上传视频到抖音 (已重构为会话模式，支持批量上传)"""
 
-    def __init__(self, user_data_dir: str):
+    def __init__(self, user_data_dir: str, playwright: Playwright = None):
         self.user_data_dir = os.path.abspath(user_data_dir)
         os.makedirs(self.user_data_dir, exist_ok=True)
-        self.playwright: Playwright = None
+        # 传入playwright时共用调用方的实例 (同一线程只能启动一个)，关闭会话时不停止它
+        self.playwright: Playwright = playwright
+        self._owns_playwright = playwright is None
         self.browser: Browser = None
         print(f"上传器初始化完成。")
 
     def start_session(self) -> Page:
         """启动Playwright，打开浏览器，并处理一次性登录。返回一个可用的页面对象。"""
-        # 确保Playwright浏览器已安装
-        if not ensure_playwright_browsers():
-            # 如果安装失败，尝试使用系统安装的Playwright
+        # 确保Playwright浏览器已安装 (进程内只检查一次)；传入共用的playwright时由调用方在启动它之前检查，
+        # 此时检查会在同一线程中再启动一次同步Playwright而失败
+        if self._owns_playwright and not browsers_ready():
+            # 如果安装失败，仍尝试直接启动 (可能使用系统中已安装的浏览器)
             console.print("[yellow]尝试使用系统中已安装的Playwright...[/yellow]")
-            # 尝试直接启动，不依赖ensure_playwright_browsers的返回值
-            try:
-                # 跳过安装检查，直接尝试启动
-                pass
-            except Exception:
-                raise RuntimeError("无法安装或使用Playwright浏览器")
-            
+
         # 在启动前再次检查环境变量
         if hasattr(sys, '_MEIPASS'):
             console.print(f"[cyan]当前打包环境: {sys._MEIPASS}[/cyan]")
             console.print(f"[cyan]PLAYWRIGHT_BROWSERS_PATH: {os.environ.get('PLAYWRIGHT_BROWSERS_PATH', '未设置')}[/cyan]")
         
         # 尝试启动Playwright
-        try:
-            self.playwright = sync_playwright().start()
-        except Exception as e:
-            console.print(f"[red]无法启动Playwright: {e}[/red]")
-            # 尝试获取系统中已安装的Playwright路径
-            try:
-                # 尝试使用系统Python的Playwright
-                console.print("[yellow]尝试使用系统中已安装的Playwright...[/yellow]")
-                # 这是一个备选方案，直接尝试重新导入
-                from playwright.sync_api import sync_playwright
-                self.playwright = sync_playwright().start()
-            except Exception as e2:
-                raise RuntimeError(f"无法初始化Playwright: {e2}")
+        if self.playwright is None:
+            self.playwright = start_playwright()
         
         console.print("[green]正在启动浏览器...[/green]")
         
@@ -474,9 +490,14 @@ class Uploader:
             os.makedirs(self.user_data_dir, exist_ok=True)
             console.print(f"[yellow]已确保用户数据目录存在: {self.user_data_dir}[/yellow]")
             raise RuntimeError(error_msg)
-        
+
+        return self.open_upload_page()
+
+    def open_upload_page(self) -> Page:
+        """在已启动的浏览器中打开上传页面并等待登录，返回页面对象。页面失效 (被关闭或崩溃) 后可再次调用"""
         # 获取页面对象
-        page = self.browser.pages[0] if self.browser.pages else self.browser.new_page()
+        live_pages = [page for page in self.browser.pages if not page.is_closed()]
+        page = live_pages[0] if live_pages else self.browser.new_page()
         
         # 导航到上传页面
         upload_url = "https://creator.douyin.com/creator-micro/content/upload"
@@ -584,8 +605,24 @@ class Uploader:
         finally:
             self.end_session()
 
+    def is_alive(self, page: Page) -> bool:
+        """健康检查: 浏览器与页面都还能响应脚本"""
+        if not self.browser or page is None or page.is_closed():
+            return False
+        try:
+            page.evaluate("1")
+            return True
+        except Exception:
+            return False
+
     def end_session(self):
         """关闭浏览器和Playwright会话。"""
-        if self.browser: self.browser.close()
-        if self.playwright: self.playwright.stop()
+        browser, self.browser = self.browser, None
+        try:
+            if browser: browser.close()
+        except Exception as e:
+            console.print(f"[yellow]关闭浏览器时出错: {e}[/yellow]")
+        if self.playwright and self._owns_playwright:
+            self.playwright.stop()
+            self.playwright = None
         print("浏览器会话已关闭。")
\ No newline at end of file
@@ -5,6 +5,7 @@
 
 import os
 import sys
+import asyncio
 import subprocess
 import threading
 import time
@@ -18,7 +19,15 @@ sys.path.insert(0, str(project_root))
 try:
     from src.account_manager import AccountManager
     from src.uploader import Uploader
+    from src.upload_session_pool import UploadSessionPool
+    from src.upload_executor import UploadExecutor
     from src.downloader import Downloader
+    from src.async_downloader import AsyncDownloader
+    from src.account_pool import build_account_pool
+    from src.bandwidth import bandwidth_limiter_from_spec
+    from src.bulk_downloader import BulkDownloader, read_manifest, summarize, write_report, default_report_path
+    from src.dedupe import Deduplicator, start_background_dedupe
+    from src.quality_selector import QualitySelector
     from src.video_processor import VideoProcessor
 except ImportError as e:
     print(f"导入错误: {e}")
@@ -34,6 +43,12 @@ except ImportError as e:
     class Downloader:
         def __init__(self, *args, **kwargs):
             pass
+
+        def close(self):
+            pass
+    
+    class AsyncDownloader(Downloader):
+        pass
     
     class VideoProcessor:
         def __init__(self):
@@ -70,6 +85,18 @@ class WorkerCTK:
         self.process_videos = False  # 是否处理视频
         self.frame_delete_ratio = 0.1  # 要删除的帧比例
         self.video_processor = VideoProcessor()
+        
+        # 下载相关配置
+        self.download_workers = None  # 并发下载视频数，None表示使用默认值
+        self.download_backend = "requests"  # 下载引擎: requests(每个任务独立线程) 或 asyncio(共享事件循环)
+        self.incremental_sync = False  # 主页作品只同步上次之后发布的作品
+        self.metadata_only = False  # 只抓取作品信息写入JSONL，不下载视频
+        self.shard_accounts = None  # 分担请求的账号名列表，空列表表示所有已配置Cookie的账号，None表示不分担
+        self.bandwidth_limit = None  # 每个下载任务的CDN限速，如 "2M"，None表示不限速
+        self.bandwidth_schedule = ""  # 按时段限速，如 "09:00-18:00=2M,18:00-09:00=0"
+        self.dedupe_after_download = False  # 下载任务完成后在后台对下载目录按内容去重
+        self.download_quality = None  # 清晰度选择，如 "540p"、"lowest"、"720p,budget=5G"，None表示使用config中的默认值
+        self.download_assets = None  # 要下载的资源，如 "audio"、"audio,cover"，None表示只下载视频
     
     def log(self, message: str):
         """记录日志消息"""
@@ -195,6 +222,7 @@ class WorkerCTK:
             
             if not self.is_stopping:
                 self.log("下载任务完成")
+                self._dedupe_in_background()
                 if callable(self.finished_callback):
                     self.finished_callback("success", "下载任务完成")
                     
@@ -204,6 +232,67 @@ class WorkerCTK:
             if callable(self.finished_callback):
                 self.finished_callback("error", error_msg)
     
+    def run_bulk_download(self, account_name: str, manifest_path: str, custom_path: str = ""):
+        """按清单文件批量下载，所有链接共用一个下载器，完成后在下载目录生成结果报告"""
+        try:
+            self.is_stopping = False
+            self.log(f"开始批量下载任务 - 账号: {account_name}, 清单: {manifest_path}")
+
+            account_info = self.account_manager.get_account(account_name)
+            if not account_info:
+                raise Exception(f"账号 '{account_name}' 不存在")
+            if not account_info.get('cookie'):
+                raise Exception(f"账号 '{account_name}' 没有配置Cookie，请先更新Cookie")
+
+            urls = read_manifest(manifest_path)
+            if not urls:
+                raise Exception("清单文件中没有链接")
+
+            self.downloader = self._create_downloader(account_name, account_info['cookie'], custom_path)
+            try:
+                rows = BulkDownloader(self.downloader, incremental=self.incremental_sync).run(urls)
+            finally:
+                self.downloader.close()
+
+            for row in rows:
+                if row['status'] != 'ok':
+                    self.log(f"  [{row['status']}] {row['url']} {row.get('error') or ''}")
+            report_path = write_report(rows, default_report_path(self.downloader.download_path))
+            summary = "，".join(f"{status} {count} 条" for status, count in summarize(rows).items())
+            self.log(f"批量下载结果: {summary}，报告: {report_path}")
+
+            if not self.is_stopping:
+                self._dedupe_in_background()
+                if callable(self.finished_callback):
+                    self.finished_callback("success", f"批量下载任务完成: {summary}")
+
+        except Exception as e:
+            error_msg = f"批量下载失败: {str(e)}"
+            self.log(error_msg)
+            if callable(self.finished_callback):
+                self.finished_callback("error", error_msg)
+
+    def run_dedupe(self, custom_path: str = ""):
+        """对下载目录按内容去重，把重复的文件替换为硬链接或reflink"""
+        try:
+            self.log(f"开始去重: {custom_path or '默认下载目录'}")
+            summary = Deduplicator(custom_path or None).run()
+            message = (f"去重完成: {summary['groups']} 组重复文件，替换 {summary['linked']} 个，"
+                       f"释放 {summary['reclaimed'] / 1024 / 1024:.1f} MB，失败 {summary['errors']} 个")
+            self.log(message)
+            if callable(self.finished_callback):
+                self.finished_callback("success", message)
+        except Exception as e:
+            error_msg = f"去重失败: {str(e)}"
+            self.log(error_msg)
+            if callable(self.finished_callback):
+                self.finished_callback("error", error_msg)
+
+    def _dedupe_in_background(self):
+        if self.dedupe_after_download and self.downloader is not None:
+            self.log("在后台对下载目录去重...")
+            start_background_dedupe(self.downloader.download_path)
+
     def _download_user_posts(self, args: Dict):
         """下载用户主页作品"""
         self.log("开始下载用户主页作品...")
@@ -252,47 +341,75 @@ class WorkerCTK:
             cookie = account_info.get('cookie')
             
             # 动态创建downloader实例并保存为类属性
-            self.downloader = Downloader(cookie, args.get('custom_path', ''))
-            
-            # 根据模式调用相应的下载方法
-            if mode == 'post':
-                self.downloader.download_from_post(args['url'])
-                result = True
-            elif mode == 'like':
-                self.downloader.download_from_like()
-                result = True
-            elif mode == 'collection':
-                self.downloader.download_from_collection(args['url'])
-                result = True
-            elif mode == 'collects':
-                self.downloader.download_from_collects(args['url'])
-                result = True
-            elif mode == 'mix':
-                self.downloader.download_from_mix(args['url'])
-                result = True
-            elif mode == 'music':
-                self.downloader.download_from_music(args['url'])
-                result = True
-            elif mode == 'live':
-                self.downloader.download_live(args['url'])
-                result = True
-            elif mode == 'one':
-                self.downloader.download_from_url(args['url'])
-                result = True
-            else:
-                result = False
+            self.downloader = self._create_downloader(args['account_name'], cookie, args.get('custom_path', ''))
             
+            # 根据模式调用相应的下载方法，结束后释放下载线程池与元数据文件 (GUI长期运行，每个任务都会新建下载器)
+            try:
+                if mode == 'post':
+                    self._call_downloader(self.downloader.download_from_post, args['url'], incremental=self.incremental_sync)
+                    result = True
+                elif mode == 'like':
+                    self._call_downloader(self.downloader.download_from_like)
+                    result = True
+                elif mode == 'collection':
+                    self._call_downloader(self.downloader.download_from_collection, args['url'])
+                    result = True
+                elif mode == 'collects':
+                    self._call_downloader(self.downloader.download_from_collects, args['url'])
+                    result = True
+                elif mode == 'mix':
+                    self._call_downloader(self.downloader.download_from_mix, args['url'])
+                    result = True
+                elif mode == 'music':
+                    self._call_downloader(self.downloader.download_from_music, args['url'])
+                    result = True
+                elif mode == 'live':
+                    self._call_downloader(self.downloader.download_live, args['url'])
+                    result = True
+                elif mode == 'one':
+                    self._call_downloader(self.downloader.download_from_url, args['url'])
+                    result = True
+                else:
+                    result = False
+            finally:
+                self.downloader.close()
+
             if not result:
                 raise Exception("下载失败")
                 
         except Exception as e:
             raise Exception(f"执行下载命令时发生错误: {str(e)}")
     
-    def run_single_upload(self, account_name: str, video_path: str, tags: List[str] = None):
-        """运行单个视频上传任务"""
+    def _create_downloader(self, account_name: str, cookie: str, custom_path: str):
+        """按当前设置创建下载器；shard_accounts不为None时公开接口的请求由多个账号分担，限速、清晰度或资源类型设置有误时抛出ValueError"""
+        account_pool = None
+        if self.shard_accounts is not None:
+            account_pool = build_account_pool(self.account_manager.accounts, account_name, self.shard_accounts)
+            self.log(f"请求将由 {len(account_pool)} 个账号分担")
+        bandwidth = bandwidth_limiter_from_spec("本任务", self.bandwidth_limit, self.bandwidth_schedule)
+        quality = QualitySelector(self.download_quality)
+        if self.download_backend == "asyncio":
+            return AsyncDownloader(cookie, custom_path, max_workers=self.download_workers, metadata_only=self.metadata_only,
+                                   account_pool=account_pool, bandwidth=bandwidth, quality=quality, assets=self.download_assets)
+        return Downloader(cookie, custom_path, max_workers=self.download_workers, metadata_only=self.metadata_only,
+                          account_pool=account_pool, bandwidth=bandwidth, quality=quality, assets=self.download_assets)
+
+    def _call_downloader(self, method, *args, **kwargs):
+        """调用下载方法，异步引擎返回的协程交给共享事件循环执行并等待完成"""
+        result = method(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            result = self.downloader.run(result)
+        return result
+    
+    def run_single_upload(self, account_name: str, video_path: str, tags: List[str] = None,
+                          session_pool: "UploadSessionPool" = None) -> bool:
+        """运行单个视频上传任务，返回是否上传成功。
+        传入session_pool时 (批量上传) 使用该账号已打开的浏览器会话，否则为本次上传单独启动浏览器；
+        批量上传中的单个视频不调用finished_callback，由批量任务结束时统一通知"""
         processed_video_path = None
         try:
-            self.is_stopping = False
+            if session_pool is None:
+                self.is_stopping = False
             self.log(f"开始上传视频 '{os.path.basename(video_path)}' 到账号 '{account_name}'...")
             
             # 获取账号信息
@@ -317,28 +434,30 @@ class WorkerCTK:
             # 使用处理后的视频或原始视频
             upload_video_path = processed_video_path if processed_video_path else video_path
             
-            # 动态创建uploader实例
-            uploader = Uploader(user_data_dir)
-            
             # 解析视频标题和标签
             video_name = os.path.basename(video_path)
             title = os.path.splitext(video_name)[0]
             
             # 使用uploader模块执行上传
-            result = uploader.upload_video(upload_video_path, title, tags or [])
+            if session_pool is not None:
+                result = session_pool.upload(account_name, user_data_dir, upload_video_path, title, tags or [])
+            else:
+                result = Uploader(user_data_dir).upload_video(upload_video_path, title, tags or [])
             
             if result:
                 self.log(f"视频 '{os.path.basename(video_path)}' 上传成功")
-                if callable(self.finished_callback):
+                if callable(self.finished_callback) and session_pool is None:
                     self.finished_callback("success", f"视频上传成功: {os.path.basename(video_path)}")
+                return True
             else:
                 raise Exception("上传失败")
                 
         except Exception as e:
             error_msg = f"上传失败: {str(e)}"
             self.log(error_msg)
-            if callable(self.finished_callback):
+            if callable(self.finished_callback) and session_pool is None:
                 self.finished_callback("error", error_msg)
+            return False
         finally:
             # 清理临时文件
             if processed_video_path:
@@ -384,67 +503,30 @@ class WorkerCTK:
             
             self.log(f"有效账号: {', '.join(valid_accounts)}")
             
-            # 执行批量上传
-            success_count = 0
-            failed_count = 0
+            # 执行批量上传: 每个视频上传到每个有效账号。不同账号并行上传，同一账号的视频依次在一个已登录的浏览器中上传
+            videos = [(video_path, (common_tags or []) + self._parse_video_tags(os.path.basename(video_path)))
+                      for video_path in video_paths]
             
-            for i, video_path in enumerate(video_paths, 1):
-                if self.is_stopping:
-                    self.log("用户取消了批量上传任务")
-                    break
-                
-                video_name = os.path.basename(video_path)
-                self.log(f"\n处理视频 {i}/{total_videos}: {video_name}")
-                
-                # 解析视频文件名中的标签
-                video_tags = self._parse_video_tags(video_name)
-                all_tags = (common_tags or []) + video_tags
-                
-                video_uploaded = False
-                for j, account_name in enumerate(valid_accounts, 1):
-                    if self.is_stopping or video_uploaded:
-                        break
-                    
-                    self.log(f"  上传到账号 {j}/{len(valid_accounts)}: {account_name}")
-                    
-                    try:
-                        # 保存当前的视频处理设置
-                        current_process_videos = self.process_videos
-                        current_frame_delete_ratio = self.frame_delete_ratio
-                        
-                        # 设置本次上传的视频处理参数
-                        self.process_videos = process_videos
-                        self.frame_delete_ratio = frame_delete_ratio
-                        
-                        # 调用run_single_upload方法来利用现有的视频处理功能
-                        result = self.run_single_upload(account_name, video_path, all_tags)
-                        
-                        # 恢复原来的设置
-                        self.process_videos = current_process_videos
-                        self.frame_delete_ratio = current_frame_delete_ratio
-                        
-                        if result:
-                            success_count += 1
-                            self.log(f"  ✓ 成功上传到 {account_name}")
-                            video_uploaded = True  # 视频已上传成功，不需要尝试其他账号
-                        else:
-                            failed_count += 1
-                            self.log(f"  ✗ 上传到 {account_name} 失败")
-                        
-                    except Exception as e:
-                        failed_count += 1
-                        self.log(f"  ✗ 上传到 {account_name} 时发生错误: {str(e)}")
-                        # 恢复原来的设置
-                        self.process_videos = current_process_videos
-                        self.frame_delete_ratio = current_frame_delete_ratio
-                    
-                    # 添加延迟避免过于频繁的操作
-                    if not self.is_stopping and j < len(valid_accounts) and not video_uploaded:
-                        time.sleep(2)
-                
-                # 视频间的延迟
-                if not self.is_stopping and i < total_videos:
-                    time.sleep(3)
+            # 保存当前的视频处理设置，设置本次上传的视频处理参数
+            current_process_videos = self.process_videos
+            current_frame_delete_ratio = self.frame_delete_ratio
+            self.process_videos = process_videos
+            self.frame_delete_ratio = frame_delete_ratio
+            executor = UploadExecutor(
+                lambda account_name, video_path, tags, session_pool:
+                    self.run_single_upload(account_name, video_path, tags, session_pool=session_pool),
+                should_stop=lambda: self.is_stopping, log=self.log)
+            try:
+                results = executor.run(valid_accounts, videos)
+            finally:
+                # 恢复原来的设置
+                self.process_videos = current_process_videos
+                self.frame_delete_ratio = current_frame_delete_ratio
+            success_count = sum(result['success'] for result in results.values())
+            failed_count = sum(result['failed'] for result in results.values())
+            if self.is_stopping:
+                self.log("用户取消了批量上传任务")
+            self.log(f"浏览器共启动 {executor.launches} 次")
             
             # 任务完成总结
             if not self.is_stopping:
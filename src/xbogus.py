@@ -5,166 +5,99 @@
 import time
 import base64
 import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List
 from urllib.parse import urlencode
 
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import SIGNER_CACHE_SIZE
+
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0")
+# 空字符串的MD5，签名中固定使用的一段
+EMPTY_MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+UA_KEY = b"\x00\x01\x0c"
+PAYLOAD_HEAD = bytes([64, 0, 1, 12])
+PAYLOAD_CT = (536919696).to_bytes(4, "big")
+PAYLOAD_LENGTH = 19
+
+# 字符按十六进制取值的表 (共103项): 数字与小写a-f取对应的值，其余字符取0；码位超出表长的字符先对表长取模。
+# 与最初按列表实现的版本保持一致，短参数串 (不超过32个字符) 的签名依赖这一规则
+_HEX_VALUES = [0] * 48 + list(range(10)) + [0] * 39 + list(range(10, 16))
+_CHAR_VALUES = bytes(_HEX_VALUES[code % len(_HEX_VALUES)] for code in range(256))
+_LOWER_HEX = frozenset("0123456789abcdef")
+
+# X-Bogus使用自定义字母表的base64，先按标准字母表编码再逐字节替换
+_STANDARD_B64 = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+XBOGUS_ALPHABET = b"Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe"
+_B64_TRANSLATION = bytes.maketrans(_STANDARD_B64, XBOGUS_ALPHABET)
+
+
+def md5_str_to_array(text: str) -> bytes:
+    """把字符串转为参与MD5的字节: 超过32个字符时按码位 (Latin-1) 转换；
+    否则每两个字符按十六进制解析为一个字节 (长度为奇数时补'0')，MD5的十六进制摘要即还原为16字节"""
+    if len(text) > 32:
+        return text.encode("latin-1")
+    if not len(text) % 2 and _LOWER_HEX.issuperset(text):
+        return bytes.fromhex(text)
+    values = [_CHAR_VALUES[code] if code < 256 else _HEX_VALUES[code % len(_HEX_VALUES)] for code in map(ord, text)]
+    if len(values) % 2:
+        values.append(0)
+    return bytes((values[k] << 4) | values[k + 1] for k in range(0, len(values), 2))
+
+
+def rc4_encrypt(key: bytes, data: bytes) -> bytes:
+    S = bytearray(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + S[i] + key[i % len(key)]) & 255
+        S[i], S[j] = S[j], S[i]
+    out = bytearray(len(data))
+    i = j = 0
+    for n, byte in enumerate(data):
+        i = (i + 1) & 255
+        j = (j + S[i]) & 255
+        S[i], S[j] = S[j], S[i]
+        out[n] = byte ^ S[(S[i] + S[j]) & 255]
+    return bytes(out)
+
+
+# 签名数据固定为19字节且RC4密钥固定为0xff，密钥流只需计算一次，加密即为一次整数异或
+_PAYLOAD_KEYSTREAM = int.from_bytes(rc4_encrypt(b"\xff", bytes(PAYLOAD_LENGTH)), "big")
+
+
 class XBogus:
     def __init__(self, user_agent: str = "") -> None:
-        # fmt: off
-        self.Array = [
-            None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None,
-            None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None,
-            None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None,
-            0, 1, 2, 3, 4, 5, 6, 7, 8, 9, None, None, None, None, None, None, None, None, None, None, None,
-            None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None,
-            None, None, None, None, None, None, None, None, None, None, None, None, 10, 11, 12, 13, 14, 15
-        ]
-        self.character = "Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe="
-        # fmt: on
-        self.ua_key = b"\x00\x01\x0c"
-        self.user_agent = (
-            user_agent
-            if user_agent is not None and user_agent != ""
-            else "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0"
-        )
-
-    def md5_str_to_array(self, md5_str):
-        if isinstance(md5_str, str) and len(md5_str) > 32:
-            return [ord(char) for char in md5_str]
-        else:
-            array = []
-            idx = 0
-            while idx < len(md5_str):
-                char1 = md5_str[idx]
-                char2 = md5_str[idx + 1] if idx + 1 < len(md5_str) else '0'
-
-                # 确保索引在Array范围内，并处理None值
-                idx1 = ord(char1) if ord(char1) < len(self.Array) else ord(char1) % len(self.Array)
-                idx2 = ord(char2) if ord(char2) < len(self.Array) else ord(char2) % len(self.Array)
-
-                val1 = self.Array[idx1] if self.Array[idx1] is not None else 0
-                val2 = self.Array[idx2] if self.Array[idx2] is not None else 0
-
-                array.append((val1 << 4) | val2)
-                idx += 2
-            return array
-
-    def md5_encrypt(self, url_params):
-        hashed_url_params = self.md5_str_to_array(
-            self.md5(self.md5_str_to_array(self.md5(url_params)))
-        )
-        return hashed_url_params
-
-    def md5(self, input_data):
-        if isinstance(input_data, str):
-            array = self.md5_str_to_array(input_data)
-        elif isinstance(input_data, list):
-            array = input_data
-        else:
-            raise ValueError("Invalid input type. Expected str or list.")
-        md5_hash = hashlib.md5()
-        md5_hash.update(bytes(array))
-        return md5_hash.hexdigest()
-
-    def encoding_conversion(self, a, b, c, e, d, t, f, r, n, o, i, _, x, u, s, l, v, h, p):
-        y = [a]
-        y.append(int(i))
-        y.extend([b, _, c, x, e, u, d, s, t, l, f, v, r, h, n, p, o])
-        return bytes(y).decode("ISO-8859-1")
-
-    def encoding_conversion2(self, a, b, c):
-        return chr(a) + chr(b) + c
-
-    def rc4_encrypt(self, key, data):
-        S = list(range(256))
-        j = 0
-        encrypted_data = bytearray()
-        for i in range(256):
-            j = (j + S[i] + key[i % len(key)]) % 256
-            S[i], S[j] = S[j], S[i]
-        i = j = 0
-        for byte in data:
-            i = (i + 1) % 256
-            j = (j + S[i]) % 256
-            S[i], S[j] = S[j], S[i]
-            encrypted_byte = byte ^ S[(S[i] + S[j]) % 256]
-            encrypted_data.append(encrypted_byte)
-        return encrypted_data
-
-    def calculation(self, a1, a2, a3):
-        x1 = (a1 & 255) << 16
-        x2 = (a2 & 255) << 8
-        x3 = x1 | x2 | a3
-        return (
-            self.character[(x3 & 16515072) >> 18]
-            + self.character[(x3 & 258048) >> 12]
-            + self.character[(x3 & 4032) >> 6]
-            + self.character[x3 & 63]
-        )
-
-    def get_xbogus(self, url_params: str) -> tuple:
-        array1 = self.md5_str_to_array(
-            self.md5(
-                base64.b64encode(
-                    self.rc4_encrypt(self.ua_key, self.user_agent.encode("ISO-8859-1"))
-                ).decode("ISO-8859-1")
-            )
-        )
-        array2 = self.md5_str_to_array(
-            self.md5(self.md5_str_to_array("d41d8cd98f00b204e9800998ecf8427e"))
-        )
-        url_params_array = self.md5_encrypt(url_params)
-        timer = int(time.time())
-        ct = 536919696
-        array3 = []
-        array4 = []
-        xb_ = ""
-        # fmt: off
-        new_array = [
-            64, 0, 1, 12,  # 修复：将float改为int，使用0代替0.00390625
-            url_params_array[14], url_params_array[15], array2[14], array2[15], array1[14], array1[15],
-            timer >> 24 & 255, timer >> 16 & 255, timer >> 8 & 255, timer & 255,
-            ct >> 24 & 255, ct >> 16 & 255, ct >> 8 & 255, ct & 255
-        ]
-        # fmt: on
-        xor_result = new_array[0]
-        for i in range(1, len(new_array)):
-            # 确保值不为None
-            val = new_array[i] if new_array[i] is not None else 0
-            xor_result ^= val
-
-        new_array.append(xor_result)
-
-        idx = 0
-        while idx < len(new_array):
-            array3.append(new_array[idx])
-            try:
-                array4.append(new_array[idx + 1])
-            except IndexError:
-                pass
-            idx += 2
-
-        merge_array = array3 + array4
-
-        garbled_code = self.encoding_conversion2(
-            2,
-            255,
-            self.rc4_encrypt(
-                "ÿ".encode("ISO-8859-1"),
-                self.encoding_conversion(*merge_array).encode("ISO-8859-1"),
-            ).decode("ISO-8859-1"),
-        )
-
-        idx = 0
-        while idx < len(garbled_code):
-            xb_ += self.calculation(
-                ord(garbled_code[idx]),
-                ord(garbled_code[idx + 1]),
-                ord(garbled_code[idx + 2]),
-            )
-            idx += 3
-        
-        final_url_params = f"{url_params}&X-Bogus={xb_}"
-        return (final_url_params, xb_)
+        self.user_agent = user_agent if user_agent else DEFAULT_USER_AGENT
+        # 只与User-Agent有关的两段数据，每次签名都相同，创建时计算一次
+        ua_cipher = base64.b64encode(rc4_encrypt(UA_KEY, self.user_agent.encode("ISO-8859-1"))).decode("ISO-8859-1")
+        self.ua_array = hashlib.md5(md5_str_to_array(ua_cipher)).digest()
+        self.empty_array = hashlib.md5(md5_str_to_array(EMPTY_MD5)).digest()
+        self._ua_bytes = self.empty_array[14:16] + self.ua_array[14:16]
+        checksum = 0
+        for byte in PAYLOAD_HEAD + self._ua_bytes + PAYLOAD_CT:
+            checksum ^= byte
+        self._ua_checksum = checksum
+
+    def get_xbogus(self, url_params: str, timestamp: int = None) -> tuple:
+        """返回 (追加了X-Bogus的参数串, X-Bogus值)；timestamp默认为当前时间 (秒)"""
+        timer = (int(time.time()) if timestamp is None else int(timestamp)) & 0xFFFFFFFF
+        params_digest = hashlib.md5(hashlib.md5(md5_str_to_array(url_params)).digest()).digest()
+        timer_bytes = timer.to_bytes(4, "big")
+        checksum = self._ua_checksum ^ params_digest[14] ^ params_digest[15]
+        for byte in timer_bytes:
+            checksum ^= byte
+        payload = PAYLOAD_HEAD + params_digest[14:16] + self._ua_bytes + timer_bytes + PAYLOAD_CT + bytes((checksum,))
+        encrypted = (int.from_bytes(payload, "big") ^ _PAYLOAD_KEYSTREAM).to_bytes(PAYLOAD_LENGTH, "big")
+        xb_ = base64.b64encode(b"\x02\xff" + encrypted).translate(_B64_TRANSLATION).decode("ascii")
+        return (f"{url_params}&X-Bogus={xb_}", xb_)
 
     def get_xbogus_url(self, url: str) -> str:
         url_params = url.split("?")[1]
@@ -172,6 +105,90 @@ class XBogus:
         signed_params, _ = self.get_xbogus(url_params)
         return f"{base_url}?{signed_params}"
 
+class RequestSigner:
+    """缓存XBogus实例的签名器。
+
+    每个User-Agent对应的XBogus (包含只与UA有关的预计算数据) 保存在按最近使用排序的LRU中，
+    最多SIGNER_CACHE_SIZE个；签名结果以参数字典返回，不需要再从URL中拆出参数。线程安全。
+    同时统计UA缓存的命中/未命中次数与签名耗时，见stats()。
+    """
+
+    def __init__(self, max_user_agents: int = SIGNER_CACHE_SIZE):
+        self.max_user_agents = max(1, max_user_agents)
+        self._cache: "OrderedDict[str, XBogus]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.signed = 0
+        self.sign_seconds = 0.0
+
+    def _xbogus(self, user_agent: str) -> XBogus:
+        with self._lock:
+            xbogus = self._cache.get(user_agent)
+            if xbogus is not None:
+                self.hits += 1
+                self._cache.move_to_end(user_agent)
+                return xbogus
+            self.misses += 1
+        xbogus = XBogus(user_agent)  # 在锁外计算，不阻塞其他UA的签名
+        with self._lock:
+            self._cache[user_agent] = xbogus
+            self._cache.move_to_end(user_agent)
+            while len(self._cache) > self.max_user_agents:
+                self._cache.popitem(last=False)
+        return xbogus
+
+    def _record(self, count: int, started: float):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.signed += count
+            self.sign_seconds += elapsed
+
+    def signature(self, user_agent: str, param_str: str) -> str:
+        """返回查询字符串param_str的签名值"""
+        started = time.perf_counter()
+        value = self._xbogus(user_agent).get_xbogus(param_str)[1]
+        self._record(1, started)
+        return value
+
+    def sign(self, params: Dict, user_agent: str) -> Dict:
+        """返回加上a_bogus签名的参数字典，签名内容为按参数顺序编码的查询字符串"""
+        return dict(params, a_bogus=self.signature(user_agent, urlencode(params)))
+
+    def sign_many(self, params_list: List[Dict], user_agent: str) -> List[Dict]:
+        """批量签名，同一User-Agent的预计算数据只查找一次，整批使用同一个时间戳"""
+        started = time.perf_counter()
+        xbogus = self._xbogus(user_agent)
+        timestamp = int(time.time())
+        signed = [dict(params, a_bogus=xbogus.get_xbogus(urlencode(params), timestamp)[1]) for params in params_list]
+        self._record(len(signed), started)
+        return signed
+
+    def stats(self) -> Dict:
+        """返回签名次数、UA缓存命中/未命中次数、平均每次签名耗时 (微秒) 与缓存的UA数"""
+        with self._lock:
+            return {"signed": self.signed, "hits": self.hits, "misses": self.misses,
+                    "avg_us": self.sign_seconds / self.signed * 1e6 if self.signed else 0.0,
+                    "user_agents": len(self._cache)}
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"签名 {stats['signed']} 次，UA缓存命中 {stats['hits']} 次、未命中 {stats['misses']} 次，"
+                f"平均每次 {stats['avg_us']:.0f} µs")
+
+
+_signer = None
+_signer_lock = threading.Lock()
+
+def get_signer() -> RequestSigner:
+    """进程内共用的签名器"""
+    global _signer
+    with _signer_lock:
+        if _signer is None:
+            _signer = RequestSigner()
+        return _signer
+
+
 class ABogusManager:
     """ABogus参数管理器，基于F2项目实现"""
 
@@ -179,7 +196,7 @@ class ABogusManager:
     def str_2_endpoint(user_agent: str, param_str: str) -> str:
         """将参数字符串转换为带有ABogus参数的URL"""
         try:
-            xbogus = XBogus(user_agent)
+            xbogus = get_signer()._xbogus(user_agent)
             signed_params, xb_value = xbogus.get_xbogus(param_str)
             # 将X-Bogus替换为a_bogus，因为抖音API使用的是a_bogus参数
             signed_params_with_abogus = signed_params.replace(f"X-Bogus={xb_value}", f"a_bogus={xb_value}")
@@ -192,20 +209,7 @@ class ABogusManager:
     def generate_abogus_params(user_agent: str, base_params: dict) -> dict:
         """生成带有ABogus参数的完整参数字典"""
         try:
-            param_str = urlencode(base_params)
-            signed_url = ABogusManager.str_2_endpoint(user_agent, param_str)
-
-            # 解析生成的URL参数
-            if "?" in signed_url:
-                query_part = signed_url.split("?", 1)[1]
-                params = {}
-                for pair in query_part.split("&"):
-                    if "=" in pair:
-                        key, value = pair.split("=", 1)
-                        params[key] = value
-                return params
-            else:
-                return base_params
+            return get_signer().sign(base_params, user_agent)
         except Exception as e:
             print(f"ABogus参数生成失败: {e}")
             return base_params